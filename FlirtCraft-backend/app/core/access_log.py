@@ -0,0 +1,55 @@
+"""
+Access logging middleware for FlirtCraft Backend
+Pure ASGI, so the server's receive channel reaches endpoints untouched and request.is_disconnected()
+sees the client going away (BaseHTTPMiddleware, i.e. @app.middleware("http"), hides it on Starlette 0.27)
+"""
+
+import logging
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .logging_config import ACCESS_LOGGER
+
+access_logger = logging.getLogger(ACCESS_LOGGER)
+
+
+class AccessLogMiddleware:
+    """Log method, path, status and duration of every HTTP request"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.perf_counter()
+        status_code = 500  # if the app raises before starting a response
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            process_time = time.perf_counter() - start_time
+            # Lazy %-formatting: the message is only built on the log listener thread, if the record is sampled
+            access_logger.log(
+                logging.WARNING if status_code >= 500 else logging.INFO,
+                "%s %s - Status: %s - Time: %.3fs",
+                scope["method"],
+                scope["path"],
+                status_code,
+                process_time,
+                extra={
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "status_code": status_code,
+                    "duration_ms": round(process_time * 1000, 2)
+                }
+            )
@@ -3,17 +3,24 @@ Authentication system for FlirtCraft Backend
 JWT token validation and user authentication dependencies
 """
 
-from fastapi import Depends, HTTPException, status, Security
+from fastapi import Depends, HTTPException, Request, Response, status, Security
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import JWTError, jwt
+from passlib.context import CryptContext
 from sqlalchemy.orm import Session
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
 import logging
+import math
+import time
 
 from .config import settings
 from .database import get_db
+from .metrics import metrics
+from .redis_client import redis_client
+from .profile_cache import get_cached_user, get_cached_profile
+from .quota import conversation_quota_limit, conversation_quota_used
 from .supabase_client import get_supabase, verify_token
-from ..models.user import User, UserProfile
+from ..models.user import User
 from ..schemas.user import UserResponse
 
 logger = logging.getLogger(__name__)
@@ -21,6 +28,12 @@ logger = logging.getLogger(__name__)
 # Security scheme
 security = HTTPBearer()
 
+# Built once; calibration replaces the whole context rather than mutating the one in use
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.bcrypt_rounds)
+
+# Timed hashes per cost factor during calibration; the fastest is the least disturbed by other work
+CALIBRATION_SAMPLES = 3
+
 
 class AuthenticationError(Exception):
     """Custom authentication error"""
@@ -44,7 +57,7 @@ async def get_current_user(
             supabase_user = supabase_result.get("user")
             if supabase_user:
                 # Get user from local database
-                user = db.query(User).filter(User.id == supabase_user.id).first()
+                user = get_cached_user(db, supabase_user.id)
                 if user:
                     return user
                 else:
@@ -78,7 +91,7 @@ async def get_current_user(
             )
 
         # Get user from database
-        user = db.query(User).filter(User.id == user_id).first()
+        user = get_cached_user(db, user_id)
         if user is None:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -116,7 +129,7 @@ async def get_current_user_with_profile(
     db: Session = Depends(get_db)
 ) -> Dict[str, Any]:
     """Get current user with their profile"""
-    profile = db.query(UserProfile).filter(UserProfile.user_id == current_user.id).first()
+    profile = get_cached_profile(db, current_user.id)
 
     return {
         "user": current_user,
@@ -164,7 +177,7 @@ async def get_optional_user(
         if supabase_result.get("valid"):
             supabase_user = supabase_result.get("user")
             if supabase_user:
-                user = db.query(User).filter(User.id == supabase_user.id).first()
+                user = get_cached_user(db, supabase_user.id)
                 return user
 
         return None
@@ -207,10 +220,8 @@ def create_refresh_token(data: dict) -> str:
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify password using passlib"""
+    """Verify password using passlib (blocking, run it off the event loop)"""
     try:
-        from passlib.context import CryptContext
-        pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
         return pwd_context.verify(plain_password, hashed_password)
     except Exception as e:
         logger.error(f"Password verification failed: {e}")
@@ -218,16 +229,51 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 
 
 def get_password_hash(password: str) -> str:
-    """Hash password using passlib"""
+    """Hash password using passlib (blocking, run it off the event loop)"""
     try:
-        from passlib.context import CryptContext
-        pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
         return pwd_context.hash(password)
     except Exception as e:
         logger.error(f"Password hashing failed: {e}")
         raise
 
 
+def _hash_ms(rounds: int) -> float:
+    """Fastest of CALIBRATION_SAMPLES bcrypt hashes at a cost factor, in milliseconds"""
+    handler = pwd_context.handler("bcrypt").using(rounds=rounds)
+    timings = []
+    for _ in range(CALIBRATION_SAMPLES):
+        started = time.perf_counter()
+        handler.hash("calibration")
+        timings.append((time.perf_counter() - started) * 1000)
+    return min(timings)
+
+
+def calibrate_password_hashing() -> int:
+    """
+    Pick the highest bcrypt cost factor that hashes within bcrypt_target_ms on this host
+    Extrapolates from timed hashes at the minimum cost (each round doubles it), then times the chosen
+    cost and steps down while it is over target. Hashes already running keep the context they started
+    with; the calibrated one is swapped in as a new object.
+    """
+    global pwd_context
+    if not settings.bcrypt_target_ms:
+        return settings.bcrypt_rounds
+
+    base_ms = _hash_ms(settings.bcrypt_min_rounds)
+    rounds = settings.bcrypt_min_rounds
+    while rounds < settings.bcrypt_max_rounds and base_ms * 2 ** (rounds + 1 - settings.bcrypt_min_rounds) <= settings.bcrypt_target_ms:
+        rounds += 1
+
+    measured_ms = _hash_ms(rounds) if rounds > settings.bcrypt_min_rounds else base_ms
+    while rounds > settings.bcrypt_min_rounds and measured_ms > settings.bcrypt_target_ms:
+        rounds -= 1
+        measured_ms /= 2
+
+    pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=rounds)
+    logger.info(f"bcrypt cost factor set to {rounds} (~{measured_ms:.1f} ms per hash, {base_ms:.1f} ms at {settings.bcrypt_min_rounds} rounds)")
+    return rounds
+
+
 # Permission checking utilities
 def check_user_permissions(user: User, required_permission: str) -> bool:
     """Check if user has required permissions"""
@@ -247,28 +293,85 @@ def check_user_permissions(user: User, required_permission: str) -> bool:
 
 
 def check_conversation_limit(user: User) -> bool:
-    """Check if user has remaining conversation attempts"""
-    from datetime import datetime, timedelta
+    """
+    Check if user has remaining conversation attempts
+    Read-only; conversation creation reserves its slot atomically with acquire_conversation_slot
+    """
+    return conversation_quota_used(user) < conversation_quota_limit(user)
 
-    # Reset daily limit if needed
-    now = datetime.utcnow()
-    if user.daily_limit_reset_at < now - timedelta(days=1):
-        # Reset daily usage (this would be done via background job in production)
-        return True
 
-    # Check limits
-    if user.is_premium:
-        return user.daily_conversations_used < settings.premium_conversations_per_day
-    else:
-        return user.daily_conversations_used < settings.free_conversations_per_day
+# Rate limiting utilities
+def get_rate_limit(scope: str, user: Optional[User] = None) -> Tuple[int, int]:
+    """(requests, window seconds) allowed for a route scope, scaled up for premium users"""
+    limits = {
+        "auth": (settings.rate_limit_auth_per_minute, 60),
+        "conversations": (settings.rate_limit_conversations_per_hour, 3600),
+        "messages": (settings.rate_limit_messages_per_minute, 60),
+    }
+    limit, window = limits.get(scope, (settings.rate_limit_requests_per_minute, 60))
+    if user is not None and user.is_premium:
+        limit = int(limit * settings.rate_limit_premium_multiplier)
+    return max(1, limit), window
+
+
+def _enforce_rate_limit(scope: str, identity: str, user: Optional[User], response: Response) -> None:
+    """Apply one GCRA check and raise 429 with Retry-After when the caller is over the limit"""
+    limit, window = get_rate_limit(scope, user)
+    result = redis_client.check_rate_limit(f"rate_limit:{scope}:{identity}", limit, window)
+
+    if not result["allowed"]:
+        metrics.increment("rate_limited_requests", scope=scope)
+        retry_after = max(1, math.ceil(result["retry_after"]))
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=f"Rate limit exceeded. Try again in {retry_after} seconds.",
+            headers={
+                "Retry-After": str(retry_after),
+                "X-RateLimit-Limit": str(limit),
+                "X-RateLimit-Remaining": "0"
+            }
+        )
+
+    response.headers["X-RateLimit-Limit"] = str(limit)
+    response.headers["X-RateLimit-Remaining"] = str(result["remaining"])
 
 
-# Rate limiting utilities
 async def check_rate_limit(user_id: str, action: str) -> bool:
     """Check rate limits for specific actions"""
-    # This would integrate with Redis for production rate limiting
-    # For now, always return True
-    return True
+    if not settings.enable_rate_limiting:
+        return True
+
+    limit, window = get_rate_limit(action)
+    result = redis_client.check_rate_limit(f"rate_limit:{action}:{user_id}", limit, window)
+    return result["allowed"]
+
+
+class RateLimit:
+    """
+    Dependency enforcing a per-user rate limit for a route scope
+    Limits come from the rate_limit_* settings; rejected requests get 429 before any DB or AI work
+    """
+
+    def __init__(self, scope: str):
+        self.scope = scope
+
+    async def __call__(
+        self,
+        response: Response,
+        current_user: User = Depends(get_current_user)
+    ) -> User:
+        if settings.enable_rate_limiting:
+            _enforce_rate_limit(self.scope, str(current_user.id), current_user, response)
+        return current_user
+
+
+class IPRateLimit(RateLimit):
+    """Rate limit keyed by client address, for unauthenticated routes"""
+
+    async def __call__(self, request: Request, response: Response) -> None:
+        if settings.enable_rate_limiting:
+            client_ip = request.client.host if request.client else "unknown"
+            _enforce_rate_limit(self.scope, client_ip, None, response)
 
 
 # Auth middleware for specific routes
@@ -309,8 +412,8 @@ async def log_auth_event(event_type: str, user_id: Optional[str] = None, details
         "details": details or {}
     }
 
-    # In production, this would send to proper logging/monitoring system
-    logger.info(f"Auth event: {log_data}")
+    # Passed as a structured field so the dict is only serialized on the log listener thread
+    logger.info("Auth event: %s", event_type, extra={"auth_event": log_data})
 
 
 # Email verification utilities
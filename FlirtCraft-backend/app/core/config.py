@@ -3,7 +3,7 @@ Core configuration settings for FlirtCraft Backend
 """
 
 from pydantic_settings import BaseSettings
-from typing import List, Optional
+from typing import Dict, List, Optional
 import os
 
 
@@ -21,18 +21,43 @@ class Settings(BaseSettings):
     host: str = "0.0.0.0"
     port: int = 8000
     reload_enabled: bool = False
+    web_concurrency: int = 1  # API worker processes (gunicorn reads the same WEB_CONCURRENCY)
+    disconnect_poll_interval: float = 0.25  # how often in-flight AI requests check whether the client is still there
+    warmup_timeout_seconds: float = 30.0  # readiness flips after this even if warmup steps are still running
+    warmup_db_connections: int = 4  # pooled connections opened before readiness (capped at the pool size)
+    warmup_redis_connections: int = 4
+    create_tables_on_startup: bool = False  # local development only; deploys create tables as a separate step
+
+    # Connection budgets shared by all API worker processes, each worker gets an equal slice
+    db_max_connections: int = 40
+    db_pool_timeout: float = 2.0  # seconds to wait for a pooled connection; checkout blocks the event loop
+    redis_max_connections: int = 20
 
     # Database - Supabase
     supabase_url: Optional[str] = None
     supabase_anon_key: Optional[str] = None
     supabase_service_key: Optional[str] = None
     database_url: Optional[str] = None
+    db_connection_guard_strict: bool = False  # raise instead of warn when a connection is held across an AI call
+    supabase_auth_timeout: float = 10.0  # seconds per Supabase Auth call
+    supabase_auth_verify_timeout: float = 5.0  # token verification, runs on every authenticated request
+    supabase_auth_max_connections: int = 50
 
     @property
     def supabase_key(self) -> Optional[str]:
         """Alias for supabase_anon_key for compatibility"""
         return self.supabase_anon_key
 
+    @property
+    def db_pool_size(self) -> int:
+        """DB connections one worker process may hold"""
+        return max(2, self.db_max_connections // max(1, self.web_concurrency))
+
+    @property
+    def redis_pool_size(self) -> int:
+        """Redis connections one worker process may hold"""
+        return max(2, self.redis_max_connections // max(1, self.web_concurrency))
+
     # Redis
     redis_url: str = "redis://localhost:6379"
     redis_password: Optional[str] = None
@@ -40,11 +65,50 @@ class Settings(BaseSettings):
     # External APIs
     openrouter_api_key: Optional[str] = None
     openrouter_base_url: str = "https://openrouter.ai/api/v1"
+    openrouter_http2: bool = True
+
+    # AI model routing
+    primary_ai_model: str = "anthropic/claude-3-haiku"
+    feedback_ai_model: str = "anthropic/claude-3-sonnet"
+    fallback_ai_model: Optional[str] = None  # hedged requests are disabled without a fallback
+    ai_response_timeout: float = 30.0  # hard ceiling for any single AI call
+    ai_latency_budgets: Dict[str, float] = {
+        "chat": 10.0,
+        "character": 15.0,
+        "feedback": 30.0,
+        "assessment": 20.0,
+        "summary": 20.0
+    }
+    ai_hedge_min_samples: int = 20  # first-token samples needed before hedging on the observed p95
+    ai_json_schema_model_prefixes: List[str] = ["openai/", "google/"]  # models sent response_format json_schema
+    ai_coalesced_call_sites: List[str] = ["character"]  # identical concurrent calls share one upstream request; never chat
+
+    # AI circuit breaker (per model) and adaptive concurrency limit
+    ai_breaker_window: int = 50  # recent calls considered
+    ai_breaker_min_calls: int = 10  # calls needed in the window before the breaker can open
+    ai_breaker_error_threshold: float = 0.5
+    ai_breaker_slow_call_seconds: float = 15.0  # absolute cap on the slow-call threshold
+    ai_breaker_slow_call_budget_fraction: float = 0.8  # a call slower than this share of its call-site budget is slow
+    ai_breaker_slow_call_threshold: float = 0.5
+    ai_breaker_open_seconds: float = 30.0
+    ai_concurrency_initial: int = 20
+    ai_concurrency_min: int = 4
+    ai_concurrency_max: int = 200
+    ai_concurrency_backoff: float = 0.9  # multiplicative decrease on errors or slow calls
+
+    # AI request queue: calls over the concurrency limit wait by priority class (premium, free, background)
+    ai_queue_max_waiting: Dict[str, int] = {"premium": 100, "free": 200, "background": 500}
+    ai_queue_max_wait_seconds: Dict[str, float] = {"premium": 8.0, "free": 5.0, "background": 60.0}
+    ai_queue_max_per_user: int = 3  # queued calls one user may have per class
 
     # Security
     secret_key: str = "your-secret-key-change-in-production"
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 30
+    bcrypt_rounds: int = 12
+    bcrypt_target_ms: Optional[float] = None  # calibrate the cost factor at startup to roughly this hash time
+    bcrypt_min_rounds: int = 10
+    bcrypt_max_rounds: int = 14
     refresh_token_expire_days: int = 7
 
     # CORS - Support both JSON array and comma-separated string
@@ -66,6 +130,17 @@ class Settings(BaseSettings):
     # Rate Limiting
     rate_limit_requests: int = 100
     rate_limit_window: int = 60  # seconds
+    rate_limit_requests_per_minute: int = 60  # per user, general API routes
+    rate_limit_conversations_per_hour: int = 10
+    rate_limit_messages_per_minute: int = 30
+    rate_limit_auth_per_minute: int = 10  # per client IP, unauthenticated auth routes
+    rate_limit_premium_multiplier: float = 3.0
+
+    # Idempotency-Key handling for conversation POSTs
+    idempotency_ttl_seconds: int = 86400  # how long a completed response is replayed for
+    idempotency_lock_seconds: int = 90  # in-flight claim expiry, outlives the slowest AI call
+    idempotency_wait_seconds: float = 35.0  # a duplicate waits this long for the original before giving up with 409
+    idempotency_poll_interval: float = 0.2
 
     # File Storage
     max_file_size: int = 10 * 1024 * 1024  # 10MB
@@ -81,6 +156,17 @@ class Settings(BaseSettings):
     free_conversations_per_day: int = 3
     premium_conversations_per_day: int = 50
 
+    # Logging
+    log_level: Optional[str] = None  # defaults to DEBUG when debug is on, INFO otherwise
+    structured_logging: bool = True  # JSON lines instead of plain text
+    log_sample_rates: Dict[str, float] = {"flirtcraft.access": 1.0}  # fraction of INFO records kept per logger
+
+    # Background worker
+    worker_job_batches_per_tick: int = 10  # passes over the conversation AI queues before other jobs get a turn
+    quota_reconcile_interval: float = 60.0  # seconds between quota counter syncs to the users table
+    feedback_job_max_attempts: int = 3  # tries at loading/storing feedback before the conversation is marked failed
+    feedback_job_retry_backoff: float = 1.0  # seconds before the first retry, doubling after each failure
+
     # Feature flags
     enable_rate_limiting: bool = True
     enable_caching: bool = True
@@ -88,6 +174,21 @@ class Settings(BaseSettings):
     enable_websockets: bool = True
     enable_metrics_collection: bool = True
 
+    # Conversation prompt sizing
+    conversation_summary_trigger_messages: int = 10  # unsummarized messages before older turns are compressed
+    conversation_recent_messages: int = 6  # most recent messages always kept verbatim
+    ai_prompt_token_budgets: Dict[str, int] = {  # estimated prompt tokens per call site, oldest turns dropped first
+        "chat": 2000,
+        "feedback": 6000,
+        "assessment": 2000
+    }
+
+    # Scenario catalog
+    scenario_catalog_refresh_seconds: int = 300  # in-process snapshot reload interval
+
+    # User/profile snapshot cache
+    profile_cache_ttl: int = 300  # seconds; writes invalidate explicitly, the TTL only bounds staleness from missed paths
+
     # Business logic
     free_tier_daily_conversations: int = 5
     premium_tier_daily_conversations: int = 50
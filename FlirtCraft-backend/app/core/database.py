@@ -2,32 +2,84 @@
 Database configuration and session management
 """
 
-from sqlalchemy import create_engine, event, text
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-from typing import Generator
+from sqlalchemy.orm import Session, sessionmaker
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Generator, Optional
 import logging
+import os
+import threading
 from .config import settings
+from .metrics import metrics
 
 logger = logging.getLogger(__name__)
 
 # Database URL from Supabase or direct PostgreSQL
 DATABASE_URL = settings.database_url or f"postgresql://postgres:[PASSWORD]@{settings.supabase_url.replace('https://', '').replace('.supabase.co', '.supabase.co:5432')}/postgres"
 
-# SQLAlchemy setup with better connection handling
-engine = create_engine(
-    DATABASE_URL if DATABASE_URL.startswith("postgresql://") else "sqlite:///./flirtcraft_dev.db",
-    pool_pre_ping=True,
-    pool_recycle=300,
-    pool_timeout=30,  # 30 second connection timeout
-    connect_args={
-        "connect_timeout": 10,  # 10 second connection timeout for PostgreSQL
-        "application_name": "flirtcraft-backend"
-    } if DATABASE_URL.startswith("postgresql://") else {},
-    echo=settings.debug
-)
-
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+_engine: Optional[Engine] = None
+_engine_lock = threading.Lock()
+
+
+def get_engine() -> Engine:
+    """SQLAlchemy engine, created on first use so importing the app never touches the database driver"""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                # SQLAlchemy setup with better connection handling
+                _engine = create_engine(
+                    DATABASE_URL if DATABASE_URL.startswith("postgresql://") else "sqlite:///./flirtcraft_dev.db",
+                    pool_pre_ping=True,
+                    pool_recycle=300,
+                    # Checkout blocks the event loop and there is no overflow, so exhaustion has to fail fast
+                    pool_timeout=settings.db_pool_timeout,
+                    **({
+                        # This worker's slice of the global connection budget
+                        "pool_size": settings.db_pool_size,
+                        "max_overflow": 0
+                    } if DATABASE_URL.startswith("postgresql://") else {}),
+                    connect_args={
+                        "connect_timeout": 10,  # 10 second connection timeout for PostgreSQL
+                        "application_name": "flirtcraft-backend"
+                    } if DATABASE_URL.startswith("postgresql://") else {},
+                    echo=settings.debug
+                )
+    return _engine
+
+
+_session_factory = sessionmaker(autocommit=False, autoflush=False)
+
+
+def SessionLocal(**kwargs) -> Session:
+    """New session bound to the lazily created engine"""
+    return _session_factory(bind=get_engine(), **kwargs)
+
+
+def warm_pool(count: int) -> int:
+    """Check out count connections at once so the pool holds them open before traffic arrives"""
+    engine = get_engine()
+    connections = []
+    try:
+        for _ in range(count):
+            connection = engine.connect()
+            connections.append(connection)
+            connection.execute(text("SELECT 1"))
+    finally:
+        for connection in connections:
+            connection.close()
+    return len(connections)
+
+
+def _reset_pool_after_fork():
+    """Forked workers must not reuse the parent's pooled connections; start with an empty pool"""
+    if _engine is not None:
+        _engine.dispose(close=False)
+
+
+os.register_at_fork(after_in_child=_reset_pool_after_fork)
 
 # Declarative base for models
 Base = declarative_base()
@@ -46,6 +98,41 @@ def get_db() -> Generator:
         db.close()
 
 
+class ConnectionHeldError(RuntimeError):
+    """Raised by the connection guard when a pooled connection is held across an external await"""
+    pass
+
+
+def release_connection(db: Session) -> None:
+    """
+    End the session's transaction so its pooled connection is returned
+    Call before awaiting slow external services; loaded objects expire and reload on next access
+    """
+    db.commit()
+
+
+@asynccontextmanager
+async def connection_released(db: Session, operation: str) -> AsyncIterator[None]:
+    """
+    Guard an external await (LLM call, HTTP request) against pinning a DB connection
+    Raises in strict mode (tests, DB_CONNECTION_GUARD_STRICT) and logs otherwise
+    """
+    _check_connection_released(db, operation, "before")
+    yield
+    _check_connection_released(db, operation, "during")
+
+
+def _check_connection_released(db: Session, operation: str, phase: str):
+    if not db.in_transaction():
+        return
+
+    message = f"DB connection held {phase} external call '{operation}'"
+    metrics.increment("db_connection_held_across_await", operation=operation)
+    if settings.db_connection_guard_strict or settings.environment == "test":
+        raise ConnectionHeldError(message)
+    logger.warning(message)
+
+
 async def check_database_health() -> dict:
     """Check database connection health"""
     try:
@@ -70,9 +157,10 @@ async def check_database_health() -> dict:
 
 
 def create_tables():
-    """Create all database tables"""
+    """Create all missing database tables; a deploy step, not run at boot unless CREATE_TABLES_ON_STARTUP is set"""
+    from ..models import user  # noqa: F401 - registers the models on Base.metadata
     try:
-        Base.metadata.create_all(bind=engine)
+        Base.metadata.create_all(bind=get_engine())
         logger.info("✅ Database tables created successfully")
     except Exception as e:
         logger.error(f"❌ Failed to create database tables: {e}")
@@ -0,0 +1,48 @@
+"""
+Client disconnect handling for FlirtCraft Backend
+Cancels slow upstream work (LLM calls) when the client that asked for it has gone away
+"""
+
+import asyncio
+import logging
+from typing import Awaitable, TypeVar
+
+from fastapi import HTTPException, Request
+
+from .config import settings
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# nginx's "client closed request"; never seen by the client, only by logs and metrics
+CLIENT_CLOSED_REQUEST = 499
+
+
+async def cancel_on_disconnect(request: Request, work: Awaitable[T], operation: str) -> T:
+    """
+    Await work, cancelling it if the client disconnects first
+    Raises HTTPException(499) on disconnect so the endpoint unwinds without persisting anything
+    """
+    task = asyncio.ensure_future(work)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=settings.disconnect_poll_interval)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                break
+    except asyncio.CancelledError:
+        task.cancel()
+        raise
+
+    task.cancel()
+    try:
+        await task
+    except (asyncio.CancelledError, Exception):
+        pass
+
+    metrics.increment("client_disconnects", operation=operation)
+    logger.info(f"Client disconnected during {operation}, upstream call cancelled")
+    raise HTTPException(status_code=CLIENT_CLOSED_REQUEST, detail="Client closed request")
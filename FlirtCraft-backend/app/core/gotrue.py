@@ -0,0 +1,189 @@
+"""
+Async Supabase Auth (GoTrue) client for FlirtCraft Backend
+Talks to the GoTrue REST API over a shared httpx connection pool so auth calls never block the event loop
+"""
+
+import logging
+import os
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+import httpx
+
+from .config import settings
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class GoTrueError(Exception):
+    """GoTrue returned an error response"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+@dataclass
+class GoTrueUser:
+    """The user fields the API reads from Supabase Auth"""
+    id: str
+    email: Optional[str] = None
+    email_confirmed_at: Optional[str] = None
+    user_metadata: Dict[str, Any] = field(default_factory=dict)
+
+    @classmethod
+    def from_response(cls, data: Dict[str, Any]) -> "GoTrueUser":
+        return cls(
+            id=data["id"],
+            email=data.get("email"),
+            email_confirmed_at=data.get("email_confirmed_at") or data.get("confirmed_at"),
+            user_metadata=data.get("user_metadata") or {}
+        )
+
+
+class GoTrueClient:
+    """Pooled async client for the Supabase Auth endpoints the API uses"""
+
+    def __init__(self):
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Shared HTTP client so GoTrue connections are reused across requests"""
+        if self._client is None or self._client.is_closed:
+            if not settings.supabase_url or not settings.supabase_key:
+                raise GoTrueError("Supabase URL and key must be provided")
+            self._client = httpx.AsyncClient(
+                base_url=f"{settings.supabase_url.rstrip('/')}/auth/v1",
+                headers={
+                    "apikey": settings.supabase_key,
+                    "Authorization": f"Bearer {settings.supabase_key}",
+                    "Content-Type": "application/json"
+                },
+                timeout=settings.supabase_auth_timeout,
+                limits=httpx.Limits(
+                    max_connections=settings.supabase_auth_max_connections,
+                    max_keepalive_connections=settings.supabase_auth_max_connections
+                )
+            )
+        return self._client
+
+    def reset_after_fork(self):
+        """Forget the parent's connection pool; a forked worker opens its own on first use"""
+        self._client = None
+
+    async def warm(self) -> None:
+        """Open the pooled connection (TCP + TLS) to Supabase Auth ahead of traffic"""
+        await self._request("GET", "/health", "health")
+
+    async def close(self):
+        """Close the shared HTTP client"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _request(
+        self,
+        method: str,
+        path: str,
+        operation: str,
+        json: Optional[Dict[str, Any]] = None,
+        params: Optional[Dict[str, str]] = None,
+        access_token: Optional[str] = None,
+        timeout: Optional[float] = None
+    ) -> Dict[str, Any]:
+        headers = {"Authorization": f"Bearer {access_token}"} if access_token else None
+        try:
+            response = await self.client.request(
+                method,
+                path,
+                json=json,
+                params=params,
+                headers=headers,
+                timeout=timeout or settings.supabase_auth_timeout
+            )
+        except httpx.TimeoutException:
+            metrics.increment("gotrue_requests", operation=operation, outcome="timeout")
+            raise GoTrueError(f"Supabase Auth {operation} timed out")
+        except httpx.HTTPError as e:
+            metrics.increment("gotrue_requests", operation=operation, outcome="error")
+            raise GoTrueError(f"Supabase Auth {operation} failed: {e}")
+
+        if response.status_code >= 400:
+            metrics.increment("gotrue_requests", operation=operation, outcome="rejected")
+            try:
+                body = response.json()
+                message = body.get("msg") or body.get("error_description") or body.get("message") or body.get("error")
+            except ValueError:
+                message = None
+            raise GoTrueError(message or f"HTTP {response.status_code}", response.status_code)
+
+        metrics.increment("gotrue_requests", operation=operation, outcome="success")
+        return response.json() if response.content else {}
+
+    @staticmethod
+    def _session(data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Session fields from a token response, None when the response carries no session"""
+        if not data.get("access_token"):
+            return None
+        return {
+            "access_token": data["access_token"],
+            "refresh_token": data.get("refresh_token"),
+            "expires_in": data.get("expires_in"),
+            "expires_at": data.get("expires_at"),
+            "token_type": data.get("token_type", "bearer")
+        }
+
+    def _auth_response(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """User and session from a response that is either a session or a bare user"""
+        user_data = data.get("user") if "access_token" in data else data
+        return {
+            "user": GoTrueUser.from_response(user_data) if user_data and user_data.get("id") else None,
+            "session": self._session(data)
+        }
+
+    async def sign_up(self, email: str, password: str, metadata: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        data = await self._request("POST", "/signup", "sign_up", json={
+            "email": email,
+            "password": password,
+            "data": metadata or {}
+        })
+        return self._auth_response(data)
+
+    async def sign_in_with_password(self, email: str, password: str) -> Dict[str, Any]:
+        data = await self._request("POST", "/token", "sign_in", params={"grant_type": "password"}, json={
+            "email": email,
+            "password": password
+        })
+        return self._auth_response(data)
+
+    async def refresh_session(self, refresh_token: str) -> Dict[str, Any]:
+        data = await self._request("POST", "/token", "refresh", params={"grant_type": "refresh_token"}, json={
+            "refresh_token": refresh_token
+        })
+        return self._auth_response(data)
+
+    async def get_user(self, access_token: str) -> GoTrueUser:
+        # On every authenticated request, so it gets the tighter timeout
+        data = await self._request(
+            "GET", "/user", "get_user",
+            access_token=access_token,
+            timeout=settings.supabase_auth_verify_timeout
+        )
+        return GoTrueUser.from_response(data)
+
+    async def sign_out(self, access_token: str) -> None:
+        await self._request("POST", "/logout", "sign_out", access_token=access_token)
+
+    async def verify_otp(self, token: str, otp_type: str = "email") -> Dict[str, Any]:
+        data = await self._request("POST", "/verify", "verify", json={"token": token, "type": otp_type})
+        return self._auth_response(data)
+
+    async def resend(self, email: str, otp_type: str = "signup") -> None:
+        await self._request("POST", "/resend", "resend", json={"type": otp_type, "email": email})
+
+
+# Global GoTrue client instance
+gotrue_client = GoTrueClient()
+os.register_at_fork(after_in_child=gotrue_client.reset_after_fork)
@@ -0,0 +1,148 @@
+"""
+Idempotency keys for FlirtCraft Backend
+Retried POSTs carrying the same Idempotency-Key wait for the original request and get its stored
+response replayed, so a flaky network never creates a second conversation or a second paid AI turn
+"""
+
+import asyncio
+import hashlib
+import logging
+import time
+from typing import Any, Dict, Optional
+
+import orjson
+from fastapi import HTTPException, Request, status
+from fastapi.responses import Response
+from sqlalchemy.orm import Session
+
+from .config import settings
+from .database import release_connection
+from .metrics import metrics
+from .redis_client import redis_client
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+
+PENDING = "pending"
+DONE = "done"
+
+
+class IdempotentRequest:
+    """
+    One request's claim on an idempotency key
+    Inactive (every method a no-op) when the client sent no key or Redis is unavailable
+    """
+
+    def __init__(self, redis_key: Optional[str] = None, fingerprint: Optional[str] = None):
+        self.redis_key = redis_key
+        self.fingerprint = fingerprint
+        self.replay: Optional[Response] = None
+
+    @property
+    def active(self) -> bool:
+        return self.redis_key is not None and self.replay is None
+
+    def complete(self, response: Response) -> Response:
+        """Store a successful response for replay and return it; error responses only release the key"""
+        if not self.active:
+            return response
+        if response.status_code >= 400:
+            self.release()
+            return response
+
+        redis_client.set_cache(self.redis_key, {
+            "state": DONE,
+            "fingerprint": self.fingerprint,
+            "status_code": response.status_code,
+            "body": response.body.decode()
+        }, ttl=settings.idempotency_ttl_seconds)
+        self.redis_key = None
+        return response
+
+    def release(self):
+        """Drop the in-flight claim so a retry runs the request again"""
+        if self.active:
+            redis_client.delete_cache(self.redis_key)
+            self.redis_key = None
+
+
+def _fingerprint(payload: Dict[str, Any]) -> str:
+    return hashlib.sha256(orjson.dumps(payload, option=orjson.OPT_SORT_KEYS, default=str)).hexdigest()
+
+
+def _replay(record: Dict[str, Any]) -> Response:
+    return Response(
+        content=record["body"],
+        status_code=record["status_code"],
+        media_type="application/json",
+        headers={REPLAYED_HEADER: "true"}
+    )
+
+
+async def begin_idempotent(
+    request: Request,
+    user_id: Any,
+    operation: str,
+    payload: Dict[str, Any],
+    db: Optional[Session] = None
+) -> IdempotentRequest:
+    """
+    Claim the request's Idempotency-Key for this user and operation
+    If the key was already used, waits for the original to finish and sets .replay to its response;
+    the same key with a different payload is rejected with 422
+    db, when given, has its connection released before waiting so the wait doesn't pin it
+    """
+    key = request.headers.get(IDEMPOTENCY_HEADER)
+    if key is None:
+        return IdempotentRequest()
+    if not key or len(key) > MAX_KEY_LENGTH:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"{IDEMPOTENCY_HEADER} must be 1-{MAX_KEY_LENGTH} characters"
+        )
+
+    redis_key = f"idempotency:{user_id}:{operation}:{key}"
+    fingerprint = _fingerprint(payload)
+    pending = orjson.dumps({"state": PENDING, "fingerprint": fingerprint}).decode()
+    deadline = time.monotonic() + settings.idempotency_wait_seconds
+    waited = False
+
+    while True:
+        claimed = redis_client.set_if_absent(redis_key, pending, ttl=settings.idempotency_lock_seconds)
+        if claimed is None:
+            # Redis down: serve the request without duplicate protection rather than fail it
+            metrics.increment("idempotency_requests", operation=operation, outcome="unavailable")
+            return IdempotentRequest()
+        if claimed:
+            metrics.increment("idempotency_requests", operation=operation, outcome="retried" if waited else "new")
+            return IdempotentRequest(redis_key, fingerprint)
+
+        # None means the original failed and released the key (or it expired) in between; claim it next pass
+        record = redis_client.get_cache(redis_key, as_json=True)
+        if record is not None:
+            if not isinstance(record, dict) or record.get("fingerprint") != fingerprint:
+                metrics.increment("idempotency_requests", operation=operation, outcome="mismatch")
+                raise HTTPException(
+                    status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                    detail=f"{IDEMPOTENCY_HEADER} was already used for a different request"
+                )
+            if record.get("state") == DONE:
+                metrics.increment("idempotency_requests", operation=operation, outcome="replayed")
+                result = IdempotentRequest(fingerprint=fingerprint)
+                result.replay = _replay(record)
+                return result
+
+        if time.monotonic() >= deadline:
+            metrics.increment("idempotency_requests", operation=operation, outcome="conflict")
+            logger.info(f"Gave up waiting on in-flight {operation} for idempotency key {key}")
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="A request with this Idempotency-Key is still being processed"
+            )
+        if not waited and db is not None:
+            release_connection(db)
+        waited = True
+        await asyncio.sleep(settings.idempotency_poll_interval)
@@ -0,0 +1,83 @@
+"""
+In-process metrics registry for FlirtCraft Backend
+Counters, gauges and timing summaries for the current worker, exposed on /metrics
+"""
+
+import logging
+import threading
+from typing import Callable, Dict, Any, List
+
+logger = logging.getLogger(__name__)
+
+
+def _metric_key(name: str, labels: Dict[str, Any]) -> str:
+    """Flatten a metric name and labels into one key, e.g. llm_calls{model=x}"""
+    if not labels:
+        return name
+    label_text = ",".join(f"{key}={labels[key]}" for key in sorted(labels))
+    return f"{name}{{{label_text}}}"
+
+
+class MetricsRegistry:
+    """Thread-safe process-local metrics"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = {}
+        self._gauges: Dict[str, float] = {}
+        self._timings: Dict[str, Dict[str, float]] = {}
+        self._collectors: List[Callable[[], Dict[str, Any]]] = []
+
+    def increment(self, name: str, amount: float = 1, **labels):
+        """Increment a counter"""
+        key = _metric_key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def set_gauge(self, name: str, value: float, **labels):
+        """Set a gauge to its current value"""
+        key = _metric_key(name, labels)
+        with self._lock:
+            self._gauges[key] = value
+
+    def observe(self, name: str, value: float, **labels):
+        """Record one observation (latency, size) into a count/sum/max summary"""
+        key = _metric_key(name, labels)
+        with self._lock:
+            summary = self._timings.get(key)
+            if summary is None:
+                summary = self._timings[key] = {"count": 0, "sum": 0.0, "max": 0.0}
+            summary["count"] += 1
+            summary["sum"] += value
+            summary["max"] = max(summary["max"], value)
+
+    def register_collector(self, collector: Callable[[], Dict[str, Any]]):
+        """Register a callable polled at scrape time for state owned elsewhere"""
+        self._collectors.append(collector)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Point-in-time copy of every metric"""
+        with self._lock:
+            timings = {
+                key: {**summary, "avg": summary["sum"] / summary["count"] if summary["count"] else 0.0}
+                for key, summary in self._timings.items()
+            }
+            data = {
+                "counters": dict(self._counters),
+                "gauges": dict(self._gauges),
+                "timings": timings
+            }
+
+        collected = {}
+        for collector in self._collectors:
+            try:
+                collected.update(collector())
+            except Exception as e:
+                logger.error(f"Metrics collector failed: {e}")
+        data["collected"] = collected
+
+        return data
+
+
+# Global metrics registry
+metrics = MetricsRegistry()
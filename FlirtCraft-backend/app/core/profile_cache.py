@@ -0,0 +1,123 @@
+"""
+User and profile snapshot cache for FlirtCraft Backend
+Version-stamped Redis copies of the User and UserProfile rows, attached to the request's session
+without a query; every write path bumps the user's version to invalidate both snapshots
+"""
+
+import json
+import logging
+import uuid
+from datetime import datetime
+from typing import Any, Dict, Optional, Type, TypeVar
+
+from sqlalchemy import DateTime, inspect
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Session, make_transient_to_detached
+from sqlalchemy.orm.attributes import set_committed_value
+
+from .config import settings
+from .metrics import metrics
+from .redis_client import redis_client
+from ..models.user import User, UserProfile
+
+logger = logging.getLogger(__name__)
+
+ModelT = TypeVar("ModelT", User, UserProfile)
+
+
+def _version_key(user_id: Any) -> str:
+    return f"user:{user_id}:cache_version"
+
+
+def _snapshot_key(kind: str, user_id: Any) -> str:
+    return f"user:{user_id}:{kind}_snapshot"
+
+
+def _encode(value: Any) -> Any:
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _decode(column, value: Any) -> Any:
+    if value is None:
+        return None
+    if isinstance(column.type, UUID):
+        return uuid.UUID(value)
+    if isinstance(column.type, DateTime):
+        return datetime.fromisoformat(value)
+    return value
+
+
+def _serialize(instance) -> Dict[str, Any]:
+    """Column values of a loaded row as JSON-safe data"""
+    return {
+        attr.key: _encode(getattr(instance, attr.key))
+        for attr in inspect(type(instance)).column_attrs
+    }
+
+
+def _restore(db: Session, model: Type[ModelT], data: Dict[str, Any]) -> ModelT:
+    """Rebuild a snapshot as a persistent instance of the session without a SELECT"""
+    instance = model()
+    for attr in inspect(model).column_attrs:
+        column = attr.columns[0]
+        set_committed_value(instance, attr.key, _decode(column, data.get(attr.key)))
+
+    make_transient_to_detached(instance)
+    return db.merge(instance, load=False)
+
+
+def _get_cached(db: Session, model: Type[ModelT], kind: str, user_id: Any, query) -> Optional[ModelT]:
+    if not settings.enable_caching:
+        return query.first()
+
+    version_raw, snapshot_raw = redis_client.get_many_cache([
+        _version_key(user_id),
+        _snapshot_key(kind, user_id)
+    ])
+    version = int(version_raw or 0)
+
+    if snapshot_raw:
+        try:
+            snapshot = json.loads(snapshot_raw)
+            if snapshot.get("version") == version:
+                metrics.increment("profile_cache_hits", kind=kind)
+                return _restore(db, model, snapshot["data"])
+        except Exception as e:
+            logger.warning(f"Discarding unreadable {kind} snapshot for user {user_id}: {e}")
+
+    metrics.increment("profile_cache_misses", kind=kind)
+    instance = query.first()
+    if instance is not None:
+        # Stamped with the version read before the query, so a concurrent invalidation wins
+        redis_client.set_cache(
+            _snapshot_key(kind, user_id),
+            {"version": version, "data": _serialize(instance)},
+            ttl=settings.profile_cache_ttl
+        )
+    return instance
+
+
+def get_cached_user(db: Session, user_id: Any) -> Optional[User]:
+    """User row for an id, from the snapshot cache when it is current"""
+    return _get_cached(db, User, "user", user_id, db.query(User).filter(User.id == user_id))
+
+
+def get_cached_profile(db: Session, user_id: Any) -> Optional[UserProfile]:
+    """UserProfile row for a user, from the snapshot cache when it is current"""
+    return _get_cached(
+        db, UserProfile, "profile", user_id,
+        db.query(UserProfile).filter(UserProfile.user_id == user_id)
+    )
+
+
+def invalidate_user_cache(user_id: Any) -> bool:
+    """Invalidate the user's and profile's snapshots; call after committing a write to either row"""
+    return redis_client.bump_version(
+        _version_key(user_id),
+        [_snapshot_key("user", user_id), _snapshot_key("profile", user_id)],
+        ttl=settings.profile_cache_ttl * 2
+    )
@@ -0,0 +1,180 @@
+"""
+Daily conversation quota for FlirtCraft Backend
+Atomic per-user counters in Redis, reconciled into users.daily_conversations_used by the worker
+"""
+
+import logging
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import or_
+
+from .config import settings
+from .database import SessionLocal
+from .metrics import metrics
+from .profile_cache import invalidate_user_cache
+from .redis_client import redis_client
+from ..models.user import User
+
+logger = logging.getLogger(__name__)
+
+# Users whose counter changed since the last reconciliation, as "user_id|YYYY-MM-DD"
+DIRTY_QUOTAS_KEY = "quota:conversations:dirty"
+
+# Counters outlive their day by this much so the reconciler can still read them
+QUOTA_GRACE_SECONDS = 3600
+
+RECONCILE_BATCH_SIZE = 500
+
+
+def quota_day(now: Optional[datetime] = None) -> date:
+    """Quota day for a moment in time; days roll over at streak_reset_hour UTC"""
+    now = now or datetime.now(timezone.utc)
+    return (now - timedelta(hours=settings.streak_reset_hour)).date()
+
+
+def quota_day_start(day: date) -> datetime:
+    """UTC moment a quota day begins"""
+    return datetime(day.year, day.month, day.day, tzinfo=timezone.utc) + timedelta(hours=settings.streak_reset_hour)
+
+
+def conversation_quota_limit(user: User) -> int:
+    """Conversations per quota day for the user's tier"""
+    if user.is_premium:
+        return settings.premium_conversations_per_day
+    return settings.free_conversations_per_day
+
+
+def _quota_key(user_id: Any, day: date) -> str:
+    return f"quota:conversations:{user_id}:{day.isoformat()}"
+
+
+def _db_usage_today(user: User, day: date) -> int:
+    """Conversations the DB has recorded for the current quota day (0 if its count is from an earlier day)"""
+    reset_at = user.daily_limit_reset_at
+    if reset_at is None:
+        return 0
+    if reset_at.tzinfo is None:
+        reset_at = reset_at.replace(tzinfo=timezone.utc)
+    if reset_at < quota_day_start(day):
+        return 0
+    return user.daily_conversations_used or 0
+
+
+def conversation_quota_used(user: User) -> int:
+    """Conversations used in the current quota day, without reserving one"""
+    day = quota_day()
+    used = redis_client.get_cache(_quota_key(user.id, day))
+    if used is None:
+        return _db_usage_today(user, day)
+    return int(used)
+
+
+def acquire_conversation_slot(user: User) -> Dict[str, Any]:
+    """
+    Check and take one conversation from today's quota in a single atomic step
+    Falls back to the DB count, without reserving, if Redis is unavailable
+    """
+    day = quota_day()
+    limit = conversation_quota_limit(user)
+    db_used = _db_usage_today(user, day)
+    ttl = int((quota_day_start(day + timedelta(days=1)) - datetime.now(timezone.utc)).total_seconds()) + QUOTA_GRACE_SECONDS
+
+    result = redis_client.acquire_quota(
+        _quota_key(user.id, day),
+        limit,
+        ttl,
+        seed=db_used,
+        dirty_set=DIRTY_QUOTAS_KEY,
+        dirty_member=f"{user.id}|{day.isoformat()}"
+    )
+    if result is None:
+        metrics.increment("conversation_quota_unavailable")
+        return {"allowed": db_used < limit, "used": db_used, "limit": limit, "day": day, "reserved": False}
+
+    if not result["allowed"]:
+        metrics.increment("conversation_quota_exhausted")
+    return {**result, "limit": limit, "day": day, "reserved": result["allowed"]}
+
+
+def release_conversation_slot(user_id: Any, quota: Dict[str, Any]) -> None:
+    """Give back a slot when conversation creation fails after acquiring it"""
+    if not quota.get("reserved"):
+        return
+    day = quota["day"]
+    redis_client.release_quota(
+        _quota_key(user_id, day),
+        DIRTY_QUOTAS_KEY,
+        f"{user_id}|{day.isoformat()}"
+    )
+
+
+def reconcile_conversation_quotas() -> int:
+    """
+    Write changed Redis counters into users.daily_conversations_used, returns rows updated
+    Works through the dirty set in batches until it is drained; entries whose counter has expired
+    are dropped without an update, so the row count says nothing about what is left
+    """
+    total = 0
+    while True:
+        members = redis_client.pop_set_members(DIRTY_QUOTAS_KEY, RECONCILE_BATCH_SIZE)
+        if not members:
+            break
+        updated = _reconcile_batch(members)
+        if updated is None:
+            # DB failure, the batch went back into the set for the next pass
+            break
+        total += updated
+        if len(members) < RECONCILE_BATCH_SIZE:
+            break
+    return total
+
+
+def _reconcile_batch(members: List[str]) -> Optional[int]:
+    """Reconcile one popped batch, None if it had to be put back"""
+    entries = []
+    for member in members:
+        user_id, _, day_text = member.partition("|")
+        try:
+            entries.append((uuid.UUID(user_id), date.fromisoformat(day_text)))
+        except ValueError:
+            logger.warning(f"Dropping malformed quota entry {member}")
+
+    counts = redis_client.get_many_cache([_quota_key(user_id, day) for user_id, day in entries])
+
+    db = SessionLocal()
+    try:
+        updated = []
+        for (user_id, day), count in zip(entries, counts):
+            if count is None:
+                continue
+            day_start = quota_day_start(day)
+            next_day_start = quota_day_start(day + timedelta(days=1))
+            # Never let an older day's counter overwrite a newer one
+            db.query(User).filter(
+                User.id == user_id,
+                or_(User.daily_limit_reset_at.is_(None), User.daily_limit_reset_at < next_day_start)
+            ).update(
+                {
+                    User.daily_conversations_used: int(count),
+                    User.daily_limit_reset_at: day_start
+                },
+                synchronize_session=False
+            )
+            updated.append(user_id)
+        db.commit()
+    except Exception as e:
+        logger.error(f"Failed to reconcile conversation quotas: {e}")
+        db.rollback()
+        # Retry these users on the next pass
+        redis_client.add_set_members(DIRTY_QUOTAS_KEY, members)
+        return None
+    finally:
+        db.close()
+
+    for user_id in updated:
+        invalidate_user_cache(user_id)
+
+    metrics.increment("conversation_quota_reconciled", len(updated))
+    return len(updated)
@@ -5,7 +5,8 @@ Caching, session storage, and background job queue management
 
 import redis
 import logging
-from typing import Optional, Dict, Any, Union
+import os
+from typing import Optional, Dict, Any, List, Union
 import json
 import pickle
 from datetime import timedelta
@@ -14,6 +15,63 @@ from .config import settings
 
 logger = logging.getLogger(__name__)
 
+# Job score = priority * step + enqueue time, so lower priority values come first and equal priorities are FIFO
+JOB_PRIORITY_SCORE_STEP = 10_000_000_000
+
+# GCRA rate limit: the key holds the theoretical arrival time (ms) of the next request.
+# ARGV[1] = emission interval in ms (window / limit), ARGV[2] = burst size (limit).
+# Returns {allowed, remaining, retry_after_ms, reset_after_ms}.
+GCRA_LUA = """
+local emission = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local burst_offset = emission * burst
+
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) * 1000 + math.floor(tonumber(clock[2]) / 1000)
+
+local tat = tonumber(redis.call('GET', KEYS[1]))
+if not tat or tat < now then
+    tat = now
+end
+
+local new_tat = tat + emission
+local diff = new_tat - now
+if diff > burst_offset then
+    return {0, 0, diff - burst_offset, tat - now}
+end
+
+redis.call('SET', KEYS[1], new_tat, 'PX', diff)
+return {1, math.floor((burst_offset - diff) / emission), 0, diff}
+"""
+
+# Quota slot: seed the counter if it doesn't exist yet, then increment it unless the limit is reached.
+# KEYS[1] = counter, KEYS[2] = dirty set; ARGV = limit, ttl seconds, seed, dirty member.
+# Returns {acquired, used}.
+QUOTA_ACQUIRE_LUA = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    redis.call('SET', KEYS[1], ARGV[3], 'EX', ARGV[2])
+end
+
+local used = tonumber(redis.call('GET', KEYS[1]))
+if used >= tonumber(ARGV[1]) then
+    return {0, used}
+end
+
+used = redis.call('INCR', KEYS[1])
+redis.call('SADD', KEYS[2], ARGV[4])
+return {1, used}
+"""
+
+# Give a quota slot back. KEYS[1] = counter, KEYS[2] = dirty set; ARGV[1] = dirty member.
+QUOTA_RELEASE_LUA = """
+local used = tonumber(redis.call('GET', KEYS[1]) or '0')
+if used > 0 then
+    used = redis.call('DECR', KEYS[1])
+    redis.call('SADD', KEYS[2], ARGV[1])
+end
+return used
+"""
+
 
 class RedisClient:
     """Redis client wrapper with connection management"""
@@ -21,6 +79,9 @@ class RedisClient:
     def __init__(self):
         self._client: Optional[redis.Redis] = None
         self._connected = False
+        self._rate_limit_script = None
+        self._quota_acquire_script = None
+        self._quota_release_script = None
 
     def _initialize_client(self):
         """Initialize Redis connection"""
@@ -32,13 +93,17 @@ class RedisClient:
                 if "@" not in redis_url:
                     redis_url = redis_url.replace("://", f"://:{settings.redis_password}@")
 
-            self._client = redis.from_url(
+            # Bounded to this worker's slice of the global budget; callers wait briefly for a free connection
+            pool = redis.BlockingConnectionPool.from_url(
                 redis_url,
+                max_connections=settings.redis_pool_size,
+                timeout=5,
                 decode_responses=True,
                 health_check_interval=30,
                 socket_keepalive=True,
                 socket_keepalive_options={}
             )
+            self._client = redis.Redis(connection_pool=pool)
 
             # Test connection
             self._client.ping()
@@ -50,6 +115,14 @@ class RedisClient:
             self._connected = False
             self._client = None
 
+    def reset_after_fork(self):
+        """Drop the parent's connections so a forked worker opens its own on first use"""
+        self._client = None
+        self._connected = False
+        self._rate_limit_script = None
+        self._quota_acquire_script = None
+        self._quota_release_script = None
+
     @property
     def client(self) -> redis.Redis:
         """Get Redis client instance"""
@@ -57,6 +130,24 @@ class RedisClient:
             self._initialize_client()
         return self._client
 
+    def warm_pool(self, count: int) -> int:
+        """Open up to count pooled connections ahead of traffic, returns how many are ready"""
+        client = self.client
+        if client is None:
+            return 0
+        pool = client.connection_pool
+        connections = []
+        try:
+            for _ in range(count):
+                connection = pool.get_connection("PING")
+                connections.append(connection)
+                connection.send_command("PING")
+                connection.read_response()
+        finally:
+            for connection in connections:
+                pool.release(connection)
+        return len(connections)
+
     def health_check(self) -> Dict[str, Any]:
         """Check Redis connection health"""
         try:
@@ -157,6 +248,16 @@ class RedisClient:
             logger.error(f"Failed to get cache {key}: {e}")
             return None
 
+    def set_if_absent(self, key: str, value: str, ttl: int) -> Optional[bool]:
+        """SET NX with a TTL; True if the key was claimed, False if it exists, None if Redis is unavailable"""
+        try:
+            if not self.client:
+                return None
+            return bool(self.client.set(key, value, nx=True, ex=ttl))
+        except Exception as e:
+            logger.error(f"Failed to claim cache key {key}: {e}")
+            return None
+
     def delete_cache(self, key: str) -> bool:
         """Delete cache entry"""
         try:
@@ -167,6 +268,34 @@ class RedisClient:
             logger.error(f"Failed to delete cache {key}: {e}")
             return False
 
+    def get_many_cache(self, keys: List[str]) -> List[Optional[str]]:
+        """Get several cache values in one round trip (MGET), None for missing keys"""
+        try:
+            if not self.client:
+                return [None] * len(keys)
+            return self.client.mget(keys)
+        except Exception as e:
+            logger.error(f"Failed to get cache keys {keys}: {e}")
+            return [None] * len(keys)
+
+    def bump_version(self, version_key: str, stale_keys: List[str], ttl: int) -> bool:
+        """Increment a version stamp and drop the entries it guarded, atomically"""
+        try:
+            if not self.client:
+                return False
+
+            pipe = self.client.pipeline()
+            pipe.incr(version_key)
+            pipe.expire(version_key, ttl)
+            if stale_keys:
+                pipe.delete(*stale_keys)
+            pipe.execute()
+            return True
+
+        except Exception as e:
+            logger.error(f"Failed to bump cache version {version_key}: {e}")
+            return False
+
     def cache_exists(self, key: str) -> bool:
         """Check if cache key exists"""
         try:
@@ -184,46 +313,98 @@ class RedisClient:
         limit: int,
         window: int
     ) -> Dict[str, Any]:
-        """Check rate limit using sliding window"""
+        """
+        Check rate limit with GCRA (generic cell rate algorithm)
+        One key and one script call per check; allows bursts up to `limit` and refills evenly over `window`
+        """
         try:
             if not self.client:
-                return {"allowed": True, "remaining": limit}
+                return {"allowed": True, "remaining": limit, "retry_after": 0}
 
-            current_time = int(time.time())
-            window_start = current_time - window
+            if self._rate_limit_script is None:
+                self._rate_limit_script = self.client.register_script(GCRA_LUA)
 
-            # Use pipeline for atomic operations
-            pipe = self.client.pipeline()
+            emission_interval_ms = max(1, int(window * 1000 / limit))
+            allowed, remaining, retry_after_ms, reset_after_ms = self._rate_limit_script(
+                keys=[key],
+                args=[emission_interval_ms, limit]
+            )
+
+            return {
+                "allowed": bool(allowed),
+                "remaining": int(remaining),
+                "retry_after": int(retry_after_ms) / 1000,
+                "reset_after": int(reset_after_ms) / 1000
+            }
+
+        except Exception as e:
+            logger.error(f"Rate limit check failed for {key}: {e}")
+            # Fail open - allow request if Redis is down
+            return {"allowed": True, "remaining": limit, "retry_after": 0}
+
+    # Quota operations
+    def acquire_quota(
+        self,
+        key: str,
+        limit: int,
+        ttl: int,
+        seed: int,
+        dirty_set: str,
+        dirty_member: str
+    ) -> Optional[Dict[str, Any]]:
+        """Atomically take one slot from a counter quota, None if Redis is unavailable"""
+        try:
+            if not self.client:
+                return None
 
-            # Remove old entries
-            pipe.zremrangebyscore(key, 0, window_start)
+            if self._quota_acquire_script is None:
+                self._quota_acquire_script = self.client.register_script(QUOTA_ACQUIRE_LUA)
 
-            # Count current requests
-            pipe.zcard(key)
+            acquired, used = self._quota_acquire_script(
+                keys=[key, dirty_set],
+                args=[limit, ttl, seed, dirty_member]
+            )
+            return {"allowed": bool(acquired), "used": int(used)}
 
-            # Add current request
-            pipe.zadd(key, {str(current_time): current_time})
+        except Exception as e:
+            logger.error(f"Quota check failed for {key}: {e}")
+            return None
 
-            # Set expiry for the key
-            pipe.expire(key, window + 1)
+    def release_quota(self, key: str, dirty_set: str, dirty_member: str) -> bool:
+        """Give back a slot taken with acquire_quota"""
+        try:
+            if not self.client:
+                return False
 
-            results = pipe.execute()
-            current_count = results[1]
+            if self._quota_release_script is None:
+                self._quota_release_script = self.client.register_script(QUOTA_RELEASE_LUA)
 
-            allowed = current_count < limit
-            remaining = max(0, limit - current_count - 1)
+            self._quota_release_script(keys=[key, dirty_set], args=[dirty_member])
+            return True
 
-            return {
-                "allowed": allowed,
-                "remaining": remaining,
-                "reset_time": current_time + window,
-                "current_count": current_count
-            }
+        except Exception as e:
+            logger.error(f"Failed to release quota slot {key}: {e}")
+            return False
 
+    def pop_set_members(self, key: str, count: int) -> List[str]:
+        """Remove and return up to `count` members of a set"""
+        try:
+            if not self.client:
+                return []
+            return self.client.spop(key, count) or []
         except Exception as e:
-            logger.error(f"Rate limit check failed for {key}: {e}")
-            # Fail open - allow request if Redis is down
-            return {"allowed": True, "remaining": limit}
+            logger.error(f"Failed to pop members from {key}: {e}")
+            return []
+
+    def add_set_members(self, key: str, members: List[str]) -> bool:
+        """Add members to a set"""
+        try:
+            if not self.client or not members:
+                return False
+            return bool(self.client.sadd(key, *members))
+        except Exception as e:
+            logger.error(f"Failed to add members to {key}: {e}")
+            return False
 
     # Session management
     def set_session(
@@ -278,11 +459,11 @@ class RedisClient:
                 "priority": priority
             }
 
-            # Add to sorted set with priority as score
+            # Add to sorted set, ordered by priority then enqueue time
             queue_key = f"queue:{queue_name}"
             return bool(self.client.zadd(
                 queue_key,
-                {json.dumps(job_payload): priority}
+                {json.dumps(job_payload): priority * JOB_PRIORITY_SCORE_STEP + time.time()}
             ))
 
         except Exception as e:
@@ -297,19 +478,14 @@ class RedisClient:
 
             queue_key = f"queue:{queue_name}"
 
-            # Get highest priority job (lowest score)
-            jobs = self.client.zrange(queue_key, 0, 0, withscores=True)
+            # Pop the highest priority, oldest job (lowest score) atomically
+            jobs = self.client.zpopmin(queue_key, 1)
 
             if not jobs:
                 return None
 
             job_data, score = jobs[0]
-
-            # Remove from queue atomically
-            if self.client.zrem(queue_key, job_data):
-                return json.loads(job_data)
-
-            return None
+            return json.loads(job_data)
 
         except Exception as e:
             logger.error(f"Failed to dequeue job from {queue_name}: {e}")
@@ -362,6 +538,7 @@ class RedisClient:
 
 # Global Redis client instance
 redis_client = RedisClient()
+os.register_at_fork(after_in_child=redis_client.reset_after_fork)
 
 
 # Dependency for FastAPI
@@ -427,6 +604,51 @@ class BackgroundJobManager:
 
         return self.redis.enqueue_job("user_progress", job_data)
 
+    async def enqueue_feedback_job(
+        self,
+        conversation_id: str,
+        user_id: str
+    ) -> bool:
+        """Enqueue end-of-conversation feedback generation job"""
+        job_data = {
+            "type": "feedback",
+            "conversation_id": conversation_id,
+            "user_id": user_id,
+            "timestamp": int(time.time())
+        }
+
+        return self.redis.enqueue_job("feedback", job_data)
+
+    async def enqueue_assessment_job(
+        self,
+        conversation_id: str,
+        message_count: int
+    ) -> bool:
+        """Enqueue per-turn conversation assessment job"""
+        job_data = {
+            "type": "conversation_assessment",
+            "conversation_id": conversation_id,
+            "message_count": message_count,
+            "timestamp": int(time.time())
+        }
+
+        return self.redis.enqueue_job("conversation_assessment", job_data)
+
+    async def enqueue_summary_job(
+        self,
+        conversation_id: str,
+        message_count: int
+    ) -> bool:
+        """Enqueue rolling conversation summary refresh job"""
+        job_data = {
+            "type": "conversation_summary",
+            "conversation_id": conversation_id,
+            "message_count": message_count,
+            "timestamp": int(time.time())
+        }
+
+        return self.redis.enqueue_job("conversation_summary", job_data)
+
 
 # Global job manager instance
 job_manager = BackgroundJobManager(redis_client)
@@ -0,0 +1,43 @@
+"""
+Response helpers for FlirtCraft Backend
+orjson-encoded StandardResponse envelopes for hot endpoints
+"""
+
+from typing import Any, Dict, Optional
+
+from fastapi.responses import ORJSONResponse, Response
+
+# Set by the response class itself, never carried over from the endpoint's injected Response
+_OWN_HEADERS = (b"content-length", b"content-type")
+
+
+def fast_response(
+    data: Any = None,
+    message: Optional[str] = None,
+    meta: Optional[Dict[str, Any]] = None,
+    status_code: int = 200,
+    headers: Optional[Dict[str, str]] = None,
+    response: Optional[Response] = None
+) -> ORJSONResponse:
+    """
+    StandardResponse envelope serialized straight to bytes
+    Skips response_model validation and jsonable_encoder; use only for dicts the endpoint built itself.
+    orjson encodes datetimes (RFC 3339) and UUIDs natively, so values don't need str() first.
+    Pass the endpoint's injected Response as response: FastAPI only merges headers set on it
+    (X-RateLimit-* from the RateLimit dependency) into responses it builds itself.
+    """
+    result = ORJSONResponse(
+        content={
+            "success": True,
+            "data": data,
+            "message": message,
+            "meta": meta
+        },
+        status_code=status_code,
+        headers=headers
+    )
+    if response is not None:
+        result.raw_headers.extend(
+            (name, value) for name, value in response.raw_headers if name not in _OWN_HEADERS
+        )
+    return result
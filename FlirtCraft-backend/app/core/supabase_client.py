@@ -2,10 +2,14 @@
 Supabase client configuration for FlirtCraft Backend
 """
 
-from supabase import create_client, Client
-from typing import Optional
+from typing import TYPE_CHECKING, Optional
 import logging
+import os
 from .config import settings
+from .gotrue import gotrue_client
+
+if TYPE_CHECKING:
+    from supabase import Client
 
 logger = logging.getLogger(__name__)
 
@@ -14,20 +18,18 @@ class SupabaseClient:
     """Singleton Supabase client wrapper"""
 
     _instance: Optional['SupabaseClient'] = None
-    _client: Optional[Client] = None
+    _client: Optional["Client"] = None
 
     def __new__(cls) -> 'SupabaseClient':
         if cls._instance is None:
             cls._instance = super().__new__(cls)
         return cls._instance
 
-    def __init__(self):
-        if self._client is None:
-            self._initialize_client()
-
     def _initialize_client(self):
-        """Initialize the Supabase client"""
+        """Initialize the Supabase client (on first use; supabase-py is slow to import)"""
         try:
+            from supabase import create_client
+
             if not settings.supabase_url or not settings.supabase_key:
                 raise ValueError("Supabase URL and key must be provided")
 
@@ -42,8 +44,12 @@ class SupabaseClient:
             logger.error(f"❌ Failed to initialize Supabase client: {e}")
             raise
 
+    def reset_after_fork(self):
+        """Drop the parent's client (and its HTTP connections); re-created on first use in the worker"""
+        self._client = None
+
     @property
-    def client(self) -> Client:
+    def client(self) -> "Client":
         """Get the Supabase client instance"""
         if self._client is None:
             self._initialize_client()
@@ -53,7 +59,7 @@ class SupabaseClient:
         """Check Supabase connection health"""
         try:
             # Simple health check - attempt to query auth users (will return auth info)
-            response = self._client.auth.get_session()
+            response = self.client.auth.get_session()
             return {
                 "status": "healthy",
                 "service": "supabase",
@@ -71,47 +77,40 @@ class SupabaseClient:
 
 # Global Supabase client instance
 supabase_client = SupabaseClient()
+os.register_at_fork(after_in_child=supabase_client.reset_after_fork)
 
 
-def get_supabase() -> Client:
+def get_supabase() -> "Client":
     """Dependency to get Supabase client"""
     return supabase_client.client
 
 
-# Auth utilities
+# Auth utilities (async GoTrue calls, nothing here blocks the event loop)
 async def verify_token(token: str) -> dict:
     """Verify JWT token with Supabase"""
     try:
-        response = supabase_client.client.auth.get_user(token)
-        if response.user:
-            return {
-                "valid": True,
-                "user": response.user,
-                "session": response.session if hasattr(response, 'session') else None
-            }
-        return {"valid": False, "error": "Invalid token"}
+        user = await gotrue_client.get_user(token)
+        return {
+            "valid": True,
+            "user": user,
+            "session": None
+        }
     except Exception as e:
-        logger.error(f"Token verification failed: {e}")
+        logger.debug(f"Token verification failed: {e}")
         return {"valid": False, "error": str(e)}
 
 
 async def create_user_account(email: str, password: str, metadata: dict = None) -> dict:
     """Create new user account with Supabase Auth"""
     try:
-        response = supabase_client.client.auth.sign_up({
-            "email": email,
-            "password": password,
-            "options": {
-                "data": metadata or {}
-            }
-        })
+        response = await gotrue_client.sign_up(email, password, metadata)
 
-        if response.user:
+        if response["user"]:
             return {
                 "success": True,
-                "user": response.user,
-                "session": response.session,
-                "email_verification_required": not response.user.email_confirmed_at
+                "user": response["user"],
+                "session": response["session"],
+                "email_verification_required": not response["user"].email_confirmed_at
             }
         else:
             return {
@@ -130,16 +129,13 @@ async def create_user_account(email: str, password: str, metadata: dict = None)
 async def sign_in_user(email: str, password: str) -> dict:
     """Sign in user with email and password"""
     try:
-        response = supabase_client.client.auth.sign_in_with_password({
-            "email": email,
-            "password": password
-        })
+        response = await gotrue_client.sign_in_with_password(email, password)
 
-        if response.user:
+        if response["user"] and response["session"]:
             return {
                 "success": True,
-                "user": response.user,
-                "session": response.session
+                "user": response["user"],
+                "session": response["session"]
             }
         else:
             return {
@@ -158,9 +154,7 @@ async def sign_in_user(email: str, password: str) -> dict:
 async def sign_out_user(token: str) -> dict:
     """Sign out user"""
     try:
-        # Set the auth token first
-        supabase_client.client.auth.set_session(token, None)
-        response = supabase_client.client.auth.sign_out()
+        await gotrue_client.sign_out(token)
 
         return {
             "success": True,
@@ -178,13 +172,13 @@ async def sign_out_user(token: str) -> dict:
 async def refresh_token(refresh_token: str) -> dict:
     """Refresh access token"""
     try:
-        response = supabase_client.client.auth.refresh_session(refresh_token)
+        response = await gotrue_client.refresh_session(refresh_token)
 
-        if response.session:
+        if response["session"]:
             return {
                 "success": True,
-                "session": response.session,
-                "user": response.user
+                "session": response["session"],
+                "user": response["user"]
             }
         else:
             return {
@@ -203,16 +197,13 @@ async def refresh_token(refresh_token: str) -> dict:
 async def verify_email(token: str) -> dict:
     """Verify user email with token"""
     try:
-        response = supabase_client.client.auth.verify_otp({
-            "token": token,
-            "type": "email"
-        })
+        response = await gotrue_client.verify_otp(token, "email")
 
-        if response.user:
+        if response["user"]:
             return {
                 "success": True,
-                "user": response.user,
-                "session": response.session
+                "user": response["user"],
+                "session": response["session"]
             }
         else:
             return {
@@ -231,10 +222,7 @@ async def verify_email(token: str) -> dict:
 async def resend_verification_email(email: str) -> dict:
     """Resend email verification"""
     try:
-        response = supabase_client.client.auth.resend({
-            "type": "signup",
-            "email": email
-        })
+        await gotrue_client.resend(email, "signup")
 
         return {
             "success": True,
@@ -246,4 +234,4 @@ async def resend_verification_email(email: str) -> dict:
         return {
             "success": False,
             "error": str(e)
-        }
\ No newline at end of file
+        }
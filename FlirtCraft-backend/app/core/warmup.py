@@ -0,0 +1,148 @@
+"""
+Startup warmup and readiness for FlirtCraft Backend
+The app starts serving immediately; external clients are created lazily and this background warmup
+opens DB/Redis/upstream connections and loads the scenario caches, flipping readiness when it is done.
+No DDL runs at boot unless CREATE_TABLES_ON_STARTUP is set
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from .config import settings
+from .database import create_tables, warm_pool
+from .metrics import metrics
+from .redis_client import redis_client
+
+logger = logging.getLogger(__name__)
+
+DIFFICULTY_LEVELS = ("green", "yellow", "red")
+TARGET_GENDERS = (None, "male", "female", "everyone")
+
+
+class Readiness:
+    """Whether startup warmup has finished, and how each step went"""
+
+    def __init__(self):
+        self.ready = False
+        self.started_at: Optional[float] = None
+        self.duration: Optional[float] = None
+        self.steps: Dict[str, Dict[str, Any]] = {}
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "warmup_seconds": round(self.duration, 3) if self.duration is not None else None,
+            "steps": self.steps
+        }
+
+
+readiness = Readiness()
+
+
+async def _create_schema() -> Dict[str, Any]:
+    # Opt-in for local development; deployed environments create tables before rolling out workers
+    await asyncio.to_thread(create_tables)
+    return {}
+
+
+async def _warm_database() -> Dict[str, Any]:
+    count = min(settings.warmup_db_connections, settings.db_pool_size)
+    opened = await asyncio.to_thread(warm_pool, count)
+    return {"connected": True, "connections": opened}
+
+
+async def _warm_redis() -> Dict[str, Any]:
+    count = min(settings.warmup_redis_connections, settings.redis_pool_size)
+    opened = await asyncio.to_thread(redis_client.warm_pool, count)
+    return {"connected": opened > 0, "connections": opened}
+
+
+async def _warm_openrouter() -> Dict[str, Any]:
+    from ..services.openrouter import openrouter_service
+    if not settings.openrouter_api_key:
+        return {"skipped": "API key not configured"}
+    return await openrouter_service.warm()
+
+
+async def _warm_supabase_auth() -> Dict[str, Any]:
+    from .gotrue import gotrue_client
+    await gotrue_client.warm()
+    return {"connected": True}
+
+
+def _load_scenarios() -> Dict[str, Any]:
+    from ..services.scenario_catalog import scenario_catalog
+    from ..services.scenario_content import character_prompt, mock_context
+
+    snapshot = scenario_catalog.refresh(force=False)
+
+    # Character prompts and pre-conversation contexts for every scenario combination
+    primed = 0
+    for scenario_type in snapshot.scenarios:
+        for difficulty_level in DIFFICULTY_LEVELS:
+            for target_gender in TARGET_GENDERS:
+                character_prompt(scenario_type, difficulty_level, target_gender)
+                mock_context(scenario_type, difficulty_level, target_gender)
+                primed += 1
+    return {"catalog_version": snapshot.version, "scenarios": len(snapshot.scenarios), "character_contexts": primed}
+
+
+async def _warm_scenarios() -> Dict[str, Any]:
+    return await asyncio.to_thread(_load_scenarios)
+
+
+async def _calibrate_passwords() -> Dict[str, Any]:
+    from .auth import calibrate_password_hashing
+    rounds = await asyncio.to_thread(calibrate_password_hashing)
+    return {"bcrypt_rounds": rounds}
+
+
+WARMUP_STEPS: Dict[str, Callable[[], Awaitable[Dict[str, Any]]]] = {
+    "database": _warm_database,
+    "redis": _warm_redis,
+    "openrouter": _warm_openrouter,
+    "supabase_auth": _warm_supabase_auth,
+    "scenarios": _warm_scenarios,
+    "password_hashing": _calibrate_passwords
+}
+
+
+async def _run_step(name: str, step: Callable[[], Awaitable[Dict[str, Any]]]):
+    started = time.monotonic()
+    try:
+        detail = await step()
+        outcome = "ok" if detail.get("connected", True) else "failed"
+    except Exception as e:
+        logger.warning(f"⚠️ Warmup step {name} failed: {e}")
+        detail, outcome = {"error": str(e)}, "failed"
+    seconds = time.monotonic() - started
+    readiness.steps[name] = {"outcome": outcome, "seconds": round(seconds, 3), **detail}
+    metrics.increment("warmup_steps", step=name, outcome=outcome)
+    metrics.observe("warmup_step_seconds", seconds, step=name)
+
+
+async def _warm_all():
+    if settings.create_tables_on_startup:
+        # Tables first, the scenario catalog and the pooled connections expect them
+        await _run_step("schema", _create_schema)
+    await asyncio.gather(*(_run_step(name, step) for name, step in WARMUP_STEPS.items()))
+
+
+async def run_warmup():
+    """
+    Run the warmup steps concurrently (after creating missing tables, if opted in), then mark the app ready
+    Degraded steps and the warmup timeout don't block readiness; cancellation (shutdown) does
+    """
+    readiness.started_at = time.monotonic()
+    try:
+        await asyncio.wait_for(_warm_all(), timeout=settings.warmup_timeout_seconds)
+    except asyncio.TimeoutError:
+        logger.warning(f"⚠️ Warmup exceeded {settings.warmup_timeout_seconds}s, marking ready anyway")
+
+    readiness.duration = time.monotonic() - readiness.started_at
+    readiness.ready = True
+    metrics.observe("warmup_seconds", readiness.duration)
+    metrics.set_gauge("ready", 1)
+    logger.info(f"✅ Warmup finished in {readiness.duration:.2f}s")
@@ -5,9 +5,10 @@ Modular application with proper structure and router organization
 
 from fastapi import FastAPI, Request, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse
 from fastapi.exceptions import RequestValidationError
 from contextlib import asynccontextmanager
+import asyncio
 import logging
 import traceback
 from datetime import datetime
@@ -15,19 +16,21 @@ from typing import Dict, Any
 
 # Core imports
 from .core.config import settings
-from .core.database import create_tables, check_database_health
+from .core.access_log import AccessLogMiddleware
+from .core.logging_config import configure_logging
+from .core.database import check_database_health
 from .core.supabase_client import supabase_client
+from .core.gotrue import gotrue_client
 from .core.redis_client import redis_client
+from .core.metrics import metrics
+from .core.warmup import readiness, run_warmup
 from .services.openrouter import openrouter_service
 
 # Router imports
 from .routers import auth, onboarding, scenarios, conversations, analytics
 
-# Configure logging
-logging.basicConfig(
-    level=logging.DEBUG if settings.debug else logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-)
+# Configure logging (queued, formatted off the event loop)
+configure_logging()
 
 logger = logging.getLogger(__name__)
 
@@ -39,23 +42,11 @@ async def lifespan(app: FastAPI):
     logger.info(f"Environment: {settings.environment}")
     logger.info(f"Debug mode: {settings.debug}")
 
+    warmup_task = None
     try:
-        # Try to initialize database tables (non-blocking)
-        try:
-            create_tables()
-            logger.info("✅ Database tables initialized")
-        except Exception as db_error:
-            logger.warning(f"⚠️ Database initialization failed (will continue): {db_error}")
-
-        # Test Supabase connection (non-blocking)
-        try:
-            health = supabase_client.health_check()
-            if health["connected"]:
-                logger.info("✅ Supabase connection established")
-            else:
-                logger.warning("⚠️ Supabase connection failed")
-        except Exception as sb_error:
-            logger.warning(f"⚠️ Supabase health check failed (will continue): {sb_error}")
+        # Clients connect lazily; warmup exercises them in the background and gates /ready.
+        # Tables are created by a deploy step, not here (see CREATE_TABLES_ON_STARTUP)
+        warmup_task = asyncio.create_task(run_warmup())
 
         # Additional startup tasks here
         logger.info("✅ Application startup completed")
@@ -71,6 +62,10 @@ async def lifespan(app: FastAPI):
 
     # Shutdown
     logger.info("💤 FlirtCraft Backend shutting down...")
+    if warmup_task is not None and not warmup_task.done():
+        warmup_task.cancel()
+    await openrouter_service.close()
+    await gotrue_client.close()
 
 
 # Create FastAPI application
@@ -83,6 +78,7 @@ def create_application() -> FastAPI:
         version=settings.app_version,
         docs_url="/docs" if settings.api_docs_enabled else None,
         redoc_url="/redoc" if settings.api_docs_enabled else None,
+        default_response_class=ORJSONResponse,
         lifespan=lifespan
     )
 
@@ -118,10 +114,20 @@ def create_application() -> FastAPI:
                 "onboarding": "/api/v1/onboarding",
                 "scenarios": "/api/v1/scenarios",
                 "conversations": "/api/v1/conversations",
-                "analytics": "/api/v1/analytics"
+                "analytics": "/api/v1/analytics",
+                "metrics": "/metrics"
             }
         }
 
+    # Readiness probe: 503 until startup warmup has finished
+    @app.get("/ready")
+    async def ready_check():
+        """Readiness probe for load balancers and orchestrators"""
+        return JSONResponse(
+            content=readiness.snapshot(),
+            status_code=200 if readiness.ready else 503
+        )
+
     # Health check endpoint
     @app.get("/health")
     async def health_check() -> Dict[str, Any]:
@@ -191,6 +197,15 @@ def create_application() -> FastAPI:
                 status_code=503
             )
 
+    # Metrics endpoint
+    @app.get("/metrics")
+    async def get_metrics() -> Dict[str, Any]:
+        """Process-local metrics (AI circuit breakers, concurrency limit, call latency)"""
+        return {
+            "timestamp": datetime.utcnow().isoformat(),
+            **metrics.snapshot()
+        }
+
     # Global exception handlers
     @app.exception_handler(RequestValidationError)
     async def validation_exception_handler(request: Request, exc: RequestValidationError):
@@ -215,7 +230,7 @@ def create_application() -> FastAPI:
     @app.exception_handler(HTTPException)
     async def http_exception_handler(request: Request, exc: HTTPException):
         """Handle HTTP exceptions"""
-        logger.warning(f"HTTP exception: {exc.status_code} - {exc.detail}")
+        logger.warning("HTTP exception: %s - %s", exc.status_code, exc.detail)
         return JSONResponse(
             status_code=exc.status_code,
             content={
@@ -256,26 +271,8 @@ def create_application() -> FastAPI:
             }
         )
 
-    # Request logging middleware
-    @app.middleware("http")
-    async def log_requests(request: Request, call_next):
-        """Log all requests"""
-        start_time = datetime.utcnow()
-
-        # Process request
-        response = await call_next(request)
-
-        # Calculate processing time
-        process_time = (datetime.utcnow() - start_time).total_seconds()
-
-        # Log request details
-        logger.info(
-            f"{request.method} {request.url.path} - "
-            f"Status: {response.status_code} - "
-            f"Time: {process_time:.3f}s"
-        )
-
-        return response
+    # Request logging middleware (pure ASGI, keeps client disconnects visible to endpoints)
+    app.add_middleware(AccessLogMiddleware)
 
     return app
 
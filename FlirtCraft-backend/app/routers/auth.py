@@ -22,8 +22,10 @@ from ..core.auth import (
     get_current_active_user,
     create_access_token,
     create_refresh_token,
-    log_auth_event
+    log_auth_event,
+    IPRateLimit
 )
+from ..core.profile_cache import invalidate_user_cache
 from ..models.user import User, UserProfile, UserProgress
 from ..schemas.user import (
     UserRegistrationRequest,
@@ -42,7 +44,7 @@ logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
 
-@router.post("/register", response_model=AuthResponse)
+@router.post("/register", response_model=AuthResponse, dependencies=[Depends(IPRateLimit("auth"))])
 async def register_user(
     user_data: UserRegistrationRequest,
     background_tasks: BackgroundTasks,
@@ -140,7 +142,7 @@ async def register_user(
         )
 
 
-@router.post("/login", response_model=AuthResponse)
+@router.post("/login", response_model=AuthResponse, dependencies=[Depends(IPRateLimit("auth"))])
 async def login_user(
     login_data: UserLoginRequest,
     db: Session = Depends(get_db)
@@ -189,6 +191,7 @@ async def login_user(
         if supabase_user.email_confirmed_at and not local_user.email_verified:
             local_user.email_verified = True
             db.commit()
+            invalidate_user_cache(local_user.id)
 
         # Log successful login
         await log_auth_event(
@@ -276,6 +279,7 @@ async def verify_user_email(
         if local_user:
             local_user.email_verified = True
             db.commit()
+            invalidate_user_cache(local_user.id)
             db.refresh(local_user)
 
             await log_auth_event(
@@ -400,7 +404,7 @@ async def refresh_access_token(
         )
 
 
-@router.post("/check-email", response_model=StandardResponse)
+@router.post("/check-email", response_model=StandardResponse, dependencies=[Depends(IPRateLimit("auth"))])
 async def check_email_availability(
     email: str,
     db: Session = Depends(get_db)
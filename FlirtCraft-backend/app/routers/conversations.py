@@ -3,24 +3,56 @@ Conversation routes for FlirtCraft Backend
 AI-powered conversation practice sessions with real-time feedback
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status, BackgroundTasks
 from sqlalchemy.orm import Session
 from typing import Dict, Any, List, Optional
 import logging
 from datetime import datetime
 import json
 
-from ..core.database import get_db
-from ..core.auth import get_current_user, require_onboarding_completed, check_conversation_limit
+from ..core.config import settings
+from ..core.database import get_db, release_connection, connection_released
+from ..core.disconnect import cancel_on_disconnect
+from ..core.idempotency import begin_idempotent
+from ..core.auth import get_current_user, require_onboarding_completed, RateLimit
 from ..core.redis_client import get_redis, job_manager
-from ..models.user import User, Conversation, ConversationMessage, UserProfile, UserProgress
+from ..core.profile_cache import get_cached_profile
+from ..core.quota import acquire_conversation_slot, release_conversation_slot
+from ..core.responses import fast_response
+from ..models.user import User, Conversation, ConversationMessage, UserProgress
 from ..services.openrouter import get_openrouter_service, OpenRouterService
+from ..services.resilience import ConcurrencyLimitError
+from ..services.conversation_jobs import (
+    run_feedback_job,
+    run_assessment_job,
+    run_summary_job,
+    feedback_failed_cache_key,
+    summary_cache_key,
+    summary_needs_refresh
+)
 from ..schemas.user import StandardResponse
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/conversations", tags=["Conversations"])
 
+# Suggested client polling interval while feedback is being generated
+FEEDBACK_POLL_INTERVAL_SECONDS = 2
+
+
+def ai_priority(user: User) -> str:
+    """Scheduler priority class for AI calls made on the user's behalf"""
+    return "premium" if user.is_premium else "free"
+
+
+def ai_busy(error: ConcurrencyLimitError) -> HTTPException:
+    """503 with Retry-After for an AI call the scheduler shed"""
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail=f"AI is busy right now. Try again in {error.retry_after} seconds.",
+        headers={"Retry-After": str(error.retry_after)}
+    )
+
 
 # Pydantic schemas for conversation endpoints
 from pydantic import BaseModel, Field
@@ -59,9 +91,11 @@ class MessageResponse(BaseModel):
         from_attributes = True
 
 
-@router.post("/", response_model=StandardResponse)
+@router.post("/", response_model=StandardResponse, dependencies=[Depends(RateLimit("conversations"))])
 async def create_conversation(
     request: ConversationCreateRequest,
+    http_request: Request,
+    response: Response,
     background_tasks: BackgroundTasks,
     current_user: User = Depends(require_onboarding_completed),
     db: Session = Depends(get_db),
@@ -70,17 +104,24 @@ async def create_conversation(
 ):
     """
     Create a new conversation practice session
+    If the client disconnects while the character is generated, the call is cancelled, nothing is
+    stored and the quota slot is given back
+    Retries with the same Idempotency-Key get the first response back instead of a second conversation
     """
+    idempotency = await begin_idempotent(
+        http_request,
+        current_user.id,
+        "create_conversation",
+        request.model_dump(),
+        db=db
+    )
+    if idempotency.replay is not None:
+        return idempotency.replay
+
+    quota = {}
+    completed = False
+    user_id = current_user.id
     try:
-        # Check conversation limits
-        if not check_conversation_limit(current_user):
-            limit = 50 if current_user.is_premium else 3
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail=f"Daily conversation limit reached ({limit} conversations per day). "
-                       f"{'Try again tomorrow.' if not current_user.is_premium else 'Premium users get 50 conversations per day.'}"
-            )
-
         # Validate inputs
         if request.difficulty_level not in ["green", "yellow", "red"]:
             raise HTTPException(
@@ -88,27 +129,51 @@ async def create_conversation(
                 detail="Invalid difficulty level. Must be 'green', 'yellow', or 'red'"
             )
 
+        # Check and reserve today's conversation slot in one step
+        quota = acquire_conversation_slot(current_user)
+        if not quota["allowed"]:
+            limit = quota["limit"]
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail=f"Daily conversation limit reached ({limit} conversations per day). "
+                       f"{'Try again tomorrow.' if not current_user.is_premium else f'Premium users get {limit} conversations per day.'}"
+            )
+
         # Get user profile for personalization
-        profile = db.query(UserProfile).filter(UserProfile.user_id == current_user.id).first()
+        profile = get_cached_profile(db, current_user.id)
         if not profile:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="User profile not found. Please complete onboarding first."
             )
 
-        # Generate AI character context
+        # Copy what the prompt needs before the session's connection is released
+        priority = ai_priority(current_user)
+        experience_level = profile.experience_level
         user_preferences = {
             "target_gender": profile.target_gender,
             "target_age_min": profile.target_age_min,
             "target_age_max": profile.target_age_max,
-            "experience_level": profile.experience_level
+            "experience_level": experience_level
         }
+        release_connection(db)
 
-        character_result = await openrouter.generate_conversation_character(
-            scenario_type=request.scenario_type,
-            difficulty_level=request.difficulty_level,
-            user_preferences=user_preferences
-        )
+        # Generate AI character context
+        try:
+            async with connection_released(db, "generate_conversation_character"):
+                character_result = await cancel_on_disconnect(
+                    http_request,
+                    openrouter.generate_conversation_character(
+                        scenario_type=request.scenario_type,
+                        difficulty_level=request.difficulty_level,
+                        user_preferences=user_preferences,
+                        priority=priority,
+                        user_id=str(user_id)
+                    ),
+                    "generate_conversation_character"
+                )
+        except ConcurrencyLimitError as e:
+            raise ai_busy(e)
 
         if not character_result["success"]:
             logger.warning(f"Character generation failed, using fallback: {character_result.get('error')}")
@@ -116,9 +181,9 @@ async def create_conversation(
         else:
             character_context = character_result["character"]
 
-        # Create conversation record
+        # Create conversation record; the quota counter is reconciled into the user row by the worker
         conversation = Conversation(
-            user_id=current_user.id,
+            user_id=user_id,
             scenario_type=request.scenario_type,
             difficulty_level=request.difficulty_level,
             ai_character_context=character_context,
@@ -129,10 +194,6 @@ async def create_conversation(
         db.commit()
         db.refresh(conversation)
 
-        # Update user's daily conversation count
-        current_user.daily_conversations_used += 1
-        db.commit()
-
         # Cache conversation context for faster access
         cache_key = f"conversation:{conversation.id}:context"
         redis.set_cache(cache_key, character_context, ttl=3600)  # 1 hour TTL
@@ -141,12 +202,12 @@ async def create_conversation(
         background_tasks.add_task(
             job_manager.enqueue_analytics_job,
             "conversation_created",
-            str(current_user.id),
+            str(user_id),
             {
                 "conversation_id": str(conversation.id),
                 "scenario_type": request.scenario_type,
                 "difficulty_level": request.difficulty_level,
-                "user_experience_level": profile.experience_level
+                "user_experience_level": experience_level
             }
         )
 
@@ -162,11 +223,11 @@ async def create_conversation(
             "available_starters": character_context.get("conversation_starters", [])
         }
 
-        return StandardResponse(
-            success=True,
-            data=response_data,
-            message="Conversation session created successfully!"
+        result = idempotency.complete(
+            fast_response(data=response_data, message="Conversation session created successfully!", response=response)
         )
+        completed = True
+        return result
 
     except HTTPException:
         raise
@@ -177,6 +238,11 @@ async def create_conversation(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to create conversation session"
         )
+    finally:
+        # Also runs on cancellation (server shutdown, a cancelled task group), which no except clause sees
+        if not completed:
+            idempotency.release()
+            release_conversation_slot(user_id, quota)
 
 
 @router.get("/{conversation_id}", response_model=StandardResponse)
@@ -233,10 +299,7 @@ async def get_conversation(
             ]
         }
 
-        return StandardResponse(
-            success=True,
-            data=conversation_data
-        )
+        return fast_response(data=conversation_data)
 
     except HTTPException:
         raise
@@ -248,10 +311,12 @@ async def get_conversation(
         )
 
 
-@router.post("/{conversation_id}/messages", response_model=StandardResponse)
+@router.post("/{conversation_id}/messages", response_model=StandardResponse, dependencies=[Depends(RateLimit("messages"))])
 async def send_message(
     conversation_id: str,
     message_request: MessageRequest,
+    http_request: Request,
+    response: Response,
     background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
@@ -260,7 +325,21 @@ async def send_message(
 ):
     """
     Send a message in the conversation and get AI response
+    If the client disconnects before the AI answers, the call is cancelled and the whole turn
+    (user message included) is dropped; the client resends it
+    Retries with the same Idempotency-Key get the first response back instead of a second AI turn
     """
+    idempotency = await begin_idempotent(
+        http_request,
+        current_user.id,
+        "send_message",
+        {"conversation_id": conversation_id, **message_request.model_dump()},
+        db=db
+    )
+    if idempotency.replay is not None:
+        return idempotency.replay
+
+    completed = False
     try:
         # Get conversation
         conversation = db.query(Conversation).filter(
@@ -280,17 +359,6 @@ async def send_message(
             ConversationMessage.conversation_id == conversation_id
         ).order_by(ConversationMessage.message_order).all()
 
-        # Create user message
-        user_message = ConversationMessage(
-            conversation_id=conversation.id,
-            sender_type="user",
-            content=message_request.content,
-            message_order=len(messages) + 1
-        )
-
-        db.add(user_message)
-        db.flush()  # Get the ID
-
         # Build conversation history for AI
         conversation_history = [
             {
@@ -299,23 +367,48 @@ async def send_message(
             }
             for msg in messages
         ]
+        message_count = len(messages)
+        scenario_type = conversation.scenario_type
+        difficulty_level = conversation.difficulty_level
 
         # Get cached character context or use stored context
-        cache_key = f"conversation:{conversation.id}:context"
+        cache_key = f"conversation:{conversation_id}:context"
         character_context = redis.get_cache(cache_key, as_json=True)
         if not character_context:
             character_context = conversation.ai_character_context or {}
 
+        # Rolling summary of older turns keeps the prompt size flat
+        conversation_summary = redis.get_cache(summary_cache_key(conversation_id), as_json=True)
+        if not isinstance(conversation_summary, dict):
+            conversation_summary = None
+
+        # Nothing is written until the AI has answered, so the connection can go back to the pool;
+        # current_user expires with it, so copy what the call needs first
+        user_id = current_user.id
+        priority = ai_priority(current_user)
+        release_connection(db)
+
         # Generate AI response
-        ai_response_result = await openrouter.generate_ai_response(
-            conversation_context={
-                "scenario_type": conversation.scenario_type,
-                "difficulty_level": conversation.difficulty_level,
-                "character": character_context
-            },
-            user_message=message_request.content,
-            conversation_history=conversation_history
-        )
+        try:
+            async with connection_released(db, "generate_ai_response"):
+                ai_response_result = await cancel_on_disconnect(
+                    http_request,
+                    openrouter.generate_ai_response(
+                        conversation_context={
+                            "scenario_type": scenario_type,
+                            "difficulty_level": difficulty_level,
+                            "character": character_context,
+                            "summary": conversation_summary
+                        },
+                        user_message=message_request.content,
+                        conversation_history=conversation_history,
+                        priority=priority,
+                        user_id=str(user_id)
+                    ),
+                    "generate_ai_response"
+                )
+        except ConcurrencyLimitError as e:
+            raise ai_busy(e)
 
         if not ai_response_result["success"]:
             logger.warning(f"AI response generation failed: {ai_response_result.get('error')}")
@@ -327,30 +420,67 @@ async def send_message(
         else:
             ai_response_data = ai_response_result["response"]
 
-        # Create AI message
+        # Short write transaction; the conversation may have ended while the AI was answering
+        conversation = db.query(Conversation).filter(
+            Conversation.id == conversation_id,
+            Conversation.user_id == user_id,
+            Conversation.status == "active"
+        ).first()
+
+        if not conversation:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Active conversation not found"
+            )
+
+        user_message = ConversationMessage(
+            conversation_id=conversation.id,
+            sender_type="user",
+            content=message_request.content,
+            message_order=message_count + 1
+        )
+
         ai_message = ConversationMessage(
             conversation_id=conversation.id,
             sender_type="ai",
             content=ai_response_data["content"],
-            message_order=len(messages) + 2,
-            ai_body_language=ai_response_data.get("body_language"),
+            message_order=message_count + 2,
+            ai_body_language=(ai_response_data.get("body_language") or "")[:100] or None,
             ai_receptiveness=ai_response_data.get("receptiveness")
         )
 
+        db.add(user_message)
         db.add(ai_message)
 
         # Update conversation stats
-        conversation.total_messages = len(messages) + 2
+        conversation.total_messages = message_count + 2
 
         db.commit()
         db.refresh(user_message)
         db.refresh(ai_message)
 
+        # Update the running assessment so ending the conversation only needs a finalization pass
+        queued = settings.enable_background_jobs and await job_manager.enqueue_assessment_job(
+            str(conversation.id),
+            conversation.total_messages
+        )
+        if not queued:
+            background_tasks.add_task(run_assessment_job, str(conversation.id))
+
+        # Compress older turns once the unsummarized tail outgrows the prompt window
+        if summary_needs_refresh(conversation_summary, conversation.total_messages):
+            queued = settings.enable_background_jobs and await job_manager.enqueue_summary_job(
+                str(conversation.id),
+                conversation.total_messages
+            )
+            if not queued:
+                background_tasks.add_task(run_summary_job, str(conversation.id))
+
         # Queue background jobs
         background_tasks.add_task(
             job_manager.enqueue_analytics_job,
             "message_sent",
-            str(current_user.id),
+            str(user_id),
             {
                 "conversation_id": str(conversation.id),
                 "message_length": len(message_request.content),
@@ -382,11 +512,11 @@ async def send_message(
             }
         }
 
-        return StandardResponse(
-            success=True,
-            data=response_data,
-            message="Message sent and AI response generated"
+        result = idempotency.complete(
+            fast_response(data=response_data, message="Message sent and AI response generated", response=response)
         )
+        completed = True
+        return result
 
     except HTTPException:
         raise
@@ -397,6 +527,10 @@ async def send_message(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to send message"
         )
+    finally:
+        # Also runs on cancellation, so a cancelled turn doesn't hold the key until its TTL
+        if not completed:
+            idempotency.release()
 
 
 @router.post("/{conversation_id}/end", response_model=StandardResponse)
@@ -404,11 +538,11 @@ async def end_conversation(
     conversation_id: str,
     background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
-    openrouter: OpenRouterService = Depends(get_openrouter_service)
+    db: Session = Depends(get_db)
 ):
     """
-    End conversation and generate feedback
+    End conversation and queue feedback generation
+    Feedback is produced by the background worker; poll GET /{conversation_id}/feedback for the result
     """
     try:
         conversation = db.query(Conversation).filter(
@@ -423,101 +557,44 @@ async def end_conversation(
                 detail="Active conversation not found"
             )
 
-        # Get conversation messages
-        messages = db.query(ConversationMessage).filter(
+        # Count conversation messages
+        message_count = db.query(ConversationMessage).filter(
             ConversationMessage.conversation_id == conversation_id
-        ).order_by(ConversationMessage.message_order).all()
+        ).count()
 
-        if len(messages) < 2:
+        if message_count < 2:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Conversation must have at least one exchange before ending"
             )
 
-        # Get user profile for feedback context
-        profile = db.query(UserProfile).filter(UserProfile.user_id == current_user.id).first()
-        user_goals = profile.primary_skills if profile else ["general_conversation"]
-
-        # Generate feedback
-        conversation_history = [
-            {
-                "sender": msg.sender_type,
-                "content": msg.content
-            }
-            for msg in messages
-        ]
-
-        feedback_result = await openrouter.generate_feedback(
-            conversation_history=conversation_history,
-            user_goals=user_goals,
-            scenario_context={
-                "scenario_type": conversation.scenario_type,
-                "difficulty_level": conversation.difficulty_level
-            }
-        )
-
-        if not feedback_result["success"]:
-            logger.warning(f"Feedback generation failed: {feedback_result.get('error')}")
-            feedback_data = feedback_result.get("fallback", {
-                "overall_score": 75,
-                "encouragement": "Great job practicing! Keep it up!"
-            })
-        else:
-            feedback_data = feedback_result["feedback"]
-
-        # Update conversation
+        # Complete the conversation now, feedback is filled in when ready
         conversation.status = "completed"
         conversation.end_time = datetime.utcnow()
-        conversation.session_score = feedback_data.get("overall_score", 75)
-        conversation.feedback_metrics = feedback_data
-
-        # Determine outcome level
-        score = conversation.session_score
-        if score >= 80:
-            conversation.outcome_level = "gold"
-        elif score >= 60:
-            conversation.outcome_level = "silver"
-        else:
-            conversation.outcome_level = "bronze"
 
         db.commit()
 
-        # Update user progress
-        background_tasks.add_task(
-            update_user_progress,
-            current_user.id,
-            conversation.session_score,
-            conversation.scenario_type,
-            len(messages)
-        )
-
-        # Queue analytics
-        background_tasks.add_task(
-            job_manager.enqueue_analytics_job,
-            "conversation_completed",
-            str(current_user.id),
-            {
-                "conversation_id": str(conversation.id),
-                "final_score": conversation.session_score,
-                "outcome_level": conversation.outcome_level,
-                "total_messages": len(messages),
-                "duration_minutes": (conversation.end_time - conversation.start_time).total_seconds() / 60
-            }
+        # Hand feedback generation to the worker, or run it in-process if the queue is unavailable
+        queued = settings.enable_background_jobs and await job_manager.enqueue_feedback_job(
+            str(conversation.id),
+            str(current_user.id)
         )
+        if not queued:
+            background_tasks.add_task(run_feedback_job, str(conversation.id))
 
         response_data = {
             "conversation_id": str(conversation.id),
-            "session_score": conversation.session_score,
-            "outcome_level": conversation.outcome_level,
-            "feedback": feedback_data,
-            "total_messages": len(messages),
+            "status": conversation.status,
+            "feedback_status": "pending",
+            "feedback_url": f"/api/v1/conversations/{conversation.id}/feedback",
+            "total_messages": message_count,
             "duration": str(conversation.end_time - conversation.start_time)
         }
 
         return StandardResponse(
             success=True,
             data=response_data,
-            message=f"Conversation completed! You earned {conversation.outcome_level} level performance."
+            message="Conversation completed! Your feedback is being prepared."
         )
 
     except HTTPException:
@@ -531,6 +608,80 @@ async def end_conversation(
         )
 
 
+@router.get("/{conversation_id}/feedback", response_model=StandardResponse, dependencies=[Depends(RateLimit("feedback"))])
+async def get_conversation_feedback(
+    conversation_id: str,
+    response: Response,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+    redis = Depends(get_redis)
+):
+    """
+    Get feedback for a completed conversation
+    Returns feedback_status "pending" until the background job has written feedback_metrics,
+    or "failed" once the job has given up
+    """
+    try:
+        conversation = db.query(Conversation).filter(
+            Conversation.id == conversation_id,
+            Conversation.user_id == current_user.id
+        ).first()
+
+        if not conversation:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Conversation not found"
+            )
+
+        if conversation.status == "active":
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Conversation must be ended before feedback is available"
+            )
+
+        if conversation.feedback_metrics is None:
+            if redis.get_cache(feedback_failed_cache_key(conversation_id)) is not None:
+                return fast_response(
+                    data={
+                        "conversation_id": str(conversation.id),
+                        "feedback_status": "failed"
+                    },
+                    message="Feedback could not be generated for this conversation.",
+                    response=response
+                )
+
+            return fast_response(
+                data={
+                    "conversation_id": str(conversation.id),
+                    "feedback_status": "pending"
+                },
+                meta={"retry_after_seconds": FEEDBACK_POLL_INTERVAL_SECONDS},
+                response=response
+            )
+
+        return fast_response(
+            data={
+                "conversation_id": str(conversation.id),
+                "feedback_status": "ready",
+                "session_score": conversation.session_score,
+                "outcome_level": conversation.outcome_level,
+                "feedback": conversation.feedback_metrics,
+                "total_messages": conversation.total_messages
+            },
+            message=f"You earned {conversation.outcome_level} level performance.",
+            response=response
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to get conversation feedback: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to retrieve conversation feedback"
+        )
+
+
 @router.get("/", response_model=StandardResponse)
 async def get_user_conversations(
     limit: int = 10,
@@ -567,8 +718,7 @@ async def get_user_conversations(
             for conv in conversations
         ]
 
-        return StandardResponse(
-            success=True,
+        return fast_response(
             data={
                 "conversations": conversation_data,
                 "total": len(conversation_data),
@@ -583,19 +733,3 @@ async def get_user_conversations(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to retrieve conversations"
         )
-
-
-# Background task functions
-async def update_user_progress(
-    user_id: str,
-    session_score: int,
-    scenario_type: str,
-    message_count: int
-):
-    """Update user progress after conversation"""
-    try:
-        # This would be implemented to update user progress
-        # XP, streaks, achievements, etc.
-        logger.info(f"Updating progress for user {user_id}: score={session_score}")
-    except Exception as e:
-        logger.error(f"Failed to update user progress: {e}")
\ No newline at end of file
@@ -11,6 +11,7 @@ from datetime import datetime
 
 from ..core.database import get_db
 from ..core.auth import get_current_user, get_current_active_user, log_auth_event
+from ..core.profile_cache import get_cached_profile, invalidate_user_cache
 from ..models.user import User, UserProfile, UserProgress, Scenario
 from ..schemas.user import (
     AgeVerificationRequest,
@@ -134,7 +135,7 @@ async def get_onboarding_flow(
     """
     try:
         # Get user's profile to determine progress
-        profile = db.query(UserProfile).filter(UserProfile.user_id == current_user.id).first()
+        profile = get_cached_profile(db, current_user.id)
 
         completed_steps = []
         if profile:
@@ -210,6 +211,7 @@ async def update_onboarding_progress(
             profile.onboarding_steps_skipped.append(progress_data.step_id)
 
         db.commit()
+        invalidate_user_cache(current_user.id)
 
         # Log progress event
         await log_auth_event(
@@ -264,6 +266,7 @@ async def verify_age(
             profile.onboarding_steps_completed.append("ageVerification")
 
         db.commit()
+        invalidate_user_cache(current_user.id)
 
         # Log age verification
         await log_auth_event(
@@ -318,6 +321,7 @@ async def set_user_preferences(
             profile.onboarding_steps_completed.append("preferences")
 
         db.commit()
+        invalidate_user_cache(current_user.id)
 
         # Log preferences update
         await log_auth_event(
@@ -373,6 +377,7 @@ async def set_skill_goals(
             profile.onboarding_steps_completed.append("skillGoals")
 
         db.commit()
+        invalidate_user_cache(current_user.id)
 
         # Log skill goals update
         await log_auth_event(
@@ -437,6 +442,7 @@ async def set_privacy_settings(
                 profile.onboarding_steps_completed.append(step)
 
         db.commit()
+        invalidate_user_cache(current_user.id)
 
         # Log privacy settings update
         await log_auth_event(
@@ -531,6 +537,7 @@ async def complete_onboarding(
                 progress.achievements_unlocked.append("onboarding_complete")
 
         db.commit()
+        invalidate_user_cache(current_user.id)
 
         # Log onboarding completion
         await log_auth_event(
@@ -580,7 +587,7 @@ async def get_user_profile(
     Get user's onboarding profile data
     """
     try:
-        profile = db.query(UserProfile).filter(UserProfile.user_id == current_user.id).first()
+        profile = get_cached_profile(db, current_user.id)
         if not profile:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -634,6 +641,7 @@ async def reset_onboarding(
             progress.level = 1
 
         db.commit()
+        invalidate_user_cache(current_user.id)
 
         await log_auth_event(
             event_type="onboarding_reset",
@@ -0,0 +1,42 @@
+"""
+Pydantic schemas for structured AI outputs
+Shapes the models are asked to return; also used to build the JSON schemas sent as response_format
+"""
+
+from pydantic import BaseModel, ConfigDict, Field
+from typing import List
+
+
+class GeneratedCharacter(BaseModel):
+    """Character generated for a conversation scenario"""
+    model_config = ConfigDict(extra="ignore")
+
+    appearance: str
+    body_language: str
+    current_activity: str
+    personality_traits: List[str] = Field(default_factory=list)
+    conversation_interests: List[str] = Field(default_factory=list)
+    approach_style: str = ""
+
+
+class SpecificSuggestion(BaseModel):
+    """Feedback on one user message"""
+    model_config = ConfigDict(extra="ignore")
+
+    message: str
+    feedback: str
+
+
+class ConversationFeedback(BaseModel):
+    """End-of-conversation feedback"""
+    model_config = ConfigDict(extra="ignore")
+
+    overall_score: int = Field(ge=0, le=100)
+    strengths: List[str]
+    areas_for_improvement: List[str]
+    specific_suggestions: List[SpecificSuggestion] = Field(default_factory=list)
+    conversation_flow_score: int = Field(ge=0, le=100)
+    confidence_level_score: int = Field(ge=0, le=100)
+    engagement_score: int = Field(ge=0, le=100)
+    next_practice_focus: str = ""
+    encouragement: str = ""
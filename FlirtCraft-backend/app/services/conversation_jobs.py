@@ -0,0 +1,410 @@
+"""
+Conversation background jobs for FlirtCraft Backend
+Long-running AI work that is queued by the API and executed by the worker
+"""
+
+import asyncio
+import logging
+from typing import Callable, Dict, Any, Optional, TypeVar
+
+from ..core.config import settings
+from ..core.database import SessionLocal
+from ..core.metrics import metrics
+from ..core.redis_client import redis_client, job_manager
+from ..models.user import Conversation, ConversationMessage, UserProfile
+from .openrouter import openrouter_service
+from .prompts import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Running per-turn assessment, kept for a day after the last turn
+ASSESSMENT_CACHE_TTL = 86400
+
+
+# Rolling summary of older turns, same lifetime as the assessment
+SUMMARY_CACHE_TTL = 86400
+
+# Marker for feedback that could not be generated, read by the polling endpoint
+FEEDBACK_FAILED_CACHE_TTL = 86400
+
+
+def assessment_cache_key(conversation_id: str) -> str:
+    """Redis key holding the running partial assessment for a conversation"""
+    return f"conversation:{conversation_id}:assessment"
+
+
+def summary_cache_key(conversation_id: str) -> str:
+    """Redis key holding the rolling summary of older turns for a conversation"""
+    return f"conversation:{conversation_id}:summary"
+
+
+def feedback_failed_cache_key(conversation_id: str) -> str:
+    """Redis key set when a conversation's feedback job gave up"""
+    return f"conversation:{conversation_id}:feedback_failed"
+
+
+def summary_needs_refresh(summary: Optional[Dict[str, Any]], total_messages: int) -> bool:
+    """True once more unsummarized messages have built up than the prompt window allows"""
+    summarized = summary.get("messages_summarized", 0) if summary else 0
+    return total_messages - summarized > settings.conversation_summary_trigger_messages
+
+
+def get_outcome_level(score: int) -> str:
+    """Map a 0-100 session score to its bronze/silver/gold outcome level"""
+    if score >= 80:
+        return "gold"
+    elif score >= 60:
+        return "silver"
+    return "bronze"
+
+
+def _load_feedback_inputs(conversation_id: str) -> Optional[Dict[str, Any]]:
+    """Everything the feedback prompt needs, read in one short session; None if the conversation is gone"""
+    db = SessionLocal()
+    try:
+        conversation = db.query(Conversation).filter(Conversation.id == conversation_id).first()
+        if not conversation:
+            return None
+
+        if conversation.feedback_metrics is not None:
+            # Duplicate delivery - feedback was already written
+            return {"done": True}
+
+        messages = db.query(ConversationMessage).filter(
+            ConversationMessage.conversation_id == conversation_id
+        ).order_by(ConversationMessage.message_order).all()
+
+        profile = db.query(UserProfile).filter(UserProfile.user_id == conversation.user_id).first()
+
+        return {
+            "done": False,
+            "user_id": str(conversation.user_id),
+            "user_goals": profile.primary_skills if profile else ["general_conversation"],
+            "scenario_context": {
+                "scenario_type": conversation.scenario_type,
+                "difficulty_level": conversation.difficulty_level
+            },
+            "conversation_history": [
+                {
+                    "sender": msg.sender_type,
+                    "content": msg.content
+                }
+                for msg in messages
+            ]
+        }
+    finally:
+        db.close()
+
+
+def _store_feedback(conversation_id: str, feedback_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Short write transaction with the finished feedback; None if the conversation is gone"""
+    db = SessionLocal()
+    try:
+        conversation = db.query(Conversation).filter(Conversation.id == conversation_id).first()
+        if not conversation:
+            return None
+
+        conversation.session_score = feedback_data.get("overall_score", 75)
+        conversation.outcome_level = get_outcome_level(conversation.session_score)
+        conversation.feedback_metrics = feedback_data
+
+        db.commit()
+
+        duration_minutes = None
+        if conversation.end_time and conversation.start_time:
+            duration_minutes = (conversation.end_time - conversation.start_time).total_seconds() / 60
+        return {
+            "session_score": conversation.session_score,
+            "outcome_level": conversation.outcome_level,
+            "duration_minutes": duration_minutes
+        }
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+async def _with_retries(step: Callable[[], T], description: str) -> T:
+    """Run a DB step, retrying failures with exponential backoff; the last failure is re-raised"""
+    attempts = max(1, settings.feedback_job_max_attempts)
+    for attempt in range(1, attempts + 1):
+        try:
+            return step()
+        except Exception as e:
+            if attempt == attempts:
+                raise
+            delay = settings.feedback_job_retry_backoff * 2 ** (attempt - 1)
+            logger.warning(f"{description} failed (attempt {attempt}/{attempts}), retrying in {delay:g}s: {e}")
+            await asyncio.sleep(delay)
+
+
+def _mark_feedback_failed(conversation_id: str, error: Exception):
+    """Record the terminal failure so the polling endpoint reports it instead of pending forever"""
+    metrics.increment("feedback_jobs_failed")
+    logger.error(f"Giving up on feedback for conversation {conversation_id}: {error}")
+    redis_client.set_cache(
+        feedback_failed_cache_key(conversation_id),
+        {"error": type(error).__name__},
+        ttl=FEEDBACK_FAILED_CACHE_TTL
+    )
+
+
+async def run_feedback_job(conversation_id: str) -> bool:
+    """
+    Generate end-of-conversation feedback and store it on the conversation
+    The DB session is closed while waiting on OpenRouter so the job never pins a pooled connection
+    Loading and storing are retried with backoff; once the attempts run out the conversation is marked
+    failed, which GET /conversations/{id}/feedback returns in place of "pending"
+    """
+    # Load everything the prompt needs, then release the connection
+    try:
+        inputs = await _with_retries(
+            lambda: _load_feedback_inputs(conversation_id),
+            f"Loading conversation {conversation_id} for feedback"
+        )
+    except Exception as e:
+        _mark_feedback_failed(conversation_id, e)
+        return False
+
+    if inputs is None:
+        logger.warning(f"Feedback job skipped, conversation {conversation_id} not found")
+        return False
+    if inputs["done"]:
+        return True
+
+    user_id = inputs["user_id"]
+    scenario_context = inputs["scenario_context"]
+    conversation_history = inputs["conversation_history"]
+
+    # Finalize from the running assessment when one exists, otherwise score the full transcript
+    partial_assessment = redis_client.get_cache(assessment_cache_key(conversation_id), as_json=True)
+    if not isinstance(partial_assessment, dict):
+        partial_assessment = None
+
+    conversation_summary = redis_client.get_cache(summary_cache_key(conversation_id), as_json=True)
+    if not isinstance(conversation_summary, dict):
+        conversation_summary = None
+
+    feedback_result = await openrouter_service.generate_feedback(
+        conversation_history=conversation_history,
+        user_goals=inputs["user_goals"],
+        scenario_context=scenario_context,
+        partial_assessment=partial_assessment,
+        conversation_summary=conversation_summary
+    )
+
+    if not feedback_result["success"]:
+        logger.warning(f"Feedback generation failed: {feedback_result.get('error')}")
+        feedback_data = feedback_result.get("fallback", {
+            "overall_score": 75,
+            "encouragement": "Great job practicing! Keep it up!"
+        })
+    else:
+        feedback_data = feedback_result["feedback"]
+
+    try:
+        stored = await _with_retries(
+            lambda: _store_feedback(conversation_id, feedback_data),
+            f"Storing feedback for conversation {conversation_id}"
+        )
+    except Exception as e:
+        _mark_feedback_failed(conversation_id, e)
+        return False
+
+    if stored is None:
+        return False
+
+    session_score = stored["session_score"]
+    outcome_level = stored["outcome_level"]
+
+    await update_user_progress(user_id, session_score, scenario_context["scenario_type"], len(conversation_history))
+
+    await job_manager.enqueue_analytics_job(
+        "conversation_completed",
+        user_id,
+        {
+            "conversation_id": str(conversation_id),
+            "final_score": session_score,
+            "outcome_level": outcome_level,
+            "total_messages": len(conversation_history),
+            "duration_minutes": stored["duration_minutes"]
+        }
+    )
+
+    redis_client.delete_cache(assessment_cache_key(conversation_id))
+    redis_client.delete_cache(summary_cache_key(conversation_id))
+    redis_client.delete_cache(feedback_failed_cache_key(conversation_id))
+
+    logger.info(f"Feedback ready for conversation {conversation_id}: score={session_score}")
+    return True
+
+
+async def run_assessment_job(conversation_id: str) -> bool:
+    """
+    Fold any turns not yet assessed into the conversation's running assessment
+    Catches up on every unassessed message, so a skipped or reordered job heals itself
+    """
+    cache_key = assessment_cache_key(conversation_id)
+    partial_assessment = redis_client.get_cache(cache_key, as_json=True)
+    if not isinstance(partial_assessment, dict):
+        partial_assessment = None
+    assessed = partial_assessment.get("messages_assessed", 0) if partial_assessment else 0
+
+    db = SessionLocal()
+    try:
+        conversation = db.query(Conversation).filter(Conversation.id == conversation_id).first()
+        if not conversation or conversation.status != "active":
+            return False
+
+        new_messages = db.query(ConversationMessage).filter(
+            ConversationMessage.conversation_id == conversation_id,
+            ConversationMessage.message_order > assessed
+        ).order_by(ConversationMessage.message_order).all()
+
+        if not new_messages:
+            return True
+
+        profile = db.query(UserProfile).filter(UserProfile.user_id == conversation.user_id).first()
+
+        user_goals = profile.primary_skills if profile else ["general_conversation"]
+        scenario_context = {
+            "scenario_type": conversation.scenario_type,
+            "difficulty_level": conversation.difficulty_level
+        }
+        messages_assessed = new_messages[-1].message_order
+        new_history = [
+            {
+                "sender": msg.sender_type,
+                "content": msg.content
+            }
+            for msg in new_messages
+        ]
+    except Exception as e:
+        logger.error(f"Failed to load conversation {conversation_id} for assessment: {e}")
+        return False
+    finally:
+        db.close()
+
+    result = await openrouter_service.update_assessment(
+        partial_assessment=partial_assessment,
+        new_messages=new_history,
+        user_goals=user_goals,
+        scenario_context=scenario_context
+    )
+
+    if not result["success"]:
+        # Keep the previous state, the next turn's job will retry these messages
+        logger.warning(f"Assessment update failed for conversation {conversation_id}: {result.get('error')}")
+        return False
+
+    # Don't overwrite a newer assessment written by a concurrent job
+    latest = redis_client.get_cache(cache_key, as_json=True)
+    if isinstance(latest, dict) and latest.get("messages_assessed", 0) >= messages_assessed:
+        return True
+
+    assessment = result["assessment"]
+    assessment["messages_assessed"] = messages_assessed
+    return redis_client.set_cache(cache_key, assessment, ttl=ASSESSMENT_CACHE_TTL)
+
+
+async def run_summary_job(conversation_id: str) -> bool:
+    """
+    Fold older turns into the conversation's rolling summary
+    Everything except the most recent messages is compressed, those stay verbatim in the prompt
+    """
+    cache_key = summary_cache_key(conversation_id)
+    summary = redis_client.get_cache(cache_key, as_json=True)
+    if not isinstance(summary, dict):
+        summary = None
+    summarized = summary.get("messages_summarized", 0) if summary else 0
+
+    db = SessionLocal()
+    try:
+        conversation = db.query(Conversation).filter(Conversation.id == conversation_id).first()
+        if not conversation or conversation.status != "active":
+            return False
+
+        messages = db.query(ConversationMessage).filter(
+            ConversationMessage.conversation_id == conversation_id,
+            ConversationMessage.message_order > summarized
+        ).order_by(ConversationMessage.message_order).all()
+
+        # Leave the most recent turns out of the summary
+        to_summarize = messages[:-settings.conversation_recent_messages] if settings.conversation_recent_messages else messages
+        if not to_summarize:
+            return True
+
+        scenario_context = {
+            "scenario_type": conversation.scenario_type,
+            "difficulty_level": conversation.difficulty_level
+        }
+        messages_summarized = to_summarize[-1].message_order
+        history = [
+            {
+                "sender": msg.sender_type,
+                "content": msg.content
+            }
+            for msg in to_summarize
+        ]
+    except Exception as e:
+        logger.error(f"Failed to load conversation {conversation_id} for summarization: {e}")
+        return False
+    finally:
+        db.close()
+
+    result = await openrouter_service.summarize_conversation(
+        previous_summary=summary.get("summary") if summary else None,
+        messages=history,
+        scenario_context=scenario_context
+    )
+
+    if not result["success"] or not result["summary"]:
+        logger.warning(f"Summarization failed for conversation {conversation_id}: {result.get('error')}")
+        return False
+
+    # Don't overwrite a newer summary written by a concurrent job
+    latest = redis_client.get_cache(cache_key, as_json=True)
+    if isinstance(latest, dict) and latest.get("messages_summarized", 0) >= messages_summarized:
+        return True
+
+    history_tokens = sum(estimate_tokens(msg["content"]) for msg in history)
+    summary_tokens = estimate_tokens(result["summary"])
+    logger.info(
+        f"Summarized conversation {conversation_id} through message {messages_summarized}: "
+        f"{history_tokens} -> {summary_tokens} tokens"
+    )
+
+    return redis_client.set_cache(
+        cache_key,
+        {
+            "summary": result["summary"],
+            "messages_summarized": messages_summarized
+        },
+        ttl=SUMMARY_CACHE_TTL
+    )
+
+
+async def update_user_progress(
+    user_id: str,
+    session_score: int,
+    scenario_type: str,
+    message_count: int
+):
+    """Update user progress after conversation"""
+    try:
+        # This would be implemented to update user progress
+        # XP, streaks, achievements, etc.
+        logger.info(f"Updating progress for user {user_id}: score={session_score}")
+    except Exception as e:
+        logger.error(f"Failed to update user progress: {e}")
+
+
+# Job handlers keyed by queue name, used by the background worker
+JOB_HANDLERS = {
+    "feedback": lambda data: run_feedback_job(data["conversation_id"]),
+    "conversation_assessment": lambda data: run_assessment_job(data["conversation_id"]),
+    "conversation_summary": lambda data: run_summary_job(data["conversation_id"]),
+}
@@ -0,0 +1,75 @@
+"""
+Body language cue parsing for FlirtCraft Backend
+Splits [bracketed] cues out of AI replies in one pass, whole or chunk by chunk as a reply streams in
+"""
+
+from typing import List, Optional, Tuple
+
+
+class CueTokenizer:
+    """
+    Single-pass splitter of [body language] cues from reply text
+    feed() can be called per streamed chunk and returns the cues that closed in it;
+    finish() returns the reply text with the cues removed
+    """
+
+    def __init__(self):
+        self._spans: List[List[str]] = [[]]  # reply text between cues, a new span after each cue
+        self._cue: Optional[List[str]] = None  # parts of the cue being read, None outside brackets
+        self.cues: List[str] = []
+
+    def feed(self, chunk: str) -> List[str]:
+        closed: List[str] = []
+        pos = 0
+        while pos < len(chunk):
+            if self._cue is None:
+                start = chunk.find("[", pos)
+                if start == -1:
+                    self._spans[-1].append(chunk[pos:])
+                    break
+                self._spans[-1].append(chunk[pos:start])
+                self._spans.append([])
+                self._cue = []
+                pos = start + 1
+            else:
+                end = chunk.find("]", pos)
+                if end == -1:
+                    self._cue.append(chunk[pos:])
+                    break
+                self._cue.append(chunk[pos:end])
+                cue = "".join(self._cue).strip()
+                self._cue = None
+                pos = end + 1
+                if cue:
+                    self.cues.append(cue)
+                    closed.append(cue)
+        return closed
+
+    def finish(self) -> str:
+        """Reply text without cues; only the whitespace around removed cues and at the ends is touched"""
+        if self._cue is not None:
+            # Unterminated bracket, keep it as text
+            self._spans.pop()
+            self._spans[-1].append("[" + "".join(self._cue))
+            self._cue = None
+
+        text = "".join(self._spans[0])
+        for parts in self._spans[1:]:
+            span = "".join(parts)
+            left, right = text.rstrip(" \t"), span.lstrip(" \t")
+            if left.endswith("\n") and right.startswith("\n"):
+                # The cue had a line to itself
+                right = right[1:]
+            spaced = left != text or right != span
+            gap = " " if spaced and left and right and not left.endswith("\n") and not right.startswith("\n") else ""
+            text = left + gap + right
+        return text.strip()
+
+
+def split_cues(text: str) -> Tuple[str, List[str]]:
+    """Clean content and every cue in a complete reply"""
+    if "[" not in text:
+        return text.strip(), []
+    tokenizer = CueTokenizer()
+    tokenizer.feed(text)
+    return tokenizer.finish(), tokenizer.cues
@@ -0,0 +1,216 @@
+"""
+Model routing for FlirtCraft Backend
+Per-call-site model selection, latency budgets and hedged requests to the fallback model
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# attempt(model, on_first_token) -> completion text
+AttemptFn = Callable[[str, Callable[[], None]], Awaitable[str]]
+
+# Cancellation message for attempts cut off by the call-site budget, so they can be told apart from
+# hedge losers and callers that went away
+BUDGET_EXPIRED = "budget_expired"
+
+
+@dataclass(frozen=True)
+class CallSite:
+    """Routing configuration for one kind of LLM call"""
+    name: str
+    primary_model: str
+    fallback_model: Optional[str]
+    budget: float  # seconds for the whole call, hedge included
+
+
+class LatencyTracker:
+    """Rolling window of time-to-first-token samples per model"""
+
+    def __init__(self, window: int = 200):
+        self.window = window
+        self._samples: Dict[str, Deque[float]] = {}
+
+    def record(self, model: str, seconds: float):
+        """Record one time-to-first-token sample"""
+        if model not in self._samples:
+            self._samples[model] = deque(maxlen=self.window)
+        self._samples[model].append(seconds)
+
+    def percentile(self, model: str, pct: float) -> Optional[float]:
+        """Latency percentile for a model, None until enough samples exist"""
+        samples = self._samples.get(model)
+        if not samples or len(samples) < settings.ai_hedge_min_samples:
+            return None
+        ordered = sorted(samples)
+        index = min(len(ordered) - 1, int(len(ordered) * pct / 100))
+        return ordered[index]
+
+    def snapshot(self) -> Dict[str, Dict[str, Optional[float]]]:
+        """Current p50/p95 per model"""
+        return {
+            model: {
+                "samples": len(samples),
+                "p50": self.percentile(model, 50),
+                "p95": self.percentile(model, 95)
+            }
+            for model, samples in self._samples.items()
+        }
+
+
+class _Attempt:
+    """One in-flight request to a single model"""
+
+    def __init__(self, model: str, attempt_fn: AttemptFn, tracker: LatencyTracker):
+        self.model = model
+        self.started = time.monotonic()
+        self.first_token = asyncio.Event()
+        self._tracker = tracker
+        self.task = asyncio.create_task(attempt_fn(model, self._on_first_token))
+        self.token_waiter = asyncio.create_task(self.first_token.wait())
+        self._cancel_requested = False
+
+    def _on_first_token(self):
+        if not self.first_token.is_set():
+            self._tracker.record(self.model, time.monotonic() - self.started)
+            self.first_token.set()
+
+    @property
+    def answering(self) -> bool:
+        """Produced a first token or finished successfully"""
+        if self.first_token.is_set():
+            return True
+        return self.task.done() and not self.task.cancelled() and self.task.exception() is None
+
+    @property
+    def failed(self) -> bool:
+        return self.task.done() and (self.task.cancelled() or self.task.exception() is not None)
+
+    def cancel(self, reason: Optional[str] = None):
+        # Only the first request counts: a second Task.cancel() would drop the reason
+        if self._cancel_requested:
+            return
+        self._cancel_requested = True
+        self.task.cancel(reason)
+        self.token_waiter.cancel()
+
+
+class ModelRouter:
+    """
+    Routes each call site to its primary model within a latency budget
+    If the primary hasn't produced a first token within its p95, a hedged request goes to the
+    fallback model and whichever answers first wins; the other request is cancelled
+    """
+
+    def __init__(self):
+        self.latency = LatencyTracker()
+        self.hedges_fired = 0
+        self.hedges_won = 0
+
+    def route(self, call_site: str) -> CallSite:
+        """Resolve models and budget for a call site"""
+        primary = settings.feedback_ai_model if call_site == "feedback" else settings.primary_ai_model
+        fallback = settings.fallback_ai_model
+        if fallback == primary:
+            fallback = None
+
+        budget = settings.ai_latency_budgets.get(call_site, settings.ai_response_timeout)
+        return CallSite(
+            name=call_site,
+            primary_model=primary,
+            fallback_model=fallback,
+            budget=min(budget, settings.ai_response_timeout)
+        )
+
+    def hedge_delay(self, site: CallSite) -> float:
+        """How long to wait for the primary's first token before hedging"""
+        p95 = self.latency.percentile(site.primary_model, 95)
+        if p95 is None:
+            # Not enough history yet, hedge only when the primary is clearly slow
+            return site.budget / 2
+        return min(p95, site.budget / 2)
+
+    async def call(self, call_site: str, attempt_fn: AttemptFn) -> Tuple[str, str]:
+        """Run a call within its budget, returns (content, model that answered)"""
+        site = self.route(call_site)
+        hedged = asyncio.ensure_future(self._hedged(site, attempt_fn))
+        try:
+            done, _ = await asyncio.wait({hedged}, timeout=site.budget)
+        except asyncio.CancelledError:
+            hedged.cancel()
+            raise
+
+        if not done:
+            # Attempts still running see BUDGET_EXPIRED, which their breakers record as a failure
+            hedged.cancel(BUDGET_EXPIRED)
+            await asyncio.wait({hedged})
+            raise asyncio.TimeoutError(f"{call_site} call exceeded its {site.budget:.1f}s budget")
+        return hedged.result()
+
+    async def _hedged(self, site: CallSite, attempt_fn: AttemptFn) -> Tuple[str, str]:
+        attempts: List[_Attempt] = [_Attempt(site.primary_model, attempt_fn, self.latency)]
+        try:
+            if site.fallback_model:
+                primary = attempts[0]
+                await asyncio.wait(
+                    [primary.token_waiter, primary.task],
+                    timeout=self.hedge_delay(site),
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                if not primary.answering:
+                    if not primary.failed:
+                        self.hedges_fired += 1
+                        logger.info(f"Hedging {site.name} call to {site.fallback_model}")
+                    attempts.append(_Attempt(site.fallback_model, attempt_fn, self.latency))
+
+            winner = await self._first_answering(attempts)
+            for attempt in attempts:
+                if attempt is not winner:
+                    attempt.cancel()
+
+            if winner.model != site.primary_model:
+                self.hedges_won += 1
+
+            return await winner.task, winner.model
+
+        except asyncio.CancelledError as e:
+            reason = e.args[0] if e.args else None
+            for attempt in attempts:
+                attempt.cancel(reason)
+            raise
+        finally:
+            for attempt in attempts:
+                attempt.cancel()
+
+    async def _first_answering(self, attempts: List[_Attempt]) -> _Attempt:
+        """Wait until one attempt answers, raising the last error if all of them fail"""
+        while True:
+            for attempt in attempts:
+                if attempt.answering:
+                    return attempt
+
+            pending = [attempt for attempt in attempts if not attempt.failed]
+            if not pending:
+                # Every attempt failed, surface the most recent error
+                errors = [attempt.task.exception() for attempt in attempts if not attempt.task.cancelled()]
+                raise errors[-1] if errors else asyncio.CancelledError()
+
+            waiters = []
+            for attempt in pending:
+                waiters.extend([attempt.token_waiter, attempt.task])
+            await asyncio.wait(waiters, return_when=asyncio.FIRST_COMPLETED)
+
+    def get_stats(self) -> Dict[str, object]:
+        """Routing and hedging statistics"""
+        return {
+            "latency": self.latency.snapshot(),
+            "hedges_fired": self.hedges_fired,
+            "hedges_won": self.hedges_won
+        }
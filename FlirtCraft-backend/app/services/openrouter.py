@@ -4,15 +4,47 @@ Handles AI conversation generation and context creation
 """
 
 import httpx
+import asyncio
 import logging
 import json
-from typing import Dict, Any, List, Optional
+import os
+import time
+from typing import Callable, Dict, Any, List, Optional, Tuple
 from datetime import datetime
 
 from ..core.config import settings
+from ..core.metrics import metrics
+from .model_router import BUDGET_EXPIRED, ModelRouter
+from .resilience import (
+    AdaptiveConcurrencyLimiter,
+    BreakerRegistry,
+    CircuitBreaker,
+    CircuitOpenError,
+    ConcurrencyLimitError,
+    SingleFlight
+)
+from .scheduler import RequestScheduler
+from .prompts import (
+    ASSESSMENT_PROMPT,
+    CONVERSATION_PROMPT,
+    FEEDBACK_PROMPT,
+    FINALIZATION_PROMPT,
+    SUMMARY_PROMPT,
+    Prompt,
+    estimate_tokens,
+    render_transcript
+)
+from .cues import split_cues
+from .scenario_content import character_prompt
+from .structured_output import extract_json_object, json_schema_format, parse_structured, supports_json_schema
+from ..schemas.ai import ConversationFeedback, GeneratedCharacter
 
 logger = logging.getLogger(__name__)
 
+# Built once, sent as response_format to models that support JSON schema output
+CHARACTER_RESPONSE_FORMAT = json_schema_format(GeneratedCharacter)
+FEEDBACK_RESPONSE_FORMAT = json_schema_format(ConversationFeedback)
+
 
 class OpenRouterError(Exception):
     """Custom exception for OpenRouter API errors"""
@@ -31,6 +63,56 @@ class OpenRouterService:
             "HTTP-Referer": "https://flirtcraft.app",
             "X-Title": "FlirtCraft"
         }
+        self.router = ModelRouter()
+        self.breakers = BreakerRegistry()
+        self.limiter = AdaptiveConcurrencyLimiter()
+        self.scheduler = RequestScheduler(self.limiter)
+        self.single_flight = SingleFlight()
+        self._client: Optional[httpx.AsyncClient] = None
+        metrics.register_collector(self.get_metrics)
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Shared HTTP client so upstream connections are reused across calls"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers=self.headers,
+                timeout=settings.ai_response_timeout,
+                limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+                http2=settings.openrouter_http2  # multiplexes concurrent calls over one connection
+            )
+        return self._client
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Breaker states, concurrency limit and routing stats for /metrics"""
+        return {
+            "openrouter": {
+                "circuit_breakers": self.breakers.snapshot(),
+                "concurrency": {
+                    "limit": int(self.limiter.limit),
+                    "in_flight": self.limiter.in_flight
+                },
+                "queues": self.scheduler.snapshot(),
+                "coalesced_in_flight": self.single_flight.in_flight,
+                "routing": self.router.get_stats()
+            }
+        }
+
+    def reset_after_fork(self):
+        """Forget the parent's HTTP client; a forked worker opens its own connections on first use"""
+        self._client = None
+
+    async def close(self):
+        """Close the shared HTTP client"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def warm(self) -> Dict[str, Any]:
+        """Establish the upstream connection (TCP + TLS, HTTP/2 when negotiated) ahead of traffic"""
+        response = await self.client.get("/models", timeout=10.0)
+        return {"connected": response.status_code == 200, "http_version": response.http_version}
 
     async def health_check(self) -> Dict[str, Any]:
         """Check OpenRouter API health"""
@@ -43,12 +125,7 @@ class OpenRouterService:
                     "error": "API key not configured"
                 }
 
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.base_url}/models",
-                    headers=self.headers,
-                    timeout=10.0
-                )
+            response = await self.client.get("/models", timeout=10.0)
 
             if response.status_code == 200:
                 return {
@@ -78,21 +155,27 @@ class OpenRouterService:
         self,
         scenario_type: str,
         difficulty_level: str,
-        user_preferences: Optional[Dict[str, Any]] = None
+        user_preferences: Optional[Dict[str, Any]] = None,
+        priority: str = "free",
+        user_id: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Generate AI character context for conversation scenarios
+        Raises ConcurrencyLimitError when the request is shed; other failures return a fallback character
         """
         try:
             # Build prompt for character generation
             prompt = self._build_character_prompt(scenario_type, difficulty_level, user_preferences)
 
             # Call OpenRouter API
-            response_data = await self._call_openrouter(
+            response_data, model_used = await self._call_openrouter(
                 prompt=prompt,
-                model="anthropic/claude-3-haiku",
+                call_site="character",
                 max_tokens=800,
-                temperature=0.7
+                temperature=0.7,
+                response_format=CHARACTER_RESPONSE_FORMAT,
+                priority=priority,
+                user_id=user_id
             )
 
             # Parse and structure the response
@@ -104,10 +187,13 @@ class OpenRouterService:
                 "meta": {
                     "scenario_type": scenario_type,
                     "difficulty_level": difficulty_level,
+                    "model_used": model_used,
                     "generated_at": datetime.utcnow().isoformat()
                 }
             }
 
+        except ConcurrencyLimitError:
+            raise
         except Exception as e:
             logger.error(f"Character generation failed: {e}")
             return {
@@ -120,10 +206,13 @@ class OpenRouterService:
         self,
         conversation_context: Dict[str, Any],
         user_message: str,
-        conversation_history: List[Dict[str, str]]
+        conversation_history: List[Dict[str, str]],
+        priority: str = "free",
+        user_id: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Generate AI response to user message in conversation
+        Raises ConcurrencyLimitError when the request is shed; other failures return a fallback reply
         """
         try:
             # Build conversation prompt
@@ -132,13 +221,18 @@ class OpenRouterService:
                 user_message,
                 conversation_history
             )
+            prompt_tokens = prompt.tokens
+            transcript_tokens = sum(estimate_tokens(msg["content"]) for msg in conversation_history)
+            logger.debug(f"Conversation prompt: {prompt_tokens} tokens (full transcript {transcript_tokens} tokens)")
 
             # Call OpenRouter API
-            response_data = await self._call_openrouter(
+            response_data, model_used = await self._call_openrouter(
                 prompt=prompt,
-                model="anthropic/claude-3-haiku",
+                call_site="chat",
                 max_tokens=300,
-                temperature=0.8
+                temperature=0.8,
+                priority=priority,
+                user_id=user_id
             )
 
             # Parse response for conversation elements
@@ -148,11 +242,15 @@ class OpenRouterService:
                 "success": True,
                 "response": ai_response,
                 "meta": {
-                    "model_used": "anthropic/claude-3-haiku",
+                    "model_used": model_used,
+                    "prompt_tokens": prompt_tokens,
+                    "transcript_tokens": transcript_tokens,
                     "generated_at": datetime.utcnow().isoformat()
                 }
             }
 
+        except ConcurrencyLimitError:
+            raise
         except Exception as e:
             logger.error(f"AI response generation failed: {e}")
             return {
@@ -165,21 +263,45 @@ class OpenRouterService:
         self,
         conversation_history: List[Dict[str, str]],
         user_goals: List[str],
-        scenario_context: Dict[str, Any]
+        scenario_context: Dict[str, Any],
+        partial_assessment: Optional[Dict[str, Any]] = None,
+        conversation_summary: Optional[Dict[str, Any]] = None
     ) -> Dict[str, Any]:
         """
         Generate personalized feedback for conversation performance
+        With a partial assessment only the turns it hasn't covered are sent, as a short finalization prompt
         """
         try:
             # Build feedback prompt
-            prompt = self._build_feedback_prompt(conversation_history, user_goals, scenario_context)
+            if partial_assessment:
+                assessed = partial_assessment.get("messages_assessed", 0)
+                prompt = self._build_finalization_prompt(
+                    partial_assessment,
+                    conversation_history[assessed:],
+                    user_goals,
+                    scenario_context
+                )
+                max_tokens = 700
+            else:
+                prompt = self._build_feedback_prompt(
+                    conversation_history,
+                    user_goals,
+                    scenario_context,
+                    conversation_summary
+                )
+                max_tokens = 1000
+
+            prompt_tokens = prompt.tokens
+            transcript_tokens = sum(estimate_tokens(msg["content"]) for msg in conversation_history)
+            logger.debug(f"Feedback prompt: {prompt_tokens} tokens (full transcript {transcript_tokens} tokens)")
 
             # Call OpenRouter API
-            response_data = await self._call_openrouter(
+            response_data, model_used = await self._call_openrouter(
                 prompt=prompt,
-                model="anthropic/claude-3-sonnet",
-                max_tokens=1000,
-                temperature=0.3
+                call_site="feedback",
+                max_tokens=max_tokens,
+                temperature=0.3,
+                response_format=FEEDBACK_RESPONSE_FORMAT
             )
 
             # Parse feedback response
@@ -191,6 +313,10 @@ class OpenRouterService:
                 "meta": {
                     "conversation_length": len(conversation_history),
                     "user_goals": user_goals,
+                    "model_used": model_used,
+                    "finalized_from_partial": bool(partial_assessment),
+                    "prompt_tokens": prompt_tokens,
+                    "transcript_tokens": transcript_tokens,
                     "generated_at": datetime.utcnow().isoformat()
                 }
             }
@@ -203,23 +329,135 @@ class OpenRouterService:
                 "fallback": self._get_fallback_feedback(conversation_history)
             }
 
+    async def update_assessment(
+        self,
+        partial_assessment: Optional[Dict[str, Any]],
+        new_messages: List[Dict[str, str]],
+        user_goals: List[str],
+        scenario_context: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        Fold the latest conversation turns into the running partial assessment
+        Cheap per-turn scoring so end-of-session feedback only needs a finalization pass
+        """
+        try:
+            prompt = self._build_assessment_prompt(partial_assessment, new_messages, user_goals, scenario_context)
+
+            response_data, _ = await self._call_openrouter(
+                prompt=prompt,
+                call_site="assessment",
+                max_tokens=400,
+                temperature=0.2
+            )
+
+            assessment = self._parse_assessment_response(response_data)
+            if assessment is None:
+                return {
+                    "success": False,
+                    "error": "Assessment response was not valid JSON"
+                }
+
+            return {
+                "success": True,
+                "assessment": assessment
+            }
+
+        except Exception as e:
+            logger.error(f"Assessment update failed: {e}")
+            return {
+                "success": False,
+                "error": str(e)
+            }
+
+    async def summarize_conversation(
+        self,
+        previous_summary: Optional[str],
+        messages: List[Dict[str, str]],
+        scenario_context: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        Compress older conversation turns into the running summary
+        Keeps chat and feedback prompts roughly constant in size as conversations grow
+        """
+        try:
+            prompt = self._build_summary_prompt(previous_summary, messages, scenario_context)
+
+            response_data, _ = await self._call_openrouter(
+                prompt=prompt,
+                call_site="summary",
+                max_tokens=250,
+                temperature=0.2
+            )
+
+            return {
+                "success": True,
+                "summary": response_data.strip()
+            }
+
+        except Exception as e:
+            logger.error(f"Conversation summarization failed: {e}")
+            return {
+                "success": False,
+                "error": str(e)
+            }
+
     async def _call_openrouter(
         self,
-        prompt: str,
-        model: str = "anthropic/claude-3-haiku",
+        prompt: Prompt,
+        call_site: str = "chat",
         max_tokens: int = 500,
-        temperature: float = 0.7
-    ) -> str:
-        """Make API call to OpenRouter"""
+        temperature: float = 0.7,
+        response_format: Optional[Dict[str, Any]] = None,
+        priority: str = "background",
+        user_id: Optional[str] = None
+    ) -> Tuple[str, str]:
+        """
+        Make API call to OpenRouter through the model router
+        Returns the completion text and the model that produced it
+        response_format is only sent to models listed in ai_json_schema_model_prefixes
+        Call sites in ai_coalesced_call_sites share one upstream call between concurrent identical requests
+        of the same priority class, so a free or background leader never decides how a premium caller is
+        scheduled; the shared call takes one fair-queue slot, charged to the user who started it
+        priority (premium, free or background) and user_id place the call in the scheduler's queues when
+        the concurrency limit is reached; ConcurrencyLimitError is raised as-is when it is shed
+        """
+        if call_site in settings.ai_coalesced_call_sites:
+            key = (
+                prompt.normalized(),
+                call_site,
+                priority,
+                max_tokens,
+                temperature,
+                json.dumps(response_format, sort_keys=True) if response_format else None
+            )
+            result, shared = await self.single_flight.do(
+                key,
+                lambda: self._call_upstream(
+                    prompt, call_site, max_tokens, temperature, response_format, priority, user_id
+                )
+            )
+            if shared:
+                metrics.increment("llm_calls_coalesced", call_site=call_site)
+            return result
+
+        return await self._call_upstream(
+            prompt, call_site, max_tokens, temperature, response_format, priority, user_id
+        )
+
+    async def _call_upstream(
+        self,
+        prompt: Prompt,
+        call_site: str,
+        max_tokens: int,
+        temperature: float,
+        response_format: Optional[Dict[str, Any]],
+        priority: str,
+        user_id: Optional[str]
+    ) -> Tuple[str, str]:
+        """One scheduled, routed (and possibly hedged) completion request"""
         try:
             payload = {
-                "model": model,
-                "messages": [
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
+                "messages": prompt.messages(),
                 "max_tokens": max_tokens,
                 "temperature": temperature,
                 "top_p": 1,
@@ -227,185 +465,252 @@ class OpenRouterService:
                 "presence_penalty": 0
             }
 
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.base_url}/chat/completions",
-                    headers=self.headers,
-                    json=payload,
-                    timeout=30.0
-                )
+            # Wait for a slot by priority class; sheds with ConcurrencyLimitError when the queue is saturated
+            try:
+                await self.scheduler.acquire(priority, user_id)
+            except ConcurrencyLimitError:
+                metrics.increment("llm_calls_rejected", reason="concurrency_limit", call_site=call_site)
+                raise
+
+            # Text streamed so far per attempt, to estimate what a cancellation saved
+            streamed: Dict[str, List[str]] = {}
+            budget = self.router.route(call_site).budget
+            slow_after = CircuitBreaker.slow_call_threshold(budget)
+
+            async def attempt(model: str, on_first_token: Callable[[], None]) -> str:
+                breaker = self.breakers.get(model)
+                if not breaker.allow():
+                    metrics.increment("llm_calls_rejected", reason="circuit_open", model=model)
+                    raise CircuitOpenError(f"Circuit open for {model}")
+
+                body = payload
+                if response_format and supports_json_schema(model):
+                    body = {**payload, "response_format": response_format}
+
+                started = time.monotonic()
+                try:
+                    content = await self._stream_completion(model, body, on_first_token, streamed.setdefault(model, []))
+                except asyncio.CancelledError as e:
+                    if e.args and e.args[0] == BUDGET_EXPIRED:
+                        # Ran past the call-site budget: a timeout, counted against the model
+                        breaker.record_failure()
+                    else:
+                        # Lost a hedge race or the caller gave up, not the model's fault
+                        breaker.release_probe()
+                    raise
+                except Exception:
+                    breaker.record_failure()
+                    raise
+
+                breaker.record_success(time.monotonic() - started, slow_after=slow_after)
+                return content
+
+            started = time.monotonic()
+            target_latency = budget / 2
+            try:
+                content, model_used = await self.router.call(call_site, attempt)
+            except asyncio.CancelledError:
+                # Caller gave up (client disconnected): the rest of the completion is never generated
+                self.scheduler.release_unmeasured()
+                received = max((estimate_tokens("".join(chunks)) for chunks in streamed.values()), default=0)
+                metrics.increment("llm_calls_cancelled", call_site=call_site)
+                metrics.increment("llm_tokens_saved", max(0, max_tokens - received), call_site=call_site)
+                raise
+            except CircuitOpenError:
+                # Failed fast without touching the upstream
+                self.scheduler.release_unmeasured()
+                raise
+            except Exception:
+                self.scheduler.release(ok=False, latency=time.monotonic() - started, target_latency=target_latency)
+                metrics.increment("llm_calls", call_site=call_site, outcome="error")
+                raise
+
+            latency = time.monotonic() - started
+            self.scheduler.release(ok=True, latency=latency, target_latency=target_latency)
+            metrics.increment("llm_calls", call_site=call_site, outcome="success")
+            metrics.observe("llm_call_seconds", latency, call_site=call_site, model=model_used)
+            return content, model_used
+
+        except ConcurrencyLimitError:
+            # Shed before reaching the upstream; callers turn this into 503 + Retry-After
+            raise
+        except Exception as e:
+            logger.error(f"OpenRouter API call failed: {e}")
+            raise OpenRouterError(f"Failed to call OpenRouter API: {e}")
 
+    async def _stream_completion(
+        self,
+        model: str,
+        payload: Dict[str, Any],
+        on_first_token: Callable[[], None],
+        chunks: Optional[List[str]] = None
+    ) -> str:
+        """Stream one chat completion, signalling when the first token arrives; deltas are appended to chunks"""
+        chunks = [] if chunks is None else chunks
+
+        async with self.client.stream(
+            "POST",
+            "/chat/completions",
+            json={**payload, "model": model, "stream": True}
+        ) as response:
             if response.status_code != 200:
-                raise OpenRouterError(f"API call failed: {response.status_code} - {response.text}")
+                body = await response.aread()
+                raise OpenRouterError(f"API call failed: {response.status_code} - {body.decode(errors='replace')}")
 
-            response_json = response.json()
-            return response_json["choices"][0]["message"]["content"]
+            async for line in response.aiter_lines():
+                # Skip SSE comments and keep-alives
+                if not line.startswith("data: "):
+                    continue
 
-        except Exception as e:
-            logger.error(f"OpenRouter API call failed: {e}")
-            raise OpenRouterError(f"Failed to call OpenRouter API: {e}")
+                data = line[len("data: "):]
+                if data == "[DONE]":
+                    break
+
+                event = json.loads(data)
+                if "error" in event:
+                    raise OpenRouterError(f"Stream error from {model}: {event['error']}")
+
+                choices = event.get("choices") or [{}]
+                delta = choices[0].get("delta", {}).get("content")
+                if delta:
+                    on_first_token()
+                    chunks.append(delta)
+
+        return "".join(chunks)
 
     def _build_character_prompt(
         self,
         scenario_type: str,
         difficulty_level: str,
         user_preferences: Optional[Dict[str, Any]] = None
-    ) -> str:
+    ) -> Prompt:
         """Build prompt for character generation"""
-
-        scenario_descriptions = {
-            "coffee_shop": "a cozy coffee shop with soft background music",
-            "bookstore": "a quiet bookstore with tall shelves and reading nooks",
-            "park": "a sunny park with walking paths and outdoor activities",
-            "campus": "a university campus with students and academic atmosphere",
-            "grocery": "a grocery store during a casual shopping trip",
-            "gym": "a fitness center with workout equipment and active atmosphere",
-            "bar": "a social bar or pub with lively conversation",
-            "gallery": "an art gallery or cultural event with sophisticated atmosphere"
-        }
-
-        difficulty_descriptions = {
-            "green": "very approachable and clearly interested in conversation",
-            "yellow": "polite but neutral, requiring some effort to engage",
-            "red": "busy or distracted, requiring skillful and respectful approach"
-        }
-
-        scenario_desc = scenario_descriptions.get(scenario_type, "a social setting")
-        difficulty_desc = difficulty_descriptions.get(difficulty_level, "moderately approachable")
-
-        # Build gender preference if available
-        gender_text = ""
-        if user_preferences and user_preferences.get("target_gender"):
-            gender = user_preferences["target_gender"]
-            if gender == "male":
-                gender_text = "Create a male character."
-            elif gender == "female":
-                gender_text = "Create a female character."
-
-        prompt = f"""You are creating a realistic character for a conversation practice scenario in {scenario_desc}. The character should be {difficulty_desc}.
-
-{gender_text}
-
-Please provide:
-1. Physical appearance (age, style, what they're wearing/doing)
-2. Body language that matches the {difficulty_level} difficulty level
-3. Current activity or what they're focused on
-4. Personality traits that would influence how they respond to approaches
-5. Potential conversation topics they might be interested in
-
-Keep the description natural and realistic. The character should feel like a real person someone might encounter in this setting.
-
-Format your response as a JSON object with these keys:
-- "appearance": Physical description
-- "body_language": Current body language and demeanor
-- "current_activity": What they're doing right now
-- "personality_traits": List of 3-4 key personality traits
-- "conversation_interests": List of topics they'd be interested in discussing
-- "approach_style": How they typically respond to people approaching them
-"""
-
-        return prompt
+        target_gender = user_preferences.get("target_gender") if user_preferences else None
+        return character_prompt(scenario_type, difficulty_level, target_gender)
 
     def _build_conversation_prompt(
         self,
         conversation_context: Dict[str, Any],
         user_message: str,
         conversation_history: List[Dict[str, str]]
-    ) -> str:
+    ) -> Prompt:
         """Build prompt for AI conversation response"""
 
         # Extract character details
         character = conversation_context.get("character", {})
-        scenario = conversation_context.get("scenario_type", "coffee_shop")
-        difficulty = conversation_context.get("difficulty_level", "green")
-
-        # Build conversation history text
-        history_text = ""
-        if conversation_history:
-            for msg in conversation_history[-5:]:  # Last 5 messages for context
-                role = "User" if msg["sender"] == "user" else "AI"
-                history_text += f"{role}: {msg['content']}\n"
-
-        prompt = f"""You are roleplaying as a character in a {scenario} scenario. Here are your character details:
-
-Character: {character.get('appearance', 'A person in their twenties')}
-Body Language: {character.get('body_language', 'Relaxed and approachable')}
-Current Activity: {character.get('current_activity', 'Enjoying their time here')}
-Personality: {', '.join(character.get('personality_traits', ['Friendly', 'Conversational']))}
-Interests: {', '.join(character.get('conversation_interests', ['General topics']))}
-
-Difficulty Level: {difficulty} (this affects how receptive you are to conversation)
-
-Previous conversation:
-{history_text}
-
-The user just said: "{user_message}"
-
-Respond as this character would, staying true to their personality and the difficulty level. Your response should:
-1. Be natural and realistic for this scenario
-2. Match your character's personality and current mood
-3. Reflect the appropriate level of interest based on difficulty
-4. Include subtle body language cues in [brackets] if relevant
-5. Keep responses conversational and not too long (1-3 sentences typically)
+        values = {
+            "scenario": conversation_context.get("scenario_type", "coffee_shop"),
+            "appearance": character.get("appearance", "A person in their twenties"),
+            "body_language": character.get("body_language", "Relaxed and approachable"),
+            "current_activity": character.get("current_activity", "Enjoying their time here"),
+            "personality": ", ".join(character.get("personality_traits", ["Friendly", "Conversational"])),
+            "interests": ", ".join(character.get("conversation_interests", ["General topics"])),
+            "difficulty": conversation_context.get("difficulty_level", "green"),
+            "user_message": user_message
+        }
 
-Response:"""
+        # Older turns are carried by the running summary, only unsummarized turns are sent verbatim
+        summary = conversation_context.get("summary") or {}
+        summarized = summary.get("messages_summarized", 0)
+        recent_history = conversation_history[summarized:][-settings.conversation_summary_trigger_messages:]
 
-        return prompt
+        history = render_transcript(
+            recent_history,
+            partner_label="AI",
+            summary=summary.get("summary"),
+            budget=CONVERSATION_PROMPT.remaining_budget("chat", **values),
+            call_site="chat"
+        )
+        return CONVERSATION_PROMPT.render(history=history, **values)
 
     def _build_feedback_prompt(
         self,
         conversation_history: List[Dict[str, str]],
         user_goals: List[str],
-        scenario_context: Dict[str, Any]
-    ) -> str:
+        scenario_context: Dict[str, Any],
+        conversation_summary: Optional[Dict[str, Any]] = None
+    ) -> Prompt:
         """Build prompt for feedback generation"""
+        values = {
+            "scenario": scenario_context.get("scenario_type", "social setting"),
+            "goals": ", ".join(user_goals) if user_goals else "general conversation skills"
+        }
 
-        # Convert conversation history to text
-        conversation_text = ""
-        for msg in conversation_history:
-            role = "User" if msg["sender"] == "user" else "AI Partner"
-            conversation_text += f"{role}: {msg['content']}\n"
-
-        goals_text = ", ".join(user_goals) if user_goals else "general conversation skills"
-        scenario = scenario_context.get("scenario_type", "social setting")
-
-        prompt = f"""You are a conversation coach providing feedback on a practice conversation.
-
-Scenario: {scenario}
-User's Goals: {goals_text}
-
-Conversation:
-{conversation_text}
+        # Older turns come from the running summary
+        summary = None
+        summarized = 0
+        if conversation_summary and conversation_summary.get("summary"):
+            summary = conversation_summary["summary"]
+            summarized = conversation_summary.get("messages_summarized", 0)
+
+        conversation = render_transcript(
+            conversation_history[summarized:],
+            summary=summary,
+            budget=FEEDBACK_PROMPT.remaining_budget("feedback", **values),
+            call_site="feedback"
+        )
+        return FEEDBACK_PROMPT.render(conversation=conversation, **values)
+
+    def _build_assessment_prompt(
+        self,
+        partial_assessment: Optional[Dict[str, Any]],
+        new_messages: List[Dict[str, str]],
+        user_goals: List[str],
+        scenario_context: Dict[str, Any]
+    ) -> Prompt:
+        """Build prompt for incremental per-turn assessment"""
+        values = {
+            "scenario": scenario_context.get("scenario_type", "social setting"),
+            "goals": ", ".join(user_goals) if user_goals else "general conversation skills",
+            "current": json.dumps(partial_assessment) if partial_assessment else "None yet - this is the start of the conversation"
+        }
 
-Please provide detailed feedback in JSON format with these categories:
+        new_text = render_transcript(
+            new_messages,
+            budget=ASSESSMENT_PROMPT.remaining_budget("assessment", **values),
+            call_site="assessment"
+        )
+        return ASSESSMENT_PROMPT.render(new_messages=new_text, **values)
 
-{{
-  "overall_score": (1-100 integer score),
-  "strengths": ["strength1", "strength2", "strength3"],
-  "areas_for_improvement": ["area1", "area2", "area3"],
-  "specific_suggestions": [
-    {{"message": "specific user message", "feedback": "how to improve it"}},
-    {{"message": "another message", "feedback": "improvement suggestion"}}
-  ],
-  "conversation_flow_score": (1-100),
-  "confidence_level_score": (1-100),
-  "engagement_score": (1-100),
-  "next_practice_focus": "main area to work on next",
-  "encouragement": "positive encouragement message"
-}}
+    def _build_finalization_prompt(
+        self,
+        partial_assessment: Dict[str, Any],
+        remaining_messages: List[Dict[str, str]],
+        user_goals: List[str],
+        scenario_context: Dict[str, Any]
+    ) -> Prompt:
+        """Build short prompt that turns a running assessment into final feedback"""
+        assessment = {key: value for key, value in partial_assessment.items() if key != "messages_assessed"}
+        values = {
+            "scenario": scenario_context.get("scenario_type", "social setting"),
+            "goals": ", ".join(user_goals) if user_goals else "general conversation skills",
+            "assessment": json.dumps(assessment)
+        }
 
-Focus on constructive feedback that helps the user improve their conversation skills."""
+        remaining_text = render_transcript(
+            remaining_messages,
+            budget=FINALIZATION_PROMPT.remaining_budget("feedback", **values),
+            call_site="feedback"
+        )
+        return FINALIZATION_PROMPT.render(remaining=remaining_text or "None", **values)
 
-        return prompt
+    def _build_summary_prompt(
+        self,
+        previous_summary: Optional[str],
+        messages: List[Dict[str, str]],
+        scenario_context: Dict[str, Any]
+    ) -> Prompt:
+        """Build prompt for rolling conversation summarization"""
+        return SUMMARY_PROMPT.render(
+            scenario=scenario_context.get("scenario_type", "social setting"),
+            previous_summary=previous_summary or "None yet",
+            messages=render_transcript(messages)
+        )
 
     def _parse_character_response(self, response: str, scenario_type: str, difficulty_level: str) -> Dict[str, Any]:
         """Parse and structure character generation response"""
-        try:
-            # Try to parse as JSON first
-            character_data = json.loads(response)
-            return character_data
-        except json.JSONDecodeError:
-            # Fall back to text parsing
+        character_data = parse_structured(response, GeneratedCharacter, "character")
+        if character_data is None:
             return {
                 "appearance": "An attractive person in their twenties with a friendly demeanor",
                 "body_language": f"{'Open and welcoming' if difficulty_level == 'green' else 'Neutral and focused' if difficulty_level == 'yellow' else 'Busy and distracted'}",
@@ -414,33 +719,25 @@ Focus on constructive feedback that helps the user improve their conversation sk
                 "conversation_interests": ["Current events", "Hobbies", "Local area"],
                 "approach_style": "Responds positively to genuine, friendly conversation"
             }
+        return character_data
 
     def _parse_conversation_response(self, response: str, context: Dict[str, Any]) -> Dict[str, Any]:
         """Parse AI conversation response"""
-        # Extract body language cues if present
-        body_language = ""
-        content = response
-
-        # Look for body language in [brackets]
-        import re
-        body_language_match = re.search(r'\[(.*?)\]', response)
-        if body_language_match:
-            body_language = body_language_match.group(1)
-            content = re.sub(r'\[.*?\]', '', response).strip()
+        # Body language cues come in [brackets], all of them are kept
+        content, cues = split_cues(response)
 
         return {
             "content": content,
-            "body_language": body_language,
+            "body_language": "; ".join(cues),
+            "body_language_cues": cues,
             "receptiveness": self._assess_receptiveness(content, context.get("difficulty_level", "green")),
             "response_type": "conversational"
         }
 
     def _parse_feedback_response(self, response: str, user_goals: List[str]) -> Dict[str, Any]:
         """Parse feedback generation response"""
-        try:
-            feedback_data = json.loads(response)
-            return feedback_data
-        except json.JSONDecodeError:
+        feedback_data = parse_structured(response, ConversationFeedback, "feedback")
+        if feedback_data is None:
             # Fallback feedback structure
             return {
                 "overall_score": 75,
@@ -453,6 +750,14 @@ Focus on constructive feedback that helps the user improve their conversation sk
                 "next_practice_focus": "Maintaining conversation flow",
                 "encouragement": "Great job practicing! Keep working on these areas and you'll see improvement."
             }
+        return feedback_data
+
+    def _parse_assessment_response(self, response: str) -> Optional[Dict[str, Any]]:
+        """Parse running assessment response, None if the model didn't return JSON"""
+        assessment = extract_json_object(response)
+        if assessment is None:
+            metrics.increment("llm_parse_failures", call_site="assessment", reason="no_json")
+        return assessment
 
     def _assess_receptiveness(self, content: str, difficulty_level: str) -> str:
         """Assess AI character's receptiveness level"""
@@ -500,6 +805,7 @@ Focus on constructive feedback that helps the user improve their conversation sk
 
 # Global service instance
 openrouter_service = OpenRouterService()
+os.register_at_fork(after_in_child=openrouter_service.reset_after_fork)
 
 
 # Dependency for FastAPI
@@ -0,0 +1,207 @@
+"""
+Prompt templates for FlirtCraft Backend
+Static instructions are compiled once and sent byte-identical as the system message so providers can
+cache the prefix; the variable part is assembled with a single join and sized against a token budget
+"""
+
+import string
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..core.config import settings
+from ..core.metrics import metrics
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough local token estimate (~4 characters per token), no tokenizer round trip"""
+    return (len(text) + 3) // 4
+
+
+@dataclass(frozen=True)
+class Prompt:
+    """A rendered prompt: the shared system prefix and the per-call user message"""
+    system: str
+    user: str
+
+    @property
+    def tokens(self) -> int:
+        return estimate_tokens(self.system) + estimate_tokens(self.user)
+
+    def normalized(self) -> "Prompt":
+        """Same prompt with whitespace runs collapsed, for comparing prompts that differ only in spacing"""
+        return Prompt(" ".join(self.system.split()), " ".join(self.user.split()))
+
+    def messages(self) -> List[Dict[str, str]]:
+        return [
+            {"role": "system", "content": self.system},
+            {"role": "user", "content": self.user}
+        ]
+
+
+class PromptTemplate:
+    """
+    System prefix plus a user template parsed once into literal and field segments
+    Fields are plain {name} placeholders filled with str values; {{ and }} escape braces as in str.format
+    """
+
+    def __init__(self, system: str, user: str):
+        self.system = system
+        self._segments: Tuple[Tuple[str, Optional[str]], ...] = tuple(
+            (literal, field) for literal, field, _, _ in string.Formatter().parse(user)
+        )
+        self.fields = frozenset(field for _, field in self._segments if field)
+        # Everything but the field values, counted once for budgeting
+        self.fixed_tokens = estimate_tokens(system) + estimate_tokens("".join(literal for literal, _ in self._segments))
+
+    def render(self, **values: str) -> Prompt:
+        parts: List[str] = []
+        for literal, field in self._segments:
+            parts.append(literal)
+            if field:
+                parts.append(values[field])
+        return Prompt(system=self.system, user="".join(parts))
+
+    def remaining_budget(self, call_site: str, **values: str) -> Optional[int]:
+        """Tokens left for the transcript once the template and the given values are counted, None if unbudgeted"""
+        budget = settings.ai_prompt_token_budgets.get(call_site)
+        if budget is None:
+            return None
+        return budget - self.fixed_tokens - sum(estimate_tokens(value) for value in values.values())
+
+
+def render_transcript(
+    messages: List[Dict[str, Any]],
+    partner_label: str = "AI Partner",
+    summary: Optional[str] = None,
+    budget: Optional[int] = None,
+    call_site: Optional[str] = None
+) -> str:
+    """
+    Conversation lines as "User: ..." / "<partner_label>: ...", newest kept first when over budget
+    The summary line and the most recent message are always included
+    """
+    lines: List[str] = []
+    used = 0
+    header = f"(Summary of earlier conversation: {summary})\n" if summary else ""
+    if header:
+        used = estimate_tokens(header)
+
+    for msg in reversed(messages):
+        role = "User" if msg["sender"] == "user" else partner_label
+        line = f"{role}: {msg['content']}\n"
+        cost = estimate_tokens(line)
+        if budget is not None and lines and used + cost > budget:
+            metrics.increment("prompt_messages_truncated", len(messages) - len(lines), call_site=call_site or "unknown")
+            break
+        lines.append(line)
+        used += cost
+
+    lines.reverse()
+    return header + "".join(lines)
+
+
+CONVERSATION_PROMPT = PromptTemplate(
+    system="""You are roleplaying as a character in a conversation practice scenario. You will be given your character details, the difficulty level (which affects how receptive you are to conversation) and the conversation so far.
+
+Respond as this character would, staying true to their personality and the difficulty level. Your response should:
+1. Be natural and realistic for this scenario
+2. Match your character's personality and current mood
+3. Reflect the appropriate level of interest based on difficulty
+4. Include subtle body language cues in [brackets] if relevant
+5. Keep responses conversational and not too long (1-3 sentences typically)""",
+    user="""Scenario: {scenario}
+
+Character: {appearance}
+Body Language: {body_language}
+Current Activity: {current_activity}
+Personality: {personality}
+Interests: {interests}
+
+Difficulty Level: {difficulty}
+
+Previous conversation:
+{history}
+The user just said: "{user_message}"
+
+Response:"""
+)
+
+FEEDBACK_FORMAT = """{
+  "overall_score": (1-100 integer score),
+  "strengths": ["strength1", "strength2", "strength3"],
+  "areas_for_improvement": ["area1", "area2", "area3"],
+  "specific_suggestions": [
+    {"message": "specific user message", "feedback": "how to improve it"},
+    {"message": "another message", "feedback": "improvement suggestion"}
+  ],
+  "conversation_flow_score": (1-100),
+  "confidence_level_score": (1-100),
+  "engagement_score": (1-100),
+  "next_practice_focus": "main area to work on next",
+  "encouragement": "positive encouragement message"
+}"""
+
+FEEDBACK_PROMPT = PromptTemplate(
+    system=f"""You are a conversation coach providing feedback on a practice conversation.
+
+Provide detailed feedback in JSON format with these categories:
+
+{FEEDBACK_FORMAT}
+
+Focus on constructive feedback that helps the user improve their conversation skills.""",
+    user="""Scenario: {scenario}
+User's Goals: {goals}
+
+Conversation:
+{conversation}"""
+)
+
+FINALIZATION_PROMPT = PromptTemplate(
+    system=f"""You are a conversation coach finalizing feedback on a practice conversation. You will be given a running assessment of the conversation and the final exchanges it does not cover yet.
+
+Provide the final feedback in JSON format with these categories:
+
+{FEEDBACK_FORMAT}""",
+    user="""Scenario: {scenario}
+User's Goals: {goals}
+
+Running assessment of the conversation so far:
+{assessment}
+
+Final exchanges not yet covered by the assessment:
+{remaining}"""
+)
+
+ASSESSMENT_PROMPT = PromptTemplate(
+    system="""You are a conversation coach keeping a running assessment of a practice conversation. Update the assessment to account for the new exchanges. Respond with only a JSON object:
+
+{
+  "overall_score": (1-100 integer score so far),
+  "conversation_flow_score": (1-100),
+  "confidence_level_score": (1-100),
+  "engagement_score": (1-100),
+  "strengths": ["up to 3 strengths"],
+  "areas_for_improvement": ["up to 3 areas"],
+  "specific_suggestions": [{"message": "specific user message", "feedback": "how to improve it"}],
+  "notes": "one or two sentences on how the conversation is developing"
+}""",
+    user="""Scenario: {scenario}
+User's Goals: {goals}
+
+Current assessment:
+{current}
+
+New exchanges since the last assessment:
+{new_messages}"""
+)
+
+SUMMARY_PROMPT = PromptTemplate(
+    system="""You are keeping a running summary of a conversation practice session. Write an updated summary in under 120 words. Cover the topics discussed, what each person shared about themselves, how receptive the AI Partner has been, and any details that should be remembered later in the conversation. Respond with only the summary text.""",
+    user="""Scenario: {scenario}
+
+Summary so far:
+{previous_summary}
+
+Messages to add to the summary:
+{messages}"""
+)
@@ -0,0 +1,217 @@
+"""
+Resilience primitives for FlirtCraft Backend
+Per-model circuit breakers, an adaptive (AIMD) concurrency limit and single-flight coalescing for
+upstream AI calls
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, Any, Hashable, Optional, Tuple, TypeVar
+
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is rejected because the model's breaker is open"""
+    pass
+
+
+class ConcurrencyLimitError(Exception):
+    """Raised when a call gets no concurrency slot; retry_after is a suggested wait in seconds"""
+
+    def __init__(self, message: str, retry_after: int = 1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker over a rolling window of call outcomes
+    Opens on a high error rate or a high share of slow calls, then lets one probe through
+    after the cool-down; the probe's outcome closes or re-opens the circuit
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str):
+        self.name = name
+        self.state = self.CLOSED
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self._probe_in_flight = False
+        self._outcomes: Deque[Tuple[bool, bool]] = deque(maxlen=settings.ai_breaker_window)  # (failed, slow)
+
+    def allow(self) -> bool:
+        """Whether a call may go through right now"""
+        if self.state == self.CLOSED:
+            return True
+
+        if self.state == self.OPEN:
+            if time.monotonic() - self.opened_at < settings.ai_breaker_open_seconds:
+                return False
+            self.state = self.HALF_OPEN
+            self._probe_in_flight = False
+
+        # Half-open: a single probe at a time
+        if self._probe_in_flight:
+            return False
+        self._probe_in_flight = True
+        return True
+
+    @staticmethod
+    def slow_call_threshold(budget: float) -> float:
+        """Latency past which a call counts as slow, kept below the call-site budget that would cut it off"""
+        return min(settings.ai_breaker_slow_call_seconds, budget * settings.ai_breaker_slow_call_budget_fraction)
+
+    def record_success(self, latency: float, slow_after: Optional[float] = None):
+        slow = latency >= (settings.ai_breaker_slow_call_seconds if slow_after is None else slow_after)
+        if self.state == self.HALF_OPEN:
+            if slow:
+                self._open("slow probe")
+            else:
+                self._close()
+            return
+        self._record(failed=False, slow=slow)
+
+    def record_failure(self):
+        """An error, or a call cut off by its latency budget"""
+        if self.state == self.HALF_OPEN:
+            self._open("failed probe")
+            return
+        self._record(failed=True, slow=False)
+
+    def release_probe(self):
+        """Give the half-open probe slot back when a call ends without an outcome (cancelled)"""
+        self._probe_in_flight = False
+
+    def _record(self, failed: bool, slow: bool):
+        self._outcomes.append((failed, slow))
+        if len(self._outcomes) < settings.ai_breaker_min_calls:
+            return
+
+        total = len(self._outcomes)
+        error_rate = sum(1 for f, _ in self._outcomes if f) / total
+        slow_rate = sum(1 for _, s in self._outcomes if s) / total
+
+        if error_rate >= settings.ai_breaker_error_threshold:
+            self._open(f"error rate {error_rate:.0%}")
+        elif slow_rate >= settings.ai_breaker_slow_call_threshold:
+            self._open(f"slow call rate {slow_rate:.0%}")
+
+    def _open(self, reason: str):
+        self.state = self.OPEN
+        self.opened_at = time.monotonic()
+        self.times_opened += 1
+        self._probe_in_flight = False
+        self._outcomes.clear()
+        logger.warning(f"Circuit for {self.name} opened: {reason}")
+
+    def _close(self):
+        self.state = self.CLOSED
+        self._probe_in_flight = False
+        self._outcomes.clear()
+        logger.info(f"Circuit for {self.name} closed")
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    AIMD in-flight limit for upstream calls
+    Grows by roughly one slot per limit's worth of fast successes, shrinks multiplicatively
+    on errors or calls slower than their target; callers over the limit wait in the RequestScheduler
+    """
+
+    def __init__(self):
+        self.limit = float(settings.ai_concurrency_initial)
+        self.in_flight = 0
+
+    def try_acquire(self) -> bool:
+        if self.in_flight >= int(self.limit):
+            return False
+        self.in_flight += 1
+        return True
+
+    def release(self, ok: bool, latency: float, target_latency: float):
+        self.in_flight = max(0, self.in_flight - 1)
+        if ok and latency <= target_latency:
+            self.limit = min(settings.ai_concurrency_max, self.limit + 1 / self.limit)
+        else:
+            self.limit = max(settings.ai_concurrency_min, self.limit * settings.ai_concurrency_backoff)
+
+    def release_unmeasured(self):
+        """Free a slot without adjusting the limit (cancelled calls)"""
+        self.in_flight = max(0, self.in_flight - 1)
+
+
+class _Flight:
+    """One shared call and how many callers are waiting on it"""
+
+    def __init__(self, task: "asyncio.Task"):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Shares one in-flight call between concurrent callers with the same key
+    The call runs as its own task, so a caller that is cancelled (client gone) leaves it running for the
+    others; it is cancelled only once every caller has left. Results are not kept after the call ends.
+    """
+
+    def __init__(self):
+        self._flights: Dict[Hashable, _Flight] = {}
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._flights)
+
+    def _forget(self, key: Hashable, flight: _Flight):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    async def do(self, key: Hashable, call: Callable[[], Awaitable[T]]) -> Tuple[T, bool]:
+        """Result of call(), run once per key at a time; the flag is True when another caller's call was joined"""
+        flight = self._flights.get(key)
+        shared = flight is not None
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(call()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _: self._forget(key, flight))
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task), shared
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # Last caller left before the result arrived; new callers start a fresh call
+                self._forget(key, flight)
+                flight.task.cancel()
+
+
+class BreakerRegistry:
+    """Lazily created circuit breaker per model"""
+
+    def __init__(self):
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    def get(self, model: str) -> CircuitBreaker:
+        if model not in self._breakers:
+            self._breakers[model] = CircuitBreaker(model)
+        return self._breakers[model]
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            model: {
+                "state": breaker.state,
+                "times_opened": breaker.times_opened
+            }
+            for model, breaker in self._breakers.items()
+        }
@@ -0,0 +1,264 @@
+"""
+Scenario catalog for FlirtCraft Backend
+In-process, versioned snapshot of the scenarios table with every response view pre-serialized
+"""
+
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+from dataclasses import dataclass, replace
+from typing import Any, Dict, List, Optional, Tuple
+
+import orjson
+
+from ..core.config import settings
+from ..core.database import SessionLocal
+from ..core.metrics import metrics
+from ..models.user import Scenario
+from .scenario_content import scenario_content
+
+logger = logging.getLogger(__name__)
+
+# Served when the scenarios table is empty or unreachable
+DEFAULT_SCENARIOS: Tuple[Dict[str, Any], ...] = (
+    {
+        "type": "coffee_shop",
+        "display_name": "Coffee Shops & Cafes",
+        "description": "Practice in relaxed cafe environments with casual conversation starters",
+        "is_premium": False,
+        "is_active": True
+    },
+    {
+        "type": "bookstore",
+        "display_name": "Bookstores & Libraries",
+        "description": "Quiet, intellectual spaces perfect for thoughtful conversations",
+        "is_premium": False,
+        "is_active": True
+    },
+    {
+        "type": "park",
+        "display_name": "Parks & Outdoor Spaces",
+        "description": "Natural settings for casual encounters and relaxed conversations",
+        "is_premium": False,
+        "is_active": True
+    },
+    {
+        "type": "campus",
+        "display_name": "University Campus",
+        "description": "Academic settings with peer interactions and study group scenarios",
+        "is_premium": False,
+        "is_active": True
+    },
+    {
+        "type": "grocery",
+        "display_name": "Grocery Stores & Daily Life",
+        "description": "Everyday situations and natural conversation opportunities",
+        "is_premium": False,
+        "is_active": True
+    },
+    {
+        "type": "gym",
+        "display_name": "Gyms & Fitness Centers",
+        "description": "Active environments with shared interests and fitness topics",
+        "is_premium": True,
+        "is_active": True
+    },
+    {
+        "type": "bar",
+        "display_name": "Bars & Social Venues",
+        "description": "Lively social environments with music and group dynamics",
+        "is_premium": True,
+        "is_active": True
+    },
+    {
+        "type": "gallery",
+        "display_name": "Art Galleries & Cultural Events",
+        "description": "Sophisticated cultural environments for meaningful conversations",
+        "is_premium": True,
+        "is_active": True
+    },
+)
+
+
+@dataclass(frozen=True)
+class CatalogView:
+    """One pre-serialized response body and its strong ETag"""
+    body: bytes
+    etag: str
+
+
+@dataclass(frozen=True)
+class ScenarioEntry:
+    """A scenario's detail view plus what the routes need to authorize it"""
+    view: CatalogView
+    is_premium: bool
+    premium_gated: bool  # only scenarios stored in the DB enforce premium access on details
+
+
+@dataclass(frozen=True)
+class CatalogSnapshot:
+    version: str
+    loaded_at: float
+    from_database: bool
+    lists: Dict[Tuple[bool, bool, bool], CatalogView]  # (full catalog, premium user, includes premium)
+    scenarios: Dict[str, ScenarioEntry]
+
+
+def _envelope(data: Any, meta: Optional[Dict[str, Any]] = None) -> CatalogView:
+    body = orjson.dumps({"success": True, "data": data, "message": None, "meta": meta})
+    return CatalogView(body=body, etag=f'"{hashlib.sha256(body).hexdigest()[:32]}"')
+
+
+def _build_snapshot(rows: List[Dict[str, Any]], from_database: bool) -> CatalogSnapshot:
+    summaries = [
+        {
+            "type": row["type"],
+            "display_name": row["display_name"],
+            "description": row["description"],
+            "is_premium": row["is_premium"],
+            "is_active": row["is_active"]
+        }
+        for row in rows
+    ]
+    free_summaries = [summary for summary in summaries if not summary["is_premium"]]
+
+    lists = {}
+    for full in (True, False):
+        data = summaries if full else free_summaries
+        # An empty view falls back to the full default list, as the DB-backed endpoint always did
+        if not data or not from_database:
+            data = [dict(summary) for summary in DEFAULT_SCENARIOS]
+        for premium_user in (True, False):
+            for includes_premium in (True, False):
+                lists[(full, premium_user, includes_premium)] = _envelope(data, {
+                    "total_scenarios": len(data),
+                    "premium_user": premium_user,
+                    "includes_premium": includes_premium
+                })
+
+    # Default scenarios stay reachable by type even when the table has its own rows
+    scenarios = {
+        scenario["type"]: ScenarioEntry(view=_envelope(dict(scenario)), is_premium=scenario["is_premium"], premium_gated=False)
+        for scenario in DEFAULT_SCENARIOS
+    }
+    if from_database:
+        for row in rows:
+            scenarios[row["type"]] = ScenarioEntry(view=_envelope(row), is_premium=row["is_premium"], premium_gated=True)
+
+    bodies = [view.body for view in lists.values()] + [entry.view.body for entry in scenarios.values()]
+    version = hashlib.sha256(b"".join(bodies)).hexdigest()[:16]
+    return CatalogSnapshot(
+        version=version,
+        loaded_at=time.monotonic(),
+        from_database=from_database,
+        lists=lists,
+        scenarios=scenarios
+    )
+
+
+class ScenarioCatalog:
+    """
+    Serves the scenario catalog from memory
+    The snapshot is reloaded every scenario_catalog_refresh_seconds (or after invalidate());
+    views and ETags only change when the catalog content does
+    Reloads query the database from a worker thread, never on the event loop
+    """
+
+    def __init__(self):
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._lock = threading.Lock()
+        self._reload: Optional[asyncio.Task] = None
+
+    def _is_fresh(self, snapshot: Optional[CatalogSnapshot]) -> bool:
+        return snapshot is not None and time.monotonic() - snapshot.loaded_at <= settings.scenario_catalog_refresh_seconds
+
+    async def snapshot(self) -> CatalogSnapshot:
+        """
+        Current snapshot; one due for a refresh keeps being served while a background reload runs,
+        only a missing one (first read, after invalidate()) is waited for
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            return await asyncio.to_thread(self.refresh, False)
+        if not self._is_fresh(snapshot) and self._reload is None:
+            self._reload = asyncio.create_task(self._background_refresh())
+        return snapshot
+
+    async def _background_refresh(self):
+        try:
+            await asyncio.to_thread(self.refresh, False)
+        except Exception as e:
+            logger.error(f"Background scenario catalog refresh failed: {e}")
+        finally:
+            self._reload = None
+
+    def refresh(self, force: bool = True) -> CatalogSnapshot:
+        """Reload the catalog from the database; blocking, call it from a thread when on the event loop"""
+        with self._lock:
+            if not force and self._is_fresh(self._snapshot):
+                # Another request reloaded it while this one waited for the lock
+                return self._snapshot
+
+            try:
+                db = SessionLocal()
+                try:
+                    rows = [
+                        {
+                            "type": scenario.type,
+                            "display_name": scenario.display_name,
+                            "description": scenario.description,
+                            "is_premium": scenario.is_premium,
+                            "is_active": scenario.is_active,
+                            "context_templates": scenario.context_templates,
+                            "difficulty_modifiers": scenario.difficulty_modifiers
+                        }
+                        for scenario in db.query(Scenario).filter(Scenario.is_active == True).order_by(Scenario.type).all()
+                    ]
+                finally:
+                    db.close()
+            except Exception as e:
+                if self._snapshot is not None:
+                    logger.error(f"Failed to refresh scenario catalog, keeping version {self._snapshot.version}: {e}")
+                    self._snapshot = replace(self._snapshot, loaded_at=time.monotonic())
+                    return self._snapshot
+                logger.error(f"Failed to load scenario catalog, serving defaults: {e}")
+                rows = []
+
+            from_database = bool(rows)
+            if not rows:
+                rows = [dict(scenario) for scenario in DEFAULT_SCENARIOS]
+
+            snapshot = _build_snapshot(rows, from_database)
+            previous = self._snapshot
+            if previous is not None and previous.version == snapshot.version:
+                # Unchanged content: keep the existing views, just restart the refresh clock
+                snapshot = replace(previous, loaded_at=snapshot.loaded_at)
+            else:
+                scenario_content.load_templates({
+                    row["type"]: row["context_templates"]
+                    for row in rows
+                    if from_database and row.get("context_templates")
+                })
+                metrics.increment("scenario_catalog_versions")
+                logger.info(f"Scenario catalog loaded: version {snapshot.version}, {len(snapshot.scenarios)} scenarios")
+
+            self._snapshot = snapshot
+            return snapshot
+
+    def invalidate(self):
+        """Force a reload on the next read (call after writing to the scenarios table)"""
+        self._snapshot = None
+
+    async def list_view(self, include_premium: bool, premium_user: Optional[bool]) -> CatalogView:
+        """Catalog list response; premium_user is None for anonymous callers"""
+        full = include_premium and premium_user is not False
+        return (await self.snapshot()).lists[(full, bool(premium_user), include_premium)]
+
+    async def get(self, scenario_type: str) -> Optional[ScenarioEntry]:
+        return (await self.snapshot()).scenarios.get(scenario_type)
+
+
+# Global scenario catalog
+scenario_catalog = ScenarioCatalog()
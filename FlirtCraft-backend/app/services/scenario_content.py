@@ -0,0 +1,315 @@
+"""
+Scenario content registry for FlirtCraft Backend
+Immutable lookup tables behind scenario context generation and character prompts, built once at import
+"""
+
+import logging
+import threading
+from dataclasses import dataclass
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+from .prompts import Prompt, PromptTemplate
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STARTERS: Tuple[str, ...] = (
+    "Hi there!",
+    "How's your day going?",
+    "Nice weather we're having!"
+)
+
+DEFAULT_APPEARANCE = "An attractive person in their mid-twenties with a friendly demeanor"
+
+GENDER_APPEARANCES = MappingProxyType({
+    "male": "A handsome man with a confident presence and casual style",
+    "female": "A beautiful woman with an engaging smile and approachable energy",
+    "everyone": "An attractive person with a warm and welcoming presence"
+})
+
+BODY_LANGUAGE = MappingProxyType({
+    "green": "Open posture, making eye contact, smiling occasionally, appears approachable",
+    "yellow": "Neutral posture, occasionally checking phone, polite but not overly engaging",
+    "red": "Focused on their activity, minimal eye contact, appears busy or distracted"
+})
+
+CONTEXT_TIPS = MappingProxyType({
+    "green": (
+        "They seem very approachable and interested in conversation",
+        "Look for genuine connection points and shared interests",
+        "Feel free to be yourself and let the conversation flow naturally"
+    ),
+    "yellow": (
+        "They're polite but may need a good reason to engage longer",
+        "Start with practical questions or observations about the environment",
+        "Be patient and don't take neutral responses personally"
+    ),
+    "red": (
+        "They appear busy or focused on something else",
+        "Keep initial interactions brief and respectful",
+        "Look for genuine opportunities to be helpful or add value"
+    )
+})
+
+DIFFICULTY_PROMPT_DESCRIPTIONS = MappingProxyType({
+    "green": "very approachable and clearly interested in conversation",
+    "yellow": "polite but neutral, requiring some effort to engage",
+    "red": "busy or distracted, requiring skillful and respectful approach"
+})
+
+GENDER_PROMPT_TEXT = MappingProxyType({
+    "male": "Create a male character.",
+    "female": "Create a female character."
+})
+
+CHARACTER_PROMPT = PromptTemplate(
+    system="""You are creating a realistic character for a conversation practice scenario. You will be given the setting, how approachable the character should be and the difficulty level.
+
+Please provide:
+1. Physical appearance (age, style, what they're wearing/doing)
+2. Body language that matches the difficulty level
+3. Current activity or what they're focused on
+4. Personality traits that would influence how they respond to approaches
+5. Potential conversation topics they might be interested in
+
+Keep the description natural and realistic. The character should feel like a real person someone might encounter in this setting.
+
+Format your response as a JSON object with these keys:
+- "appearance": Physical description
+- "body_language": Current body language and demeanor
+- "current_activity": What they're doing right now
+- "personality_traits": List of 3-4 key personality traits
+- "conversation_interests": List of topics they'd be interested in discussing
+- "approach_style": How they typically respond to people approaching them""",
+    user="""Setting: {scenario_desc}
+The character should be {difficulty_desc}.
+Difficulty level: {difficulty_level}
+{gender_text}"""
+)
+
+
+@dataclass(frozen=True)
+class ScenarioContent:
+    """Static content for one scenario type"""
+    environment: Optional[Mapping[str, str]]
+    character_background: Optional[str]
+    starters: Mapping[str, Tuple[str, ...]]  # per difficulty level
+    prompt_description: Optional[str]
+
+
+def _content(
+    environment: Optional[Dict[str, str]] = None,
+    character_background: Optional[str] = None,
+    starters: Optional[Dict[str, Tuple[str, ...]]] = None,
+    prompt_description: Optional[str] = None
+) -> ScenarioContent:
+    return ScenarioContent(
+        environment=MappingProxyType(dict(environment)) if environment else None,
+        character_background=character_background,
+        starters=MappingProxyType({level: tuple(lines) for level, lines in (starters or {}).items()}),
+        prompt_description=prompt_description
+    )
+
+
+BUILTIN_CONTENT: Mapping[str, ScenarioContent] = MappingProxyType({
+    "coffee_shop": _content(
+        environment={
+            "environment": "A cozy coffee shop with soft jazz music and the aroma of freshly brewed coffee",
+            "time_of_day": "mid-morning",
+            "crowd_level": "moderately busy",
+            "atmosphere": "relaxed and welcoming"
+        },
+        character_background="A local who works nearby and enjoys this coffee shop's atmosphere for relaxing or working",
+        starters={
+            "green": (
+                "This coffee smells amazing, what did you order?",
+                "I love this playlist, do you come here often?",
+                "Mind if I ask what you're reading? It looks interesting."
+            ),
+            "yellow": (
+                "Excuse me, do you know if they have good WiFi here?",
+                "Sorry to bother you, is this seat taken?",
+                "Have you tried their pastries? I'm trying to decide what to order."
+            ),
+            "red": (
+                "Could you watch my laptop for a second while I get a refill?",
+                "Do you know what time they close?",
+                "Sorry, did you hear if they called out my order?"
+            )
+        },
+        prompt_description="a cozy coffee shop with soft background music"
+    ),
+    "bookstore": _content(
+        environment={
+            "environment": "A quiet bookstore with tall shelves and reading nooks",
+            "time_of_day": "afternoon",
+            "crowd_level": "peaceful with few people",
+            "atmosphere": "intellectual and calm"
+        },
+        character_background="An avid reader who loves discovering new books and enjoys the quiet atmosphere",
+        starters={
+            "green": (
+                "I've been looking for a good book recommendation, what are you reading?",
+                "This section has such great titles, are you finding anything interesting?",
+                "I love this author too! Have you read their latest book?"
+            ),
+            "yellow": (
+                "Excuse me, do you know where the science fiction section is?",
+                "Have you been to any of the events they host here?",
+                "Sorry, did you see if they have a café area?"
+            ),
+            "red": (
+                "Do you know if they're open late tonight?",
+                "Excuse me, where are the restrooms?",
+                "Could you help me reach that book on the top shelf?"
+            )
+        },
+        prompt_description="a quiet bookstore with tall shelves and reading nooks"
+    ),
+    "park": _content(
+        environment={
+            "environment": "A sunny park with walking paths and people enjoying outdoor activities",
+            "time_of_day": "late afternoon",
+            "crowd_level": "active with joggers and families",
+            "atmosphere": "energetic and natural"
+        },
+        character_background="Someone who values outdoor activities and uses the park for exercise and relaxation",
+        starters={
+            "green": (
+                "Beautiful day for a walk, isn't it?",
+                "I love this trail, do you come here often to exercise?",
+                "Your dog is adorable! What breed is it?"
+            ),
+            "yellow": (
+                "Do you know how long this trail is?",
+                "Have you seen the new playground they built?",
+                "Is there a water fountain around here?"
+            ),
+            "red": (
+                "Excuse me, which way is the parking lot?",
+                "Do you know what time the park closes?",
+                "Have you seen a small brown dog around here?"
+            )
+        },
+        prompt_description="a sunny park with walking paths and outdoor activities"
+    ),
+    "campus": _content(prompt_description="a university campus with students and academic atmosphere"),
+    "grocery": _content(prompt_description="a grocery store during a casual shopping trip"),
+    "gym": _content(prompt_description="a fitness center with workout equipment and active atmosphere"),
+    "bar": _content(prompt_description="a social bar or pub with lively conversation"),
+    "gallery": _content(prompt_description="an art gallery or cultural event with sophisticated atmosphere"),
+})
+
+
+class ScenarioContentRegistry:
+    """
+    O(1) lookups over immutable scenario content
+    Built-in content can be overridden per scenario from Scenario.context_templates; a load swaps in a
+    new mapping and clears the derived caches, readers never see a partially applied update
+    """
+
+    def __init__(self):
+        self._content: Mapping[str, ScenarioContent] = BUILTIN_CONTENT
+        self._lock = threading.Lock()
+
+    def get(self, scenario_type: str) -> Optional[ScenarioContent]:
+        return self._content.get(scenario_type)
+
+    def load_templates(self, templates: Mapping[str, Any]):
+        """
+        Apply Scenario.context_templates overrides keyed by scenario type
+        Recognized keys: environment (dict), character_background (str),
+        conversation_starters (difficulty -> list), prompt_description (str)
+        """
+        with self._lock:
+            content = dict(BUILTIN_CONTENT)
+            for scenario_type, template in templates.items():
+                if not isinstance(template, dict):
+                    continue
+                base = content.get(scenario_type) or _content()
+                try:
+                    starters = dict(base.starters)
+                    starters.update(template.get("conversation_starters") or {})
+                    content[scenario_type] = _content(
+                        environment=template.get("environment") or base.environment,
+                        character_background=template.get("character_background") or base.character_background,
+                        starters=starters,
+                        prompt_description=template.get("prompt_description") or base.prompt_description
+                    )
+                except Exception as e:
+                    logger.warning(f"Ignoring invalid context templates for scenario {scenario_type}: {e}")
+
+            self._content = MappingProxyType(content)
+            _mock_context.cache_clear()
+            character_prompt.cache_clear()
+
+    def environment(self, scenario_type: str) -> Mapping[str, str]:
+        content = self.get(scenario_type)
+        if content and content.environment:
+            return content.environment
+        return BUILTIN_CONTENT["coffee_shop"].environment
+
+    def starters(self, scenario_type: str, difficulty_level: str) -> Tuple[str, ...]:
+        content = self.get(scenario_type)
+        if content is None:
+            return DEFAULT_STARTERS
+        return content.starters.get(difficulty_level, DEFAULT_STARTERS)
+
+    def character_background(self, scenario_type: str) -> str:
+        content = self.get(scenario_type)
+        if content and content.character_background:
+            return content.character_background
+        return "A friendly person enjoying their time in this location"
+
+    def prompt_description(self, scenario_type: str) -> str:
+        content = self.get(scenario_type)
+        if content and content.prompt_description:
+            return content.prompt_description
+        return "a social setting"
+
+
+# Global scenario content registry
+scenario_content = ScenarioContentRegistry()
+
+
+def character_appearance(target_gender: Optional[str] = None) -> str:
+    """Character appearance for the user's target gender preference"""
+    if target_gender:
+        return GENDER_APPEARANCES.get(target_gender, DEFAULT_APPEARANCE)
+    return DEFAULT_APPEARANCE
+
+
+@lru_cache(maxsize=512)
+def _mock_context(scenario_type: str, difficulty_level: str, target_gender: Optional[str]) -> Mapping[str, Any]:
+    # Shared by every caller, so nothing in it may be mutable; environment is the only mapping
+    return MappingProxyType({
+        "scenario_type": scenario_type,
+        "difficulty_level": difficulty_level,
+        "appearance": character_appearance(target_gender),
+        "environment": scenario_content.environment(scenario_type),
+        "body_language": BODY_LANGUAGE[difficulty_level],
+        "conversation_starters": scenario_content.starters(scenario_type, difficulty_level),
+        "character_background": scenario_content.character_background(scenario_type),
+        "context_tips": CONTEXT_TIPS[difficulty_level]
+    })
+
+
+def mock_context(scenario_type: str, difficulty_level: str, target_gender: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Pre-conversation context for a scenario, built once per combination
+    The caller owns the result: the dict and its environment are fresh copies, everything else is immutable
+    """
+    context = _mock_context(scenario_type, difficulty_level, target_gender)
+    return {**context, "environment": dict(context["environment"])}
+
+
+@lru_cache(maxsize=512)
+def character_prompt(scenario_type: str, difficulty_level: str, target_gender: Optional[str] = None) -> Prompt:
+    """Character generation prompt, rendered once per scenario/difficulty/gender combination"""
+    return CHARACTER_PROMPT.render(
+        scenario_desc=scenario_content.prompt_description(scenario_type),
+        difficulty_desc=DIFFICULTY_PROMPT_DESCRIPTIONS.get(difficulty_level, "moderately approachable"),
+        gender_text=GENDER_PROMPT_TEXT.get(target_gender, ""),
+        difficulty_level=difficulty_level
+    )
@@ -0,0 +1,151 @@
+"""
+AI request scheduler for FlirtCraft Backend
+Admission control in front of the adaptive concurrency limit: calls that find no free slot wait in
+bounded per-class queues, premium before free before background jobs, round-robin across users
+"""
+
+import asyncio
+import logging
+import math
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Dict, Any, Optional
+
+from ..core.config import settings
+from ..core.metrics import metrics
+from .resilience import AdaptiveConcurrencyLimiter, ConcurrencyLimitError
+
+logger = logging.getLogger(__name__)
+
+# Highest priority first
+PRIORITY_CLASSES = ("premium", "free", "background")
+
+# Fairness key for calls made on nobody's behalf
+SHARED_QUEUE = "shared"
+
+
+class _ClassQueue:
+    """Waiters of one priority class, one FIFO per user served round-robin"""
+
+    def __init__(self):
+        self.users: "OrderedDict[str, Deque[asyncio.Future]]" = OrderedDict()
+        self.size = 0
+
+    def push(self, user_key: str, waiter: asyncio.Future):
+        self.users.setdefault(user_key, deque()).append(waiter)
+        self.size += 1
+
+    def pop(self) -> asyncio.Future:
+        user_key, waiters = next(iter(self.users.items()))
+        waiter = waiters.popleft()
+        if waiters:
+            self.users.move_to_end(user_key)
+        else:
+            del self.users[user_key]
+        self.size -= 1
+        return waiter
+
+    def remove(self, user_key: str, waiter: asyncio.Future):
+        waiters = self.users.get(user_key)
+        if waiters is None or waiter not in waiters:
+            return
+        waiters.remove(waiter)
+        if not waiters:
+            del self.users[user_key]
+        self.size -= 1
+
+
+class RequestScheduler:
+    """
+    Priority and per-user fair queuing for upstream AI calls
+    A call runs straight away when nothing is queued and the limiter has a slot; otherwise it waits
+    its turn, and is shed with ConcurrencyLimitError when its class queue is full or the wait runs out
+    Slots freed through release()/release_unmeasured() go to the next waiter
+    """
+
+    def __init__(self, limiter: AdaptiveConcurrencyLimiter):
+        self.limiter = limiter
+        self._queues: Dict[str, _ClassQueue] = {priority: _ClassQueue() for priority in PRIORITY_CLASSES}
+        self.shed: Dict[str, int] = {priority: 0 for priority in PRIORITY_CLASSES}
+
+    @property
+    def waiting(self) -> int:
+        return sum(queue.size for queue in self._queues.values())
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            priority: {"waiting": self._queues[priority].size, "shed": self.shed[priority]}
+            for priority in PRIORITY_CLASSES
+        }
+
+    def _shed(self, priority: str, reason: str, max_wait: float) -> ConcurrencyLimitError:
+        self.shed[priority] += 1
+        metrics.increment("ai_queue_shed", priority=priority, reason=reason)
+        return ConcurrencyLimitError(
+            f"AI queue for {priority} requests is saturated ({reason})",
+            retry_after=max(1, math.ceil(max_wait))
+        )
+
+    async def acquire(self, priority: str, user_key: Optional[str] = None):
+        """Wait for a concurrency slot; the caller must hand it back with release() or release_unmeasured()"""
+        if priority not in self._queues:
+            priority = "background"
+        user_key = user_key or SHARED_QUEUE
+        max_wait = settings.ai_queue_max_wait_seconds.get(priority, 5.0)
+
+        if self.waiting == 0 and self.limiter.try_acquire():
+            metrics.observe("ai_queue_wait_seconds", 0.0, priority=priority)
+            return
+
+        queue = self._queues[priority]
+        if queue.size >= settings.ai_queue_max_waiting.get(priority, 100):
+            raise self._shed(priority, "queue_full", max_wait)
+        if len(queue.users.get(user_key, ())) >= settings.ai_queue_max_per_user:
+            raise self._shed(priority, "user_queue_full", max_wait)
+
+        waiter = asyncio.get_running_loop().create_future()
+        queue.push(user_key, waiter)
+        started = time.monotonic()
+        # A slot may have been freed while nothing was queued; don't leave it idle
+        self._dispatch()
+        try:
+            # asyncio.wait, not wait_for: wait_for (before 3.12) swallows a cancellation that arrives
+            # after the slot was granted, leaving a caller that has gone away holding it
+            done, _ = await asyncio.wait({waiter}, timeout=max_wait)
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Granted a slot just as the caller went away; pass it on
+                self.release_unmeasured()
+            else:
+                queue.remove(user_key, waiter)
+                waiter.cancel()
+            raise
+        finally:
+            metrics.observe("ai_queue_wait_seconds", time.monotonic() - started, priority=priority)
+
+        if not done:
+            queue.remove(user_key, waiter)
+            waiter.cancel()
+            raise self._shed(priority, "timeout", max_wait)
+
+    def release(self, ok: bool, latency: float, target_latency: float):
+        self.limiter.release(ok=ok, latency=latency, target_latency=target_latency)
+        self._dispatch()
+
+    def release_unmeasured(self):
+        self.limiter.release_unmeasured()
+        self._dispatch()
+
+    def _dispatch(self):
+        """Hand free slots to waiters, highest class first"""
+        for priority in PRIORITY_CLASSES:
+            queue = self._queues[priority]
+            while queue.size:
+                if not self.limiter.try_acquire():
+                    return
+                waiter = queue.pop()
+                if waiter.done():
+                    # Timed out or cancelled but not yet removed by its caller
+                    self.limiter.release_unmeasured()
+                    continue
+                waiter.set_result(None)
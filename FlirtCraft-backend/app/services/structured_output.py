@@ -0,0 +1,146 @@
+"""
+Structured LLM output handling for FlirtCraft Backend
+Pulls the first JSON object out of model text (prose, code fences and all) and validates it against
+precompiled Pydantic schemas; every failure is counted since it throws away a paid call
+"""
+
+import logging
+from typing import Any, Dict, Optional, Type
+
+import orjson
+from pydantic import BaseModel, ValidationError
+
+from ..core.config import settings
+from ..core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class JsonObjectScanner:
+    """
+    Incremental scanner for the first complete top-level JSON object in a text stream
+    Tracks brace depth outside of strings; feed() returns the parsed object as soon as it closes.
+    A candidate that turns out not to be valid JSON, or never closes (call finish() at the end of
+    the text), is abandoned and scanning resumes at the next "{" after its start
+    """
+
+    def __init__(self):
+        self._text = ""
+        self._pos = 0
+        self._start: Optional[int] = None
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self.result: Optional[Dict[str, Any]] = None
+
+    def feed(self, chunk: str) -> Optional[Dict[str, Any]]:
+        if self.result is not None:
+            return self.result
+        if self._start is None:
+            # Nothing open, the text scanned so far can't be part of a candidate
+            self._text = self._text[self._pos:]
+            self._pos = 0
+        self._text += chunk
+        return self._scan()
+
+    def finish(self) -> Optional[Dict[str, Any]]:
+        """End of the text: retry past candidates that were still open"""
+        while self.result is None and self._start is not None:
+            self._restart()
+            self._scan()
+        return self.result
+
+    def _restart(self):
+        self._pos = self._start + 1
+        self._start = None
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+
+    def _scan(self) -> Optional[Dict[str, Any]]:
+        text = self._text
+        while self._pos < len(text):
+            if self._start is None:
+                start = text.find("{", self._pos)
+                if start == -1:
+                    self._pos = len(text)
+                    return None
+                self._start = start
+                self._depth = 1
+                self._pos = start + 1
+                continue
+
+            char = text[self._pos]
+            self._pos += 1
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == "{":
+                self._depth += 1
+            elif char == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    try:
+                        candidate = orjson.loads(text[self._start:self._pos])
+                    except orjson.JSONDecodeError:
+                        self._restart()
+                        continue
+                    self.result = candidate
+                    return candidate
+        return None
+
+
+def extract_json_object(text: str) -> Optional[Dict[str, Any]]:
+    """First JSON object in the text, None if there isn't one"""
+    stripped = text.strip()
+    if stripped.startswith("{"):
+        # Fast path: well-behaved JSON mode output
+        try:
+            candidate = orjson.loads(stripped)
+            if isinstance(candidate, dict):
+                return candidate
+        except orjson.JSONDecodeError:
+            pass
+    scanner = JsonObjectScanner()
+    return scanner.feed(text) or scanner.finish()
+
+
+def parse_structured(text: str, schema: Type[BaseModel], call_site: str) -> Optional[Dict[str, Any]]:
+    """Extract and validate a model response, None (and a counted failure) if it doesn't fit the schema"""
+    metrics.increment("llm_parse_attempts", call_site=call_site)
+
+    data = extract_json_object(text)
+    if data is None:
+        metrics.increment("llm_parse_failures", call_site=call_site, reason="no_json")
+        logger.warning(f"No JSON object in {call_site} response ({len(text)} chars)")
+        return None
+
+    try:
+        return schema.model_validate(data).model_dump()
+    except ValidationError as e:
+        metrics.increment("llm_parse_failures", call_site=call_site, reason="invalid")
+        logger.warning(f"Invalid {call_site} response: {e.error_count()} validation errors")
+        return None
+
+
+def json_schema_format(schema: Type[BaseModel]) -> Dict[str, Any]:
+    """OpenRouter response_format requesting output that matches the schema"""
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": schema.__name__,
+            "strict": False,
+            "schema": schema.model_json_schema()
+        }
+    }
+
+
+def supports_json_schema(model: str) -> bool:
+    """Whether response_format json_schema can be sent to this model"""
+    return model.startswith(tuple(settings.ai_json_schema_model_prefixes))
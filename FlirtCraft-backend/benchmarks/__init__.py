@@ -0,0 +1,13 @@
+"""
+Local benchmarks and load tests for FlirtCraft Backend
+Run from the backend directory, e.g. python -m benchmarks.db_pool_occupancy; nothing here touches
+Supabase, OpenRouter or a real Redis, so the settings below are placeholders
+"""
+
+import os
+
+os.environ.setdefault("ENVIRONMENT", "development")
+os.environ.setdefault("SUPABASE_URL", "https://bench.supabase.co")
+os.environ.setdefault("SUPABASE_ANON_KEY", "bench-anon-key")
+os.environ.setdefault("OPENROUTER_API_KEY", "bench-openrouter-key")
+os.environ.setdefault("STRUCTURED_LOGGING", "false")
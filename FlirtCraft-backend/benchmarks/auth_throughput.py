@@ -0,0 +1,142 @@
+"""
+Login throughput under concurrency against the local GoTrue stub
+Each simulated login signs in with a password and verifies the returned token, either through the
+async pooled GoTrueClient or with blocking HTTP calls made from the event loop (how the sync
+supabase-py client behaved); a ticker measures how long the event loop was held up
+
+    python -m benchmarks.auth_throughput [--logins 200] [--concurrency 50] [--latency 0.05]
+"""
+
+import argparse
+import asyncio
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+from app.core.config import settings
+from app.core.gotrue import gotrue_client
+from app.core.supabase_client import sign_in_user, verify_token
+from benchmarks.gotrue_stub import PASSWORD
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _start_stub(latency: float) -> subprocess.Popen:
+    """Run the stub in its own process so it doesn't compete with the client for the GIL"""
+    port = _free_port()
+    stub = subprocess.Popen([
+        sys.executable, "-m", "benchmarks.gotrue_stub", "--port", str(port), "--latency", str(latency)
+    ])
+    deadline = time.monotonic() + 10
+    while True:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.1):
+                break
+        except OSError:
+            if time.monotonic() > deadline:
+                stub.kill()
+                raise RuntimeError("GoTrue stub did not start")
+            time.sleep(0.05)
+    stub.base_url = f"http://127.0.0.1:{port}"
+    return stub
+
+
+async def _async_login(index: int) -> None:
+    signed_in = await sign_in_user(f"bench{index}@example.com", PASSWORD)
+    assert signed_in["success"], signed_in
+    verified = await verify_token(signed_in["session"]["access_token"])
+    assert verified["valid"], verified
+
+
+def _blocking_login(client: httpx.Client):
+    async def login(index: int) -> None:
+        response = client.post("/token", params={"grant_type": "password"}, json={
+            "email": f"bench{index}@example.com",
+            "password": PASSWORD
+        })
+        response.raise_for_status()
+        access_token = response.json()["access_token"]
+        client.get("/user", headers={"Authorization": f"Bearer {access_token}"}).raise_for_status()
+    return login
+
+
+async def _run(login, logins: int, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    lag = []
+    done = asyncio.Event()
+
+    async def ticker():
+        while not done.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(0.005)
+            lag.append(time.perf_counter() - started - 0.005)
+
+    async def one(index: int):
+        async with semaphore:
+            started = time.perf_counter()
+            await login(index)
+            latencies.append(time.perf_counter() - started)
+
+    ticking = asyncio.create_task(ticker())
+    started = time.perf_counter()
+    await asyncio.gather(*(one(index) for index in range(logins)))
+    elapsed = time.perf_counter() - started
+    done.set()
+    await ticking
+
+    latencies.sort()
+    return {
+        "elapsed": elapsed,
+        "throughput": logins / elapsed,
+        "p50": statistics.median(latencies),
+        "p95": latencies[int(len(latencies) * 0.95) - 1],
+        "max_lag": max(lag, default=0.0)
+    }
+
+
+async def main_async(args):
+    stub = _start_stub(args.latency)
+    try:
+        settings.supabase_url = stub.base_url
+        await gotrue_client.warm()
+
+        with httpx.Client(
+            base_url=f"{stub.base_url}/auth/v1",
+            headers={"apikey": settings.supabase_key, "Content-Type": "application/json"}
+        ) as blocking_client:
+            results = {
+                "blocking client": await _run(_blocking_login(blocking_client), args.logins, args.concurrency),
+                "GoTrueClient": await _run(_async_login, args.logins, args.concurrency)
+            }
+        await gotrue_client.close()
+    finally:
+        stub.terminate()
+        stub.wait()
+
+    print(f"{args.logins} logins (sign in + verify), concurrency {args.concurrency}, stub latency {args.latency * 1000:.0f}ms per call")
+    for label, result in results.items():
+        print(
+            f"  {label:<16} {result['throughput']:7.1f} logins/s  p50 {result['p50'] * 1000:7.1f}ms  "
+            f"p95 {result['p95'] * 1000:7.1f}ms  max event loop stall {result['max_lag'] * 1000:7.1f}ms"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.05)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Pool occupancy while requests wait on a slow LLM call
+Each simulated request loads a row, awaits a fake LLM call, then writes, either holding its session's
+connection across the await (the pre-guard pattern) or releasing it first (release_connection)
+
+    python -m benchmarks.db_pool_occupancy [--requests 40] [--pool-size 5] [--llm-seconds 0.5]
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from app.core import database
+from app.core.database import SessionLocal, connection_released, release_connection
+
+logging.getLogger("app.core.database").setLevel(logging.ERROR)
+
+
+async def _request(release: bool, llm_seconds: float) -> str:
+    db = SessionLocal()
+    try:
+        db.execute(text("SELECT 1"))
+        if release:
+            release_connection(db)
+        async with connection_released(db, "benchmark_llm"):
+            await asyncio.sleep(llm_seconds)
+        db.execute(text("UPDATE bench SET hits = hits + 1"))
+        db.commit()
+        return "ok"
+    except PoolTimeoutError:
+        return "pool_timeout"
+    finally:
+        db.close()
+
+
+async def _run(release: bool, requests: int, llm_seconds: float):
+    engine = database.get_engine()
+    samples = []
+    peak = {"now": 0, "max": 0}
+    done = asyncio.Event()
+
+    def on_checkout(*_):
+        peak["now"] += 1
+        peak["max"] = max(peak["max"], peak["now"])
+
+    def on_checkin(*_):
+        peak["now"] -= 1
+
+    event.listen(engine, "checkout", on_checkout)
+    event.listen(engine, "checkin", on_checkin)
+
+    async def sample():
+        while not done.is_set():
+            samples.append(engine.pool.checkedout())
+            await asyncio.sleep(0.005)
+
+    sampler = asyncio.create_task(sample())
+    started = time.perf_counter()
+    outcomes = await asyncio.gather(*(_request(release, llm_seconds) for _ in range(requests)))
+    elapsed = time.perf_counter() - started
+    done.set()
+    await sampler
+    event.remove(engine, "checkout", on_checkout)
+    event.remove(engine, "checkin", on_checkin)
+
+    return {
+        "mode": "release" if release else "hold",
+        "ok": outcomes.count("ok"),
+        "pool_timeouts": outcomes.count("pool_timeout"),
+        "seconds": elapsed,
+        "peak_checked_out": peak["max"],
+        # Sampled whenever the event loop is free, i.e. connections pinned across the await
+        "mean_checked_out": statistics.mean(samples)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=40)
+    parser.add_argument("--pool-size", type=int, default=5)
+    parser.add_argument("--pool-timeout", type=float, default=0.5)
+    parser.add_argument("--llm-seconds", type=float, default=0.5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(
+            f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+            pool_size=args.pool_size,
+            max_overflow=0,
+            pool_timeout=args.pool_timeout,
+            connect_args={"check_same_thread": False}
+        )
+        with engine.begin() as connection:
+            connection.execute(text("CREATE TABLE bench (hits INTEGER)"))
+            connection.execute(text("INSERT INTO bench VALUES (0)"))
+        database._engine = engine
+
+        print(f"{args.requests} concurrent requests, pool_size={args.pool_size}, "
+              f"pool_timeout={args.pool_timeout}s, LLM call {args.llm_seconds}s")
+        for release in (False, True):
+            result = asyncio.run(_run(release, args.requests, args.llm_seconds))
+            print(
+                f"{result['mode']:>8}: {result['ok']:3d} ok, {result['pool_timeouts']:3d} pool timeouts, "
+                f"{result['seconds']:6.2f}s, connections checked out: peak {result['peak_checked_out']}, "
+                f"mean while awaiting {result['mean_checked_out']:.2f}"
+            )
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Local stand-in for the Supabase Auth (GoTrue) REST API
+Implements the endpoints GoTrueClient calls, with a fixed artificial latency per request so the
+benchmarks see a realistic round-trip without touching Supabase
+
+    python -m benchmarks.gotrue_stub [--port 9999] [--latency 0.05]
+
+then point SUPABASE_URL at http://127.0.0.1:9999
+"""
+
+import argparse
+import asyncio
+import secrets
+import time
+import uuid
+from typing import Dict
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+PASSWORD = "correct-horse-battery"
+
+
+def create_stub(latency: float = 0.05) -> Starlette:
+    """GoTrue stub app; any email signs in with PASSWORD, and is created on first use"""
+    users: Dict[str, dict] = {}
+    tokens: Dict[str, str] = {}  # access or refresh token -> email
+
+    def user_for(email: str) -> dict:
+        if email not in users:
+            users[email] = {
+                "id": str(uuid.uuid4()),
+                "email": email,
+                "email_confirmed_at": "2026-01-01T00:00:00Z",
+                "user_metadata": {}
+            }
+        return users[email]
+
+    def session(email: str) -> dict:
+        access_token, refresh_token = secrets.token_urlsafe(24), secrets.token_urlsafe(24)
+        tokens[access_token] = tokens[refresh_token] = email
+        return {
+            "access_token": access_token,
+            "refresh_token": refresh_token,
+            "expires_in": 3600,
+            "expires_at": int(time.time()) + 3600,
+            "token_type": "bearer",
+            "user": user_for(email)
+        }
+
+    def error(status_code: int, message: str) -> JSONResponse:
+        return JSONResponse({"error": "invalid_request", "msg": message}, status_code=status_code)
+
+    def bearer(request: Request) -> str:
+        return request.headers.get("authorization", "").removeprefix("Bearer ")
+
+    async def health(request: Request):
+        return JSONResponse({"name": "GoTrue", "version": "stub"})
+
+    async def signup(request: Request):
+        await asyncio.sleep(latency)
+        body = await request.json()
+        if body["email"] in users:
+            return error(422, "User already registered")
+        return JSONResponse(session(body["email"]))
+
+    async def token(request: Request):
+        await asyncio.sleep(latency)
+        body = await request.json()
+        grant_type = request.query_params.get("grant_type")
+        if grant_type == "password":
+            if body.get("password") != PASSWORD:
+                return error(400, "Invalid login credentials")
+            return JSONResponse(session(body["email"]))
+        if grant_type == "refresh_token" and body.get("refresh_token") in tokens:
+            return JSONResponse(session(tokens.pop(body["refresh_token"])))
+        return error(400, "Invalid grant")
+
+    async def user(request: Request):
+        await asyncio.sleep(latency)
+        email = tokens.get(bearer(request))
+        if email is None:
+            return error(401, "invalid JWT: token is expired or unknown")
+        return JSONResponse(user_for(email))
+
+    async def logout(request: Request):
+        await asyncio.sleep(latency)
+        tokens.pop(bearer(request), None)
+        return Response(status_code=204)
+
+    return Starlette(routes=[
+        Route("/auth/v1/health", health),
+        Route("/auth/v1/signup", signup, methods=["POST"]),
+        Route("/auth/v1/token", token, methods=["POST"]),
+        Route("/auth/v1/user", user),
+        Route("/auth/v1/logout", logout, methods=["POST"]),
+    ])
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=9999)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds added to every auth call")
+    args = parser.parse_args()
+    uvicorn.run(create_stub(args.latency), host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Serialization cost of a 20-message conversation payload
+Compares the StandardResponse path (response_model validation, jsonable_encoder, stdlib json) with
+fast_response (orjson straight from the dict), and checks rate limit headers survive the fast path
+
+    python -m benchmarks.response_serialization [--iterations 2000] [--messages 20]
+"""
+
+import argparse
+import json
+import timeit
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+
+from app.core.responses import fast_response
+from app.schemas.user import StandardResponse
+
+
+def _payload(messages: int) -> dict:
+    started = datetime.now(timezone.utc)
+    return {
+        "conversation": {
+            "id": uuid.uuid4(),
+            "status": "active",
+            "start_time": started,
+            "total_messages": messages,
+            "can_continue": True
+        },
+        "messages": [
+            {
+                "id": uuid.uuid4(),
+                "sender_type": "user" if index % 2 == 0 else "ai",
+                "content": "That's a great point, I hadn't thought of it that way before. " * 2,
+                "timestamp": started + timedelta(seconds=index * 20),
+                "message_order": index + 1,
+                "ai_feedback": {"confidence": 0.8, "suggestions": ["Ask a follow-up question"]}
+            }
+            for index in range(messages)
+        ]
+    }
+
+
+def _standard(payload: dict) -> bytes:
+    # What FastAPI does for a response_model=StandardResponse endpoint returning the model
+    model = StandardResponse(success=True, data=payload, message="Message sent")
+    validated = StandardResponse.model_validate(model.model_dump())
+    return JSONResponse(content=jsonable_encoder(validated)).body
+
+
+def _fast(payload: dict, injected: Response) -> bytes:
+    return fast_response(data=payload, message="Message sent", response=injected).body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--messages", type=int, default=20)
+    args = parser.parse_args()
+
+    payload = _payload(args.messages)
+    injected = Response()
+    del injected.headers["content-length"]
+    injected.headers["X-RateLimit-Limit"] = "30"
+    injected.headers["X-RateLimit-Remaining"] = "29"
+
+    fast = fast_response(data=payload, message="Message sent", response=injected)
+    # Same document; pydantic writes UTC as "Z", orjson as "+00:00"
+    standard = _standard(payload).replace(b'Z"', b'+00:00"')
+    assert json.loads(fast.body) == json.loads(standard), "fast path changed the payload"
+    assert fast.headers["X-RateLimit-Remaining"] == "29", "rate limit headers were dropped"
+    assert fast.headers["content-length"] == str(len(fast.body))
+
+    print(f"{args.messages}-message payload, {len(fast.body)} bytes, {args.iterations} iterations")
+    results = {}
+    for label, run in (("StandardResponse", lambda: _standard(payload)), ("fast_response", lambda: _fast(payload, injected))):
+        seconds = min(timeit.repeat(run, number=args.iterations, repeat=3))
+        results[label] = seconds
+        print(f"  {label:<18} {seconds / args.iterations * 1e6:8.1f} us/response")
+    print(f"  speedup            {results['StandardResponse'] / results['fast_response']:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Per-call time and allocation of the pre-conversation context
+Compares building it from the registry on every call, the cached context copied with deepcopy, and
+mock_context (cached immutable context, fresh top-level dict and environment)
+
+    python -m benchmarks.scenario_context [--iterations 20000]
+"""
+
+import argparse
+import copy
+import timeit
+import tracemalloc
+
+from app.services.scenario_content import _mock_context, mock_context
+
+ARGS = ("coffee_shop", "green", "female")
+
+
+def _build():
+    # The uncached builder: every lookup and the dict itself on each call
+    context = _mock_context.__wrapped__(*ARGS)
+    return {**context, "environment": dict(context["environment"])}
+
+
+# The context cached as plain dicts, as it was before it was made immutable
+_PLAIN = _build()
+
+
+def _deepcopy():
+    return copy.deepcopy(_PLAIN)
+
+
+def _cached():
+    return mock_context(*ARGS)
+
+
+def _allocated(run, calls: int = 1000) -> float:
+    kept = []
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for _ in range(calls):
+        kept.append(run())
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before) / calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    assert _build() == _deepcopy() == _cached()
+
+    print(f"{args.iterations} calls for {'/'.join(ARGS)}")
+    for label, run in (("build every call", _build), ("cached + deepcopy", _deepcopy), ("mock_context", _cached)):
+        seconds = min(timeit.repeat(run, number=args.iterations, repeat=3))
+        print(f"  {label:<18} {seconds / args.iterations * 1e6:6.2f} us/call  {_allocated(run):7.0f} bytes retained/call")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Request throughput against worker count and DB connection budget
+Starts the production launcher (gunicorn -c gunicorn.conf.py) for each WEB_CONCURRENCY x DB_MAX_CONNECTIONS
+combination and drives it with concurrent requests. Every request holds one of its worker's db_pool_size
+"connections" for --db-seconds (a semaphore standing in for the SQLAlchemy pool, so no database is needed),
+then serializes a 20-message conversation with fast_response; a request that can't get a connection
+within DB_POOL_TIMEOUT gets a 503, as pool exhaustion does in the API
+
+    python -m benchmarks.worker_throughput [--workers 1 2 4] [--budgets 8 40] [--requests 2000] [--concurrency 100]
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from typing import Optional
+
+import httpx
+from fastapi import FastAPI, HTTPException
+
+from app.core.config import settings
+from app.core.responses import fast_response
+from benchmarks.response_serialization import _payload
+
+app = FastAPI()
+_conversation = _payload(20)
+_pool: Optional[asyncio.Semaphore] = None
+_db_seconds = float(os.getenv("BENCH_DB_SECONDS", "0.01"))
+
+
+@app.get("/turn")
+async def turn():
+    global _pool
+    if _pool is None:
+        # One per worker process, sized like the worker's SQLAlchemy pool
+        _pool = asyncio.Semaphore(settings.db_pool_size)
+    try:
+        await asyncio.wait_for(_pool.acquire(), timeout=settings.db_pool_timeout)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=503, detail="Database pool exhausted")
+    try:
+        await asyncio.sleep(_db_seconds)
+    finally:
+        _pool.release()
+    return fast_response(data=_conversation)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _start(workers: int, budget: int, db_seconds: float) -> subprocess.Popen:
+    port = _free_port()
+    env = {
+        **os.environ,
+        "WEB_CONCURRENCY": str(workers),
+        "DB_MAX_CONNECTIONS": str(budget),
+        "BENCH_DB_SECONDS": str(db_seconds),
+        "HOST": "127.0.0.1",
+        "PORT": str(port)
+    }
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "benchmarks.worker_throughput:app"],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+    server.base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{server.base_url}/turn", timeout=5).status_code == 200:
+                return server
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    server.kill()
+    raise RuntimeError("gunicorn did not start")
+
+
+async def _load(base_url: str, requests: int, concurrency: int) -> dict:
+    latencies = []
+    statuses = {}
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        async def one():
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    outcome = (await client.get("/turn")).status_code
+                except httpx.HTTPError:
+                    outcome = "error"
+                latencies.append(time.perf_counter() - started)
+                statuses[outcome] = statuses.get(outcome, 0) + 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(requests)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "throughput": statuses.get(200, 0) / elapsed,
+        "p50": statistics.median(latencies),
+        "p95": latencies[int(len(latencies) * 0.95) - 1],
+        "rejected": statuses.get(503, 0),
+        "errors": requests - statuses.get(200, 0) - statuses.get(503, 0)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--budgets", type=int, nargs="+", default=[8, 40], help="DB_MAX_CONNECTIONS values")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--db-seconds", type=float, default=0.01, help="time each request holds a connection")
+    args = parser.parse_args()
+
+    print(
+        f"{args.requests} requests, concurrency {args.concurrency}, {args.db_seconds * 1000:.0f}ms per DB hold, "
+        f"DB_POOL_TIMEOUT {settings.db_pool_timeout:g}s, {os.cpu_count()} CPUs"
+    )
+    for budget in args.budgets:
+        for workers in args.workers:
+            server = _start(workers, budget, args.db_seconds)
+            try:
+                result = asyncio.run(_load(server.base_url, args.requests, args.concurrency))
+            finally:
+                server.terminate()
+                server.wait()
+            pool_size = max(2, budget // workers)
+            print(
+                f"  workers {workers}  budget {budget:3d} ({pool_size:2d}/worker)  {result['throughput']:7.1f} req/s  "
+                f"p50 {result['p50'] * 1000:6.1f}ms  p95 {result['p95'] * 1000:6.1f}ms  "
+                f"503s {result['rejected']}  errors {result['errors']}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+"""
+Gunicorn configuration for FlirtCraft Backend production
+Uvicorn workers on a preloaded app: the app is imported once in the master and forked, each worker
+re-opens its own DB, Redis and HTTP connections (see the os.register_at_fork hooks) sized from the
+global connection budget in Settings
+"""
+
+import os
+
+from app.core.config import settings
+
+bind = f"{settings.host}:{os.getenv('PORT', settings.port)}"
+workers = settings.web_concurrency
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+
+# AI calls can legitimately take up to ai_response_timeout
+timeout = int(settings.ai_response_timeout) + 30
+graceful_timeout = 30
+keepalive = 5
+
+# Recycle workers periodically to bound memory growth, jittered so they don't restart together
+max_requests = 5000
+max_requests_jitter = 500
+
+forwarded_allow_ips = "*"
+accesslog = None  # requests are logged by the app's access logger
+errorlog = "-"
+loglevel = "info"
+
+
+def when_ready(server):
+    server.log.info(
+        f"Serving with {settings.web_concurrency} workers: "
+        f"{settings.db_pool_size} DB / {settings.redis_pool_size} Redis connections each"
+    )
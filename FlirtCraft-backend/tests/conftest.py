@@ -0,0 +1,77 @@
+"""
+Shared fixtures for the FlirtCraft Backend tests
+Settings are read at import, so the test environment is set up before anything from app is imported
+"""
+
+import os
+import uuid
+
+os.environ.setdefault("ENVIRONMENT", "test")
+os.environ.setdefault("SUPABASE_URL", "https://test.supabase.co")
+os.environ.setdefault("SUPABASE_ANON_KEY", "test-anon-key")
+os.environ.setdefault("OPENROUTER_API_KEY", "test-openrouter-key")
+os.environ.setdefault("STRUCTURED_LOGGING", "false")
+
+import fakeredis
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.dialects.postgresql import ARRAY, UUID
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.pool import StaticPool
+
+from app.core import database
+from app.core.redis_client import redis_client
+from app.models.user import Conversation, ConversationMessage, User, UserProfile
+
+
+
+@compiles(UUID, "sqlite")
+def _compile_uuid_for_sqlite(type_, compiler, **kw):
+    return "CHAR(32)"
+
+
+_uuid_bind_processor = UUID.bind_processor
+
+
+def _bind_uuid_or_str(self, dialect):
+    # Postgres takes string ids for UUID columns (job payloads and path params carry them), SQLite's CHAR(32) doesn't
+    process = _uuid_bind_processor(self, dialect)
+    if process is None or dialect.name != "sqlite":
+        return process
+    return lambda value: process(uuid.UUID(value) if isinstance(value, str) else value)
+
+
+UUID.bind_processor = _bind_uuid_or_str
+
+
+@compiles(ARRAY, "sqlite")
+def _compile_array_for_sqlite(type_, compiler, **kw):
+    # Lets user_profiles be created and queried; tests don't write ARRAY values
+    return "JSON"
+
+
+# Tables the tests need, creatable on SQLite
+SQLITE_TABLES = [User.__table__, UserProfile.__table__, Conversation.__table__, ConversationMessage.__table__]
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    """Point the global Redis client at an in-memory fakeredis server (Lua scripts included)"""
+    client = fakeredis.FakeRedis(decode_responses=True)
+    monkeypatch.setattr(redis_client, "_client", client)
+    monkeypatch.setattr(redis_client, "_connected", True)
+    monkeypatch.setattr(redis_client, "_rate_limit_script", None)
+    monkeypatch.setattr(redis_client, "_quota_acquire_script", None)
+    monkeypatch.setattr(redis_client, "_quota_release_script", None)
+    yield client
+    client.flushall()
+
+
+@pytest.fixture
+def db_engine(monkeypatch):
+    """In-memory SQLite engine behind SessionLocal/get_db"""
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    database.Base.metadata.create_all(engine, tables=SQLITE_TABLES)
+    monkeypatch.setattr(database, "_engine", engine)
+    yield engine
+    engine.dispose()
@@ -0,0 +1,438 @@
+"""Conversation AI jobs run by the worker: feedback, running assessment and rolling summary"""
+
+import asyncio
+import json
+import uuid
+from datetime import datetime, timedelta
+
+import orjson
+import pytest
+from fastapi import Response
+from sqlalchemy.exc import OperationalError
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.redis_client import redis_client
+from app.models.user import Conversation, ConversationMessage, User
+from app.routers import conversations
+from app.services import conversation_jobs
+from app.services.openrouter import OpenRouterService
+from app.services.prompts import FINALIZATION_PROMPT, FEEDBACK_PROMPT
+
+FEEDBACK = {"overall_score": 84, "encouragement": "Nice flow!"}
+
+MODEL_FEEDBACK = {
+    "overall_score": 71,
+    "strengths": ["Warm opener"],
+    "areas_for_improvement": ["Follow-up questions"],
+    "conversation_flow_score": 70,
+    "confidence_level_score": 72,
+    "engagement_score": 74
+}
+
+
+class FakeOpenRouter:
+    """Records what each job sent and answers with canned results"""
+
+    def __init__(self):
+        self.calls = []
+        self.hold = {}  # call number -> Event the call waits on before answering
+
+    async def generate_feedback(self, **kwargs):
+        self.calls.append(("feedback", kwargs))
+        return {"success": True, "feedback": dict(FEEDBACK)}
+
+    async def update_assessment(self, **kwargs):
+        self.calls.append(("assessment", kwargs))
+        if len(self.calls) in self.hold:
+            await self.hold[len(self.calls)].wait()
+        seen = [msg["content"] for msg in kwargs["new_messages"]]
+        return {"success": True, "assessment": {"overall_score": 70, "notes": f"through {seen[-1]}"}}
+
+    async def summarize_conversation(self, **kwargs):
+        self.calls.append(("summary", kwargs))
+        if len(self.calls) in self.hold:
+            await self.hold[len(self.calls)].wait()
+        return {"success": True, "summary": f"Chatted up to {kwargs['messages'][-1]['content']}"}
+
+
+@pytest.fixture
+def openrouter(monkeypatch) -> FakeOpenRouter:
+    fake = FakeOpenRouter()
+    monkeypatch.setattr(conversation_jobs, "openrouter_service", fake)
+    monkeypatch.setattr(settings, "feedback_job_retry_backoff", 0)
+    return fake
+
+
+@pytest.fixture
+def db(db_engine, fake_redis):
+    session = SessionLocal()
+    yield session
+    session.close()
+
+
+def make_conversation(db, messages: int, status: str = "completed") -> str:
+    """A conversation with alternating user/ai messages numbered from 1; returns its id as a string"""
+    user = User(id=uuid.uuid4(), email=f"{uuid.uuid4().hex}@example.com")
+    conversation = Conversation(
+        id=uuid.uuid4(), user_id=user.id, scenario_type="coffee_shop", difficulty_level="green",
+        status=status, total_messages=messages
+    )
+    if status != "active":
+        conversation.end_time = datetime.utcnow() + timedelta(minutes=5)
+    db.add_all([user, conversation])
+    db.add_all([
+        ConversationMessage(
+            conversation_id=conversation.id,
+            sender_type="user" if order % 2 else "ai",
+            content=f"message {order}",
+            message_order=order
+        )
+        for order in range(1, messages + 1)
+    ])
+    db.commit()
+    return str(conversation.id)
+
+
+def _stored_feedback(db, conversation_id: str):
+    db.expire_all()
+    return db.get(Conversation, uuid.UUID(conversation_id))
+
+
+def _flaky(step, failures: int):
+    """Wrap a DB step so its first calls fail like a dropped connection"""
+    calls = {"n": 0}
+
+    def run(*args, **kwargs):
+        calls["n"] += 1
+        if calls["n"] <= failures:
+            raise OperationalError("SELECT 1", {}, Exception("server closed the connection"))
+        return step(*args, **kwargs)
+
+    return run
+
+
+async def test_feedback_is_stored_and_job_state_cleared(db, openrouter):
+    conversation_id = make_conversation(db, 4)
+    redis_client.set_cache(conversation_jobs.assessment_cache_key(conversation_id), {"messages_assessed": 4})
+
+    assert await conversation_jobs.run_feedback_job(conversation_id)
+
+    conversation = _stored_feedback(db, conversation_id)
+    assert conversation.feedback_metrics == FEEDBACK
+    assert conversation.session_score == 84
+    assert conversation.outcome_level == "gold"
+    assert redis_client.get_cache(conversation_jobs.assessment_cache_key(conversation_id)) is None
+
+
+async def test_duplicate_feedback_delivery_is_a_no_op(db, openrouter):
+    conversation_id = make_conversation(db, 4)
+    assert await conversation_jobs.run_feedback_job(conversation_id)
+
+    assert await conversation_jobs.run_feedback_job(conversation_id)
+
+    assert len(openrouter.calls) == 1
+
+
+async def test_transient_load_failure_is_retried(db, openrouter, monkeypatch):
+    monkeypatch.setattr(settings, "feedback_job_max_attempts", 3)
+    monkeypatch.setattr(
+        conversation_jobs, "_load_feedback_inputs", _flaky(conversation_jobs._load_feedback_inputs, failures=2)
+    )
+    conversation_id = make_conversation(db, 4)
+
+    assert await conversation_jobs.run_feedback_job(conversation_id)
+
+    assert _stored_feedback(db, conversation_id).feedback_metrics == FEEDBACK
+    assert redis_client.get_cache(conversation_jobs.feedback_failed_cache_key(conversation_id)) is None
+
+
+async def test_exhausted_retries_mark_feedback_failed(db, openrouter, monkeypatch):
+    monkeypatch.setattr(settings, "feedback_job_max_attempts", 2)
+    monkeypatch.setattr(conversation_jobs, "_store_feedback", _flaky(conversation_jobs._store_feedback, failures=2))
+    conversation_id = make_conversation(db, 4)
+
+    assert not await conversation_jobs.run_feedback_job(conversation_id)
+
+    # Generated once; only the failing write was retried
+    assert len(openrouter.calls) == 1
+    assert _stored_feedback(db, conversation_id).feedback_metrics is None
+    assert redis_client.get_cache(conversation_jobs.feedback_failed_cache_key(conversation_id)) is not None
+
+    user = db.get(User, _stored_feedback(db, conversation_id).user_id)
+    result = await conversations.get_conversation_feedback(conversation_id, Response(), user, db, redis_client)
+    assert orjson.loads(result.body)["data"]["feedback_status"] == "failed"
+
+
+async def test_feedback_is_pending_while_the_job_runs(db):
+    conversation_id = make_conversation(db, 4)
+    user = db.get(User, _stored_feedback(db, conversation_id).user_id)
+
+    result = await conversations.get_conversation_feedback(conversation_id, Response(), user, db, redis_client)
+
+    assert orjson.loads(result.body)["data"]["feedback_status"] == "pending"
+
+
+def _assessment(conversation_id: str):
+    return redis_client.get_cache(conversation_jobs.assessment_cache_key(conversation_id), as_json=True)
+
+
+def _add_messages(db, conversation_id: str, orders):
+    db.add_all([
+        ConversationMessage(
+            conversation_id=uuid.UUID(conversation_id),
+            sender_type="user" if order % 2 else "ai",
+            content=f"message {order}",
+            message_order=order
+        )
+        for order in orders
+    ])
+    db.commit()
+
+
+async def test_assessment_only_sends_unassessed_turns(db, openrouter):
+    conversation_id = make_conversation(db, 2, status="active")
+    assert await conversation_jobs.run_assessment_job(conversation_id)
+    _add_messages(db, conversation_id, [3, 4])
+
+    assert await conversation_jobs.run_assessment_job(conversation_id)
+
+    second = openrouter.calls[1][1]
+    assert [msg["content"] for msg in second["new_messages"]] == ["message 3", "message 4"]
+    assert second["partial_assessment"]["messages_assessed"] == 2
+    assert _assessment(conversation_id)["messages_assessed"] == 4
+
+
+async def test_late_job_after_a_newer_one_is_a_no_op(db, openrouter):
+    conversation_id = make_conversation(db, 4, status="active")
+
+    # The job queued after turn 4 runs first and catches up on everything
+    assert await conversation_jobs.run_assessment_job(conversation_id)
+    # The turn-2 job arrives late and finds nothing left to assess
+    assert await conversation_jobs.run_assessment_job(conversation_id)
+
+    assert len(openrouter.calls) == 1
+    assert _assessment(conversation_id)["messages_assessed"] == 4
+
+
+async def test_slow_stale_job_does_not_overwrite_a_newer_assessment(db, openrouter):
+    conversation_id = make_conversation(db, 2, status="active")
+    openrouter.hold[1] = asyncio.Event()
+
+    stale = asyncio.create_task(conversation_jobs.run_assessment_job(conversation_id))
+    await asyncio.sleep(0)
+    _add_messages(db, conversation_id, [3, 4])
+    assert await conversation_jobs.run_assessment_job(conversation_id)
+    openrouter.hold[1].set()
+    assert await stale
+
+    assessment = _assessment(conversation_id)
+    assert assessment["messages_assessed"] == 4
+    assert assessment["notes"] == "through message 4"
+
+
+async def test_failed_assessment_keeps_the_previous_state(db, openrouter, monkeypatch):
+    conversation_id = make_conversation(db, 2, status="active")
+    assert await conversation_jobs.run_assessment_job(conversation_id)
+    _add_messages(db, conversation_id, [3, 4])
+
+    async def fail(**kwargs):
+        return {"success": False, "error": "Assessment response was not valid JSON"}
+    monkeypatch.setattr(openrouter, "update_assessment", fail)
+
+    assert not await conversation_jobs.run_assessment_job(conversation_id)
+    assert _assessment(conversation_id)["messages_assessed"] == 2
+
+
+async def test_ended_conversation_is_not_assessed(db, openrouter):
+    conversation_id = make_conversation(db, 4)
+
+    assert not await conversation_jobs.run_assessment_job(conversation_id)
+    assert openrouter.calls == []
+
+
+@pytest.fixture
+def model_prompts(monkeypatch) -> list:
+    """Run the jobs through the real OpenRouterService, capturing each prompt instead of calling the API"""
+    service = OpenRouterService()
+    prompts = []
+
+    async def call(prompt, call_site="chat", **kwargs):
+        prompts.append(prompt)
+        return json.dumps(MODEL_FEEDBACK), "test-model"
+
+    monkeypatch.setattr(service, "_call_openrouter", call)
+    monkeypatch.setattr(conversation_jobs, "openrouter_service", service)
+    return prompts
+
+
+async def test_feedback_finalizes_the_partial_assessment(db, fake_redis, model_prompts):
+    conversation_id = make_conversation(db, 6)
+    redis_client.set_cache(
+        conversation_jobs.assessment_cache_key(conversation_id),
+        {"overall_score": 68, "notes": "warming up", "messages_assessed": 4}
+    )
+
+    assert await conversation_jobs.run_feedback_job(conversation_id)
+
+    prompt = model_prompts[0]
+    assert prompt.system == FINALIZATION_PROMPT.system
+    assert '"notes": "warming up"' in prompt.user
+    assert "messages_assessed" not in prompt.user
+    assert "message 5" in prompt.user and "message 6" in prompt.user
+    assert "message 4" not in prompt.user
+    assert _stored_feedback(db, conversation_id).session_score == 71
+
+
+async def test_feedback_with_a_fully_covering_assessment_sends_no_turns(db, fake_redis, model_prompts):
+    conversation_id = make_conversation(db, 4)
+    redis_client.set_cache(
+        conversation_jobs.assessment_cache_key(conversation_id),
+        {"overall_score": 68, "messages_assessed": 4}
+    )
+
+    assert await conversation_jobs.run_feedback_job(conversation_id)
+
+    assert model_prompts[0].system == FINALIZATION_PROMPT.system
+    assert model_prompts[0].user.endswith("Final exchanges not yet covered by the assessment:\nNone")
+
+
+async def test_feedback_without_an_assessment_scores_the_full_transcript(db, fake_redis, model_prompts):
+    conversation_id = make_conversation(db, 4)
+
+    assert await conversation_jobs.run_feedback_job(conversation_id)
+
+    prompt = model_prompts[0]
+    assert prompt.system == FEEDBACK_PROMPT.system
+    assert all(f"message {order}" in prompt.user for order in range(1, 5))
+
+
+def _summary(conversation_id: str):
+    return redis_client.get_cache(conversation_jobs.summary_cache_key(conversation_id), as_json=True)
+
+
+@pytest.fixture
+def summary_window(monkeypatch):
+    monkeypatch.setattr(settings, "conversation_recent_messages", 2)
+    monkeypatch.setattr(settings, "conversation_summary_trigger_messages", 4)
+
+
+def test_summary_refresh_threshold(summary_window):
+    assert not conversation_jobs.summary_needs_refresh(None, 4)
+    assert conversation_jobs.summary_needs_refresh(None, 5)
+    assert not conversation_jobs.summary_needs_refresh({"messages_summarized": 4}, 8)
+    assert conversation_jobs.summary_needs_refresh({"messages_summarized": 4}, 9)
+
+
+async def test_summary_leaves_the_recent_turns_out(db, openrouter, summary_window):
+    conversation_id = make_conversation(db, 6, status="active")
+
+    assert await conversation_jobs.run_summary_job(conversation_id)
+
+    call = openrouter.calls[0][1]
+    assert call["previous_summary"] is None
+    assert [msg["content"] for msg in call["messages"]] == [f"message {order}" for order in range(1, 5)]
+    assert _summary(conversation_id) == {"summary": "Chatted up to message 4", "messages_summarized": 4}
+
+
+async def test_summary_folds_in_only_newer_turns(db, openrouter, summary_window):
+    conversation_id = make_conversation(db, 6, status="active")
+    assert await conversation_jobs.run_summary_job(conversation_id)
+    _add_messages(db, conversation_id, [7, 8, 9])
+
+    assert await conversation_jobs.run_summary_job(conversation_id)
+
+    call = openrouter.calls[1][1]
+    assert call["previous_summary"] == "Chatted up to message 4"
+    assert [msg["content"] for msg in call["messages"]] == ["message 5", "message 6", "message 7"]
+    assert _summary(conversation_id)["messages_summarized"] == 7
+
+
+async def test_nothing_old_enough_to_summarize(db, openrouter, summary_window):
+    conversation_id = make_conversation(db, 2, status="active")
+
+    assert await conversation_jobs.run_summary_job(conversation_id)
+
+    assert openrouter.calls == []
+    assert _summary(conversation_id) is None
+
+
+async def test_slow_stale_summary_does_not_overwrite_a_newer_one(db, openrouter, summary_window):
+    conversation_id = make_conversation(db, 4, status="active")
+    openrouter.hold[1] = asyncio.Event()
+
+    stale = asyncio.create_task(conversation_jobs.run_summary_job(conversation_id))
+    await asyncio.sleep(0)
+    _add_messages(db, conversation_id, [5, 6, 7, 8])
+    assert await conversation_jobs.run_summary_job(conversation_id)
+    openrouter.hold[1].set()
+    assert await stale
+
+    assert _summary(conversation_id) == {"summary": "Chatted up to message 6", "messages_summarized": 6}
+
+
+async def test_failed_summary_keeps_the_previous_one(db, openrouter, summary_window, monkeypatch):
+    conversation_id = make_conversation(db, 6, status="active")
+    assert await conversation_jobs.run_summary_job(conversation_id)
+    _add_messages(db, conversation_id, [7, 8, 9])
+
+    async def fail(**kwargs):
+        return {"success": False, "error": "upstream 500"}
+    monkeypatch.setattr(openrouter, "summarize_conversation", fail)
+
+    assert not await conversation_jobs.run_summary_job(conversation_id)
+    assert _summary(conversation_id)["messages_summarized"] == 4
+
+
+def _history(count: int) -> list:
+    return [
+        {"sender": "user" if order % 2 else "ai", "content": f"message {order}"}
+        for order in range(1, count + 1)
+    ]
+
+
+def test_chat_prompt_stitches_the_summary_and_recent_turns(summary_window):
+    prompt = OpenRouterService()._build_conversation_prompt(
+        {
+            "scenario_type": "coffee_shop",
+            "difficulty_level": "green",
+            "character": {},
+            "summary": {"summary": "They both like jazz.", "messages_summarized": 4}
+        },
+        "Seen any shows lately?",
+        _history(7)
+    )
+
+    transcript = prompt.user.split("Previous conversation:\n", 1)[1].split("The user just said:", 1)[0]
+    assert transcript == (
+        "(Summary of earlier conversation: They both like jazz.)\n"
+        "User: message 5\n"
+        "AI: message 6\n"
+        "User: message 7\n"
+        "\n"
+    )
+
+
+def test_chat_prompt_without_a_summary_keeps_the_latest_window(summary_window):
+    prompt = OpenRouterService()._build_conversation_prompt(
+        {"scenario_type": "coffee_shop", "difficulty_level": "green", "character": {}},
+        "Hi",
+        _history(7)
+    )
+
+    assert "Summary of earlier conversation" not in prompt.user
+    assert "message 3" not in prompt.user
+    assert all(f"message {order}" in prompt.user for order in range(4, 8))
+
+
+def test_feedback_prompt_reads_the_summary_for_older_turns():
+    prompt = OpenRouterService()._build_feedback_prompt(
+        _history(6),
+        ["conversation_starters"],
+        {"scenario_type": "coffee_shop"},
+        {"summary": "They both like jazz.", "messages_summarized": 4}
+    )
+
+    assert "(Summary of earlier conversation: They both like jazz.)" in prompt.user
+    assert "message 4" not in prompt.user
+    assert "message 5" in prompt.user and "message 6" in prompt.user
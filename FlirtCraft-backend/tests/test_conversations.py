@@ -0,0 +1,167 @@
+"""AI endpoints under the strict connection guard: nothing may touch the database during the call"""
+
+import asyncio
+import uuid
+from types import SimpleNamespace
+
+import orjson
+import pytest
+from fastapi import BackgroundTasks, Request, Response
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.quota import conversation_quota_used
+from app.core.redis_client import redis_client
+from app.models.user import Conversation, User
+from app.routers import conversations
+from app.routers.conversations import ConversationCreateRequest, MessageRequest
+from app.services.conversation_jobs import summary_cache_key
+
+PROFILE = SimpleNamespace(experience_level="beginner", target_gender="female", target_age_min=24, target_age_max=32)
+
+
+class FakeOpenRouter:
+    """Answers straight away and records what each call was given"""
+
+    def __init__(self):
+        self.calls = []
+
+    async def generate_conversation_character(self, **kwargs):
+        self.calls.append(kwargs)
+        return {"success": True, "character": {"name": "Maya", "context_tips": [], "conversation_starters": []}}
+
+    async def generate_ai_response(self, **kwargs):
+        self.calls.append(kwargs)
+        return {"success": True, "response": {"content": "Hi!", "body_language": "smiles", "receptiveness": "high"}}
+
+
+class HangingOpenRouter(FakeOpenRouter):
+    """Never answers, so the request can be cancelled mid AI call"""
+
+    def __init__(self):
+        super().__init__()
+        self.started = asyncio.Event()
+
+    async def generate_conversation_character(self, **kwargs):
+        self.started.set()
+        await asyncio.Event().wait()
+
+    async def generate_ai_response(self, **kwargs):
+        self.started.set()
+        await asyncio.Event().wait()
+
+
+@pytest.fixture
+def db(db_engine, fake_redis, monkeypatch):
+    monkeypatch.setattr(settings, "enable_background_jobs", False)
+    monkeypatch.setattr(conversations, "get_cached_profile", lambda db, user_id: PROFILE)
+    session = SessionLocal()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def premium_user(db) -> User:
+    """Loaded the way get_current_user leaves it: attached to the request's session, transaction open"""
+    user_id = uuid.uuid4()
+    db.add(User(id=user_id, email="maya@example.com", onboarding_completed=True, is_premium=True))
+    db.commit()
+    return db.get(User, user_id)
+
+
+def _request(idempotency_key: str = None) -> Request:
+    headers = [(b"idempotency-key", idempotency_key.encode())] if idempotency_key else []
+    return Request({"type": "http", "headers": headers})
+
+
+async def _cancel_mid_call(openrouter: HangingOpenRouter, call):
+    task = asyncio.create_task(call)
+    await openrouter.started.wait()
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+
+async def test_create_conversation_reads_nothing_during_the_ai_call(db, premium_user):
+    openrouter = FakeOpenRouter()
+
+    result = await conversations.create_conversation(
+        ConversationCreateRequest(scenario_type="coffee_shop", difficulty_level="green"),
+        _request(), Response(), BackgroundTasks(), premium_user, db, openrouter, redis_client
+    )
+
+    assert result.status_code == 200
+    assert orjson.loads(result.body)["data"]["scenario_type"] == "coffee_shop"
+    assert openrouter.calls[0]["priority"] == "premium"
+    assert openrouter.calls[0]["user_id"] == str(premium_user.id)
+
+
+async def test_send_message_reads_nothing_during_the_ai_call(db, premium_user):
+    conversation_id = uuid.uuid4()
+    db.add(Conversation(
+        id=conversation_id, user_id=premium_user.id, scenario_type="coffee_shop",
+        difficulty_level="green", ai_character_context={}, status="active"
+    ))
+    db.commit()
+    premium_user = db.get(User, premium_user.id)
+    openrouter = FakeOpenRouter()
+
+    result = await conversations.send_message(
+        conversation_id, MessageRequest(content="Hey, is this seat taken?"),
+        _request(), Response(), BackgroundTasks(), premium_user, db, openrouter, redis_client
+    )
+
+    assert result.status_code == 200
+    assert orjson.loads(result.body)["data"]["ai_response"]["content"] == "Hi!"
+    assert openrouter.calls[0]["priority"] == "premium"
+    assert openrouter.calls[0]["user_id"] == str(premium_user.id)
+
+
+async def test_send_message_passes_the_rolling_summary(db, premium_user):
+    conversation_id = uuid.uuid4()
+    db.add(Conversation(
+        id=conversation_id, user_id=premium_user.id, scenario_type="coffee_shop",
+        difficulty_level="green", ai_character_context={}, status="active"
+    ))
+    db.commit()
+    premium_user = db.get(User, premium_user.id)
+    summary = {"summary": "They both like jazz.", "messages_summarized": 12}
+    redis_client.set_cache(summary_cache_key(str(conversation_id)), summary)
+    openrouter = FakeOpenRouter()
+
+    await conversations.send_message(
+        str(conversation_id), MessageRequest(content="Seen any shows lately?"),
+        _request(), Response(), BackgroundTasks(), premium_user, db, openrouter, redis_client
+    )
+
+    assert openrouter.calls[0]["conversation_context"]["summary"] == summary
+
+
+async def test_cancelled_create_conversation_gives_back_the_key_and_the_quota_slot(db, premium_user, fake_redis):
+    openrouter = HangingOpenRouter()
+
+    await _cancel_mid_call(openrouter, conversations.create_conversation(
+        ConversationCreateRequest(scenario_type="coffee_shop", difficulty_level="green"),
+        _request("retry-1"), Response(), BackgroundTasks(), premium_user, db, openrouter, redis_client
+    ))
+
+    assert fake_redis.keys("idempotency:*") == []
+    assert conversation_quota_used(premium_user) == 0
+
+
+async def test_cancelled_send_message_gives_back_the_key(db, premium_user, fake_redis):
+    conversation_id = uuid.uuid4()
+    db.add(Conversation(
+        id=conversation_id, user_id=premium_user.id, scenario_type="coffee_shop",
+        difficulty_level="green", ai_character_context={}, status="active"
+    ))
+    db.commit()
+    premium_user = db.get(User, premium_user.id)
+    openrouter = HangingOpenRouter()
+
+    await _cancel_mid_call(openrouter, conversations.send_message(
+        conversation_id, MessageRequest(content="Hey, is this seat taken?"),
+        _request("retry-1"), Response(), BackgroundTasks(), premium_user, db, openrouter, redis_client
+    ))
+
+    assert fake_redis.keys("idempotency:*") == []
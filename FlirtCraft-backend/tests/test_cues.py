@@ -0,0 +1,32 @@
+"""Body language cue splitting"""
+
+import pytest
+
+from app.services.cues import CueTokenizer, split_cues
+
+
+@pytest.mark.parametrize("reply, content, cues", [
+    ("Hey there!", "Hey there!", []),
+    ("  Hey there!\n", "Hey there!", []),
+    ("[smiles] Hi, I'm Sam.", "Hi, I'm Sam.", ["smiles"]),
+    ("Oh really? [laughs] Tell me more [leans in]", "Oh really? Tell me more", ["laughs", "leans in"]),
+    ("Line one.\nLine two.  [nods]", "Line one.\nLine two.", ["nods"]),
+    ("Hello!\n[smiles]\nHow's your day?", "Hello!\nHow's your day?", ["smiles"]),
+    ("First paragraph.\n\nSecond [grins] paragraph.", "First paragraph.\n\nSecond paragraph.", ["grins"]),
+    ("Well[pauses]...", "Well...", ["pauses"]),
+    ("Keep  my   spacing [shrugs]", "Keep  my   spacing", ["shrugs"]),
+    ("Empty [] cue", "Empty cue", []),
+    ("Unclosed [bracket stays", "Unclosed [bracket stays", []),
+])
+def test_split_cues(reply, content, cues):
+    assert split_cues(reply) == (content, cues)
+
+
+def test_streamed_chunks_match_a_whole_reply():
+    reply = "Hi!\n[smiles warmly] Nice to\nmeet [waves] you."
+    tokenizer = CueTokenizer()
+
+    closed = [tokenizer.feed(chunk) for chunk in ("Hi!\n[smi", "les warmly] Nice to\nme", "et [wav", "es] you.")]
+
+    assert closed == [[], ["smiles warmly"], [], ["waves"]]
+    assert (tokenizer.finish(), tokenizer.cues) == split_cues(reply)
@@ -0,0 +1,80 @@
+"""Connection guard around external awaits"""
+
+import logging
+
+import pytest
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.core.database import ConnectionHeldError, SessionLocal, connection_released, release_connection
+from app.core.metrics import metrics
+
+
+@pytest.fixture
+def db(db_engine):
+    session = SessionLocal()
+    yield session
+    session.close()
+
+
+async def test_strict_mode_rejects_a_connection_held_into_the_call(db):
+    db.execute(text("SELECT 1"))
+
+    with pytest.raises(ConnectionHeldError, match="before external call 'llm'"):
+        async with connection_released(db, "llm"):
+            pass
+
+
+async def test_released_connection_passes(db):
+    db.execute(text("SELECT 1"))
+    release_connection(db)
+
+    async with connection_released(db, "llm"):
+        pass
+
+    assert not db.in_transaction()
+
+
+async def test_strict_mode_rejects_a_query_during_the_call(db):
+    release_connection(db)
+
+    with pytest.raises(ConnectionHeldError, match="during external call 'llm'"):
+        async with connection_released(db, "llm"):
+            db.execute(text("SELECT 1"))
+
+
+async def test_non_strict_mode_logs_and_counts(db, monkeypatch, caplog):
+    monkeypatch.setattr(settings, "environment", "production")
+    monkeypatch.setattr(settings, "db_connection_guard_strict", False)
+    before = metrics.snapshot()["counters"].get("db_connection_held_across_await{operation=llm}", 0)
+    db.execute(text("SELECT 1"))
+
+    with caplog.at_level(logging.WARNING, logger="app.core.database"):
+        async with connection_released(db, "llm"):
+            pass
+
+    # Still held when the call returns, so both checks report it
+    assert "DB connection held before external call 'llm'" in caplog.text
+    assert "DB connection held during external call 'llm'" in caplog.text
+    assert metrics.snapshot()["counters"]["db_connection_held_across_await{operation=llm}"] == before + 2
+
+
+async def test_idempotency_wait_releases_the_connection(db, fake_redis, monkeypatch):
+    from fastapi import HTTPException
+    from starlette.requests import Request
+
+    from app.core.idempotency import begin_idempotent
+
+    monkeypatch.setattr(settings, "idempotency_wait_seconds", 0.05)
+    monkeypatch.setattr(settings, "idempotency_poll_interval", 0.01)
+    request = Request({"type": "http", "headers": [(b"idempotency-key", b"retry-1")]})
+    original = await begin_idempotent(request, "user-1", "create_conversation", {"n": 1})
+    assert original.active
+
+    # The duplicate loaded the user first, then finds the original still in flight
+    db.execute(text("SELECT 1"))
+    with pytest.raises(HTTPException) as exc_info:
+        await begin_idempotent(request, "user-1", "create_conversation", {"n": 1}, db=db)
+
+    assert exc_info.value.status_code == 409
+    assert not db.in_transaction()
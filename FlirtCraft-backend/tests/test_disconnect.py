@@ -0,0 +1,129 @@
+"""Client disconnects through the full application middleware stack"""
+
+import asyncio
+import logging
+
+import pytest
+from fastapi import Request
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from app.core.config import settings
+from app.core.disconnect import CLIENT_CLOSED_REQUEST, cancel_on_disconnect
+from app.core.logging_config import ACCESS_LOGGER
+from app.main import create_application
+
+
+@pytest.fixture
+def slow_app(monkeypatch):
+    """The real application with one endpoint whose upstream work never finishes; returns (app, state)"""
+    monkeypatch.setattr(settings, "disconnect_poll_interval", 0.01)
+    app = create_application()
+    state = {"started": asyncio.Event(), "cancelled": False}
+
+    async def upstream():
+        state["started"].set()
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            state["cancelled"] = True
+            raise
+        return {"reply": "too late"}
+
+    @app.get("/slow")
+    async def slow(request: Request):
+        return await cancel_on_disconnect(request, upstream(), "test")
+
+    @app.get("/fast")
+    async def fast():
+        return {"reply": "hi"}
+
+    @app.get("/broken")
+    async def broken():
+        raise RuntimeError("boom")
+
+    return app, state
+
+
+async def _call(app, path: str, disconnect: asyncio.Event) -> list:
+    """Drive one request as a server would, sending http.disconnect once the event is set"""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"host", b"test")],
+        "client": ("127.0.0.1", 50000),
+        "server": ("test", 80)
+    }
+    sent = []
+    request_sent = False
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        if not disconnect.is_set():
+            await disconnect.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    await app(scope, receive, send)
+    return sent
+
+
+def test_no_base_http_middleware_in_the_stack(slow_app):
+    app, _ = slow_app
+
+    assert not any(middleware.cls is BaseHTTPMiddleware for middleware in app.user_middleware)
+
+
+async def test_disconnect_cancels_upstream_work(slow_app, caplog):
+    app, state = slow_app
+    disconnect = asyncio.Event()
+    caplog.set_level(logging.INFO, logger=ACCESS_LOGGER)
+
+    call = asyncio.create_task(_call(app, "/slow", disconnect))
+    await asyncio.wait_for(state["started"].wait(), timeout=1)
+    disconnect.set()
+    sent = await asyncio.wait_for(call, timeout=1)
+
+    assert state["cancelled"]
+    assert sent[0]["type"] == "http.response.start"
+    assert sent[0]["status"] == CLIENT_CLOSED_REQUEST
+    access = [record for record in caplog.records if record.name == ACCESS_LOGGER]
+    assert len(access) == 1
+    assert access[0].status_code == CLIENT_CLOSED_REQUEST
+    assert access[0].path == "/slow"
+
+
+async def test_access_log_records_a_normal_response(slow_app, caplog):
+    app, _ = slow_app
+    caplog.set_level(logging.INFO, logger=ACCESS_LOGGER)
+
+    sent = await _call(app, "/fast", asyncio.Event())
+
+    assert sent[0]["status"] == 200
+    access = [record for record in caplog.records if record.name == ACCESS_LOGGER]
+    assert access[0].levelno == logging.INFO
+    assert access[0].status_code == 200
+    assert access[0].method == "GET"
+
+
+async def test_access_log_records_an_unhandled_error_as_500(slow_app, caplog):
+    app, _ = slow_app
+    caplog.set_level(logging.INFO, logger=ACCESS_LOGGER)
+
+    with pytest.raises(RuntimeError):
+        await _call(app, "/broken", asyncio.Event())
+
+    access = [record for record in caplog.records if record.name == ACCESS_LOGGER]
+    assert access[0].levelno == logging.WARNING
+    assert access[0].status_code == 500
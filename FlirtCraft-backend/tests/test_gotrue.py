@@ -0,0 +1,124 @@
+"""Async Supabase Auth client against a stub HTTP transport"""
+
+import httpx
+import pytest
+
+from app.core.gotrue import GoTrueError, GoTrueUser, gotrue_client
+from app.core.supabase_client import create_user_account, sign_in_user, verify_token
+
+USER = {
+    "id": "6f1c2d4e-0000-4000-8000-000000000001",
+    "email": "sam@example.com",
+    "email_confirmed_at": "2026-01-01T00:00:00Z",
+    "user_metadata": {"first_name": "Sam"}
+}
+
+SESSION = {
+    "access_token": "access-1",
+    "refresh_token": "refresh-1",
+    "expires_in": 3600,
+    "expires_at": 1900000000,
+    "token_type": "bearer",
+    "user": USER
+}
+
+
+@pytest.fixture
+def gotrue(monkeypatch):
+    """Route the shared GoTrue client through a handler; returns the list of requests it saw"""
+    seen = []
+
+    def install(handler):
+        def record(request: httpx.Request) -> httpx.Response:
+            seen.append(request)
+            return handler(request)
+
+        client = httpx.AsyncClient(
+            base_url="https://test.supabase.co/auth/v1",
+            headers={"apikey": "test-anon-key"},
+            transport=httpx.MockTransport(record)
+        )
+        monkeypatch.setattr(gotrue_client, "_client", client)
+        return seen
+
+    return install
+
+
+async def test_verify_token_returns_the_user(gotrue):
+    seen = gotrue(lambda request: httpx.Response(200, json=USER))
+
+    result = await verify_token("access-1")
+
+    assert result["valid"]
+    assert result["user"] == GoTrueUser(
+        id=USER["id"],
+        email="sam@example.com",
+        email_confirmed_at="2026-01-01T00:00:00Z",
+        user_metadata={"first_name": "Sam"}
+    )
+    assert seen[0].url.path == "/auth/v1/user"
+    assert seen[0].headers["authorization"] == "Bearer access-1"
+
+
+async def test_verify_token_rejected(gotrue):
+    gotrue(lambda request: httpx.Response(401, json={"code": 401, "msg": "invalid JWT: token is expired"}))
+
+    result = await verify_token("expired")
+
+    assert result == {"valid": False, "error": "invalid JWT: token is expired"}
+
+
+async def test_verify_token_timeout(gotrue):
+    def handler(request):
+        raise httpx.ReadTimeout("timed out", request=request)
+    gotrue(handler)
+
+    result = await verify_token("access-1")
+
+    assert not result["valid"]
+    assert result["error"] == "Supabase Auth get_user timed out"
+
+
+async def test_get_user_errors_carry_the_status_code(gotrue):
+    gotrue(lambda request: httpx.Response(403, text="forbidden"))
+
+    with pytest.raises(GoTrueError) as raised:
+        await gotrue_client.get_user("access-1")
+
+    assert raised.value.status_code == 403
+    assert str(raised.value) == "HTTP 403"
+
+
+async def test_sign_in_maps_the_session(gotrue):
+    seen = gotrue(lambda request: httpx.Response(200, json=SESSION))
+
+    result = await sign_in_user("sam@example.com", "hunter22")
+
+    assert result["success"]
+    assert result["user"].id == USER["id"]
+    assert result["session"] == {
+        "access_token": "access-1",
+        "refresh_token": "refresh-1",
+        "expires_in": 3600,
+        "expires_at": 1900000000,
+        "token_type": "bearer"
+    }
+    assert seen[0].url.params["grant_type"] == "password"
+
+
+async def test_sign_in_with_bad_credentials(gotrue):
+    gotrue(lambda request: httpx.Response(400, json={"error": "invalid_grant", "error_description": "Invalid login credentials"}))
+
+    result = await sign_in_user("sam@example.com", "wrong")
+
+    assert result == {"success": False, "error": "Invalid login credentials"}
+
+
+async def test_sign_up_without_a_session_needs_email_verification(gotrue):
+    gotrue(lambda request: httpx.Response(200, json={**USER, "email_confirmed_at": None}))
+
+    result = await create_user_account("sam@example.com", "hunter22", {"first_name": "Sam"})
+
+    assert result["success"]
+    assert result["session"] is None
+    assert result["email_verification_required"]
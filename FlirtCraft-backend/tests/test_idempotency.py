@@ -0,0 +1,149 @@
+"""Idempotency-Key claims, replays and releases against fakeredis"""
+
+import asyncio
+import uuid
+
+import orjson
+import pytest
+from fastapi import HTTPException, Request
+from fastapi.responses import Response
+
+from app.core.config import settings
+from app.core.idempotency import REPLAYED_HEADER, begin_idempotent
+from app.core.metrics import metrics
+from app.core.redis_client import redis_client
+
+USER_ID = uuid.UUID("6f1c2d4e-0000-4000-8000-000000000001")
+PAYLOAD = {"scenario_type": "coffee_shop", "difficulty_level": "green"}
+
+
+@pytest.fixture(autouse=True)
+def fast_polling(monkeypatch):
+    monkeypatch.setattr(settings, "idempotency_poll_interval", 0.01)
+    monkeypatch.setattr(settings, "idempotency_wait_seconds", 1.0)
+
+
+def _request(key: str = "retry-1") -> Request:
+    return Request({"type": "http", "headers": [(b"idempotency-key", key.encode())]})
+
+
+def _created(conversation_id: str) -> Response:
+    return Response(content=orjson.dumps({"id": conversation_id}), status_code=201, media_type="application/json")
+
+
+def _outcomes() -> dict:
+    return {
+        name: count for name, count in metrics.snapshot()["counters"].items()
+        if name.startswith("idempotency_requests")
+    }
+
+
+async def test_no_key_is_inactive(fake_redis):
+    result = await begin_idempotent(Request({"type": "http", "headers": []}), USER_ID, "create", PAYLOAD)
+
+    assert not result.active
+    assert result.replay is None
+    assert fake_redis.keys("idempotency:*") == []
+
+
+async def test_completed_request_is_replayed(fake_redis):
+    first = await begin_idempotent(_request(), USER_ID, "create", PAYLOAD)
+    first.complete(_created("c-1"))
+
+    retry = await begin_idempotent(_request(), USER_ID, "create", PAYLOAD)
+
+    assert retry.replay is not None
+    assert retry.replay.status_code == 201
+    assert orjson.loads(retry.replay.body) == {"id": "c-1"}
+    assert retry.replay.headers[REPLAYED_HEADER] == "true"
+    assert not retry.active
+
+
+async def test_concurrent_duplicate_waits_then_replays(fake_redis):
+    original = await begin_idempotent(_request(), USER_ID, "create", PAYLOAD)
+    duplicate = asyncio.create_task(begin_idempotent(_request(), USER_ID, "create", PAYLOAD))
+
+    await asyncio.sleep(0.05)
+    assert not duplicate.done()
+    original.complete(_created("c-1"))
+    retry = await asyncio.wait_for(duplicate, timeout=1)
+
+    assert orjson.loads(retry.replay.body) == {"id": "c-1"}
+
+
+async def test_duplicate_gives_up_with_409(fake_redis, monkeypatch):
+    monkeypatch.setattr(settings, "idempotency_wait_seconds", 0.05)
+    await begin_idempotent(_request(), USER_ID, "create", PAYLOAD)
+
+    with pytest.raises(HTTPException) as raised:
+        await begin_idempotent(_request(), USER_ID, "create", PAYLOAD)
+
+    assert raised.value.status_code == 409
+
+
+async def test_same_key_with_a_different_body_is_rejected(fake_redis):
+    first = await begin_idempotent(_request(), USER_ID, "create", PAYLOAD)
+    first.complete(_created("c-1"))
+
+    with pytest.raises(HTTPException) as raised:
+        await begin_idempotent(_request(), USER_ID, "create", {**PAYLOAD, "difficulty_level": "red"})
+
+    assert raised.value.status_code == 422
+
+
+async def test_failure_releases_the_key_for_a_retry(fake_redis):
+    first = await begin_idempotent(_request(), USER_ID, "create", PAYLOAD)
+    first.release()
+
+    retry = await begin_idempotent(_request(), USER_ID, "create", PAYLOAD)
+
+    assert retry.active
+    assert retry.replay is None
+
+
+async def test_error_response_is_not_stored(fake_redis):
+    first = await begin_idempotent(_request(), USER_ID, "create", PAYLOAD)
+    first.complete(Response(status_code=503))
+
+    retry = await begin_idempotent(_request(), USER_ID, "create", PAYLOAD)
+
+    assert retry.active
+
+
+async def test_waiting_duplicate_runs_after_the_original_fails(fake_redis):
+    original = await begin_idempotent(_request(), USER_ID, "create", PAYLOAD)
+    duplicate = asyncio.create_task(begin_idempotent(_request(), USER_ID, "create", PAYLOAD))
+
+    await asyncio.sleep(0.05)
+    original.release()
+    retry = await asyncio.wait_for(duplicate, timeout=1)
+
+    assert retry.active
+    assert retry.replay is None
+
+
+async def test_keys_are_scoped_per_user_and_operation(fake_redis):
+    await begin_idempotent(_request(), USER_ID, "create", PAYLOAD)
+
+    other_user = await begin_idempotent(_request(), uuid.uuid4(), "create", PAYLOAD)
+    other_operation = await begin_idempotent(_request(), USER_ID, "message", PAYLOAD)
+
+    assert other_user.active
+    assert other_operation.active
+
+
+async def test_malformed_key_is_rejected(fake_redis):
+    with pytest.raises(HTTPException) as raised:
+        await begin_idempotent(_request("x" * 256), USER_ID, "create", PAYLOAD)
+
+    assert raised.value.status_code == 400
+
+
+async def test_redis_down_serves_without_protection(monkeypatch):
+    monkeypatch.setattr(redis_client, "set_if_absent", lambda *args, **kwargs: None)
+    before = _outcomes().get("idempotency_requests{operation=create,outcome=unavailable}", 0)
+
+    result = await begin_idempotent(_request(), USER_ID, "create", PAYLOAD)
+
+    assert not result.active
+    assert _outcomes()["idempotency_requests{operation=create,outcome=unavailable}"] == before + 1
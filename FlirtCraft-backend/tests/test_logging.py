@@ -0,0 +1,89 @@
+"""Queued logging: what the caller's thread resolves and what the listener formats"""
+
+import io
+import logging
+import logging.handlers
+import queue
+
+import orjson
+import pytest
+
+from app.core.logging_config import DeferredQueueHandler, JsonFormatter
+
+
+@pytest.fixture
+def queued_logger():
+    """A logger behind DeferredQueueHandler; returns (logger, queue, flush) where flush formats with a given formatter"""
+    log_queue = queue.SimpleQueue()
+    logger = logging.getLogger("tests.queued")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    handler = DeferredQueueHandler(log_queue)
+    logger.addHandler(handler)
+
+    def flush(formatter: logging.Formatter) -> list:
+        stream = io.StringIO()
+        stream_handler = logging.StreamHandler(stream)
+        stream_handler.setFormatter(formatter)
+        while not log_queue.empty():
+            stream_handler.handle(log_queue.get())
+        return stream.getvalue().splitlines()
+
+    yield logger, log_queue, flush
+    logger.removeHandler(handler)
+    logger.propagate = True
+
+
+def test_args_are_merged_before_queueing(queued_logger):
+    logger, log_queue, flush = queued_logger
+    scores = [1, 2]
+
+    logger.info("scores %s for %s", scores, "sam")
+    scores.append(3)
+
+    record = log_queue.get()
+    assert record.msg == record.message == "scores [1, 2] for sam"
+    assert record.args is None
+    assert record.getMessage() == "scores [1, 2] for sam"
+
+
+def test_exceptions_are_rendered_and_released(queued_logger):
+    logger, log_queue, flush = queued_logger
+
+    try:
+        raise ValueError("bad payload")
+    except ValueError:
+        logger.exception("Parse failed for %s", "character")
+
+    lines = flush(logging.Formatter("%(levelname)s %(message)s"))
+    assert lines[0] == "ERROR Parse failed for character"
+    assert lines[1] == "Traceback (most recent call last):"
+    assert lines[-1] == "ValueError: bad payload"
+
+
+def test_json_formatter_reads_the_rendered_traceback(queued_logger):
+    logger, log_queue, flush = queued_logger
+
+    try:
+        raise KeyError("scenario")
+    except KeyError:
+        logger.error("Lookup failed", exc_info=True, extra={"call_site": "character"})
+
+    record = log_queue.get()
+    assert record.exc_info is None
+    assert "KeyError: 'scenario'" in record.exc_text
+
+    entry = orjson.loads(JsonFormatter().format(record))
+    assert entry["message"] == "Lookup failed"
+    assert entry["call_site"] == "character"
+    assert entry["exception"] == record.exc_text
+
+
+def test_the_callers_record_is_not_modified(queued_logger):
+    logger, log_queue, flush = queued_logger
+    record = logger.makeRecord("tests.queued", logging.INFO, __file__, 1, "hello %s", ("sam",), None)
+
+    logger.handle(record)
+
+    assert record.args == ("sam",)
+    assert log_queue.get() is not record
@@ -0,0 +1,163 @@
+"""Hedged requests and latency budgets in the model router"""
+
+import asyncio
+
+import pytest
+
+from app.core.config import settings
+from app.services.model_router import BUDGET_EXPIRED, ModelRouter
+
+
+@pytest.fixture(autouse=True)
+def routing(monkeypatch):
+    monkeypatch.setattr(settings, "primary_ai_model", "primary")
+    monkeypatch.setattr(settings, "fallback_ai_model", "fallback")
+    monkeypatch.setattr(settings, "ai_hedge_min_samples", 3)
+    monkeypatch.setattr(settings, "ai_latency_budgets", {**settings.ai_latency_budgets, "chat": 0.4})
+
+
+@pytest.fixture
+def router() -> ModelRouter:
+    """A router whose primary has a 10ms first-token p95, so hedges fire after 10ms"""
+    router = ModelRouter()
+    for _ in range(3):
+        router.latency.record("primary", 0.01)
+    return router
+
+
+class Models:
+    """Scripted attempts per model, recording which were cancelled and why"""
+
+    def __init__(self):
+        self.release = {"primary": asyncio.Event(), "fallback": asyncio.Event()}
+        self.errors = {}
+        self.started = []
+        self.cancelled = {}
+
+    async def __call__(self, model, on_first_token):
+        self.started.append(model)
+        try:
+            if model in self.errors:
+                raise self.errors[model]
+            await self.release[model].wait()
+        except asyncio.CancelledError as e:
+            self.cancelled[model] = e.args[0] if e.args else None
+            raise
+        on_first_token()
+        return f"{model} reply"
+
+
+def test_hedge_delay_waits_half_the_budget_until_enough_samples():
+    router = ModelRouter()
+    site = router.route("chat")
+    assert router.hedge_delay(site) == 0.2
+
+    router.latency.record("primary", 0.01)
+    router.latency.record("primary", 0.01)
+    assert router.hedge_delay(site) == 0.2
+
+
+def test_hedge_delay_follows_the_primary_p95(router):
+    site = router.route("chat")
+    for seconds in [0.02] * 16 + [0.05]:
+        router.latency.record("primary", seconds)
+    # 20 samples: 3 x 10ms, 16 x 20ms, 1 x 50ms -> index 19 is the 50ms outlier
+    assert router.hedge_delay(site) == 0.05
+
+    for _ in range(200):
+        router.latency.record("primary", 1.0)
+    assert router.hedge_delay(site) == 0.2
+
+
+async def test_fast_primary_is_not_hedged(router):
+    models = Models()
+    models.release["primary"].set()
+
+    assert await router.call("chat", models) == ("primary reply", "primary")
+
+    assert models.started == ["primary"]
+    assert router.hedges_fired == 0
+
+
+async def test_hedge_fires_and_the_fallback_wins(router):
+    models = Models()
+    call = asyncio.create_task(router.call("chat", models))
+    while models.started != ["primary", "fallback"]:
+        await asyncio.sleep(0.005)
+    assert router.hedges_fired == 1
+
+    models.release["fallback"].set()
+
+    assert await call == ("fallback reply", "fallback")
+    assert models.cancelled == {"primary": None}
+    assert router.hedges_won == 1
+
+
+async def test_primary_answering_after_the_hedge_still_wins(router):
+    models = Models()
+    call = asyncio.create_task(router.call("chat", models))
+    while len(models.started) < 2:
+        await asyncio.sleep(0.005)
+
+    models.release["primary"].set()
+
+    assert await call == ("primary reply", "primary")
+    assert models.cancelled == {"fallback": None}
+    assert router.hedges_fired == 1
+    assert router.hedges_won == 0
+
+
+async def test_failed_primary_goes_straight_to_the_fallback(router):
+    models = Models()
+    models.errors["primary"] = RuntimeError("upstream 500")
+    models.release["fallback"].set()
+
+    assert await router.call("chat", models) == ("fallback reply", "fallback")
+
+    # Not a hedge: the primary had already failed
+    assert router.hedges_fired == 0
+    assert router.hedges_won == 1
+
+
+async def test_every_attempt_failing_raises_the_last_error(router):
+    models = Models()
+    models.errors["primary"] = RuntimeError("primary down")
+    models.errors["fallback"] = RuntimeError("fallback down")
+
+    with pytest.raises(RuntimeError, match="fallback down"):
+        await router.call("chat", models)
+
+
+async def test_budget_expiry_cancels_both_attempts(router):
+    models = Models()
+
+    with pytest.raises(asyncio.TimeoutError):
+        await router.call("chat", models)
+
+    assert models.started == ["primary", "fallback"]
+    assert models.cancelled == {"primary": BUDGET_EXPIRED, "fallback": BUDGET_EXPIRED}
+
+
+async def test_caller_cancellation_cancels_both_attempts_without_a_budget_reason(router):
+    models = Models()
+    call = asyncio.create_task(router.call("chat", models))
+    while len(models.started) < 2:
+        await asyncio.sleep(0.005)
+
+    call.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await call
+    await asyncio.sleep(0)
+
+    assert models.cancelled == {"primary": None, "fallback": None}
+
+
+async def test_no_fallback_means_no_hedge(router, monkeypatch):
+    monkeypatch.setattr(settings, "fallback_ai_model", None)
+    models = Models()
+
+    with pytest.raises(asyncio.TimeoutError):
+        await router.call("chat", models)
+
+    assert models.started == ["primary"]
+    assert models.cancelled == {"primary": BUDGET_EXPIRED}
@@ -0,0 +1,45 @@
+"""bcrypt context and cost factor calibration"""
+
+import pytest
+
+from app.core import auth
+from app.core.config import settings
+
+
+@pytest.fixture
+def cheap_bcrypt(monkeypatch):
+    monkeypatch.setattr(settings, "bcrypt_min_rounds", 4)
+    monkeypatch.setattr(settings, "bcrypt_max_rounds", 6)
+    monkeypatch.setattr(auth, "pwd_context", auth.pwd_context)
+
+
+def test_calibration_swaps_in_a_new_context(cheap_bcrypt, monkeypatch):
+    monkeypatch.setattr(settings, "bcrypt_target_ms", 60_000)
+    before = auth.pwd_context
+    old_hash = auth.get_password_hash("hunter22")
+
+    rounds = auth.calibrate_password_hashing()
+
+    assert rounds == 6
+    assert auth.pwd_context is not before
+    assert before.to_dict()["bcrypt__rounds"] == settings.bcrypt_rounds
+    assert auth.get_password_hash("hunter22").startswith("$2b$06$")
+    assert auth.verify_password("hunter22", old_hash)
+
+
+def test_calibration_stays_at_the_minimum_on_a_slow_host(cheap_bcrypt, monkeypatch):
+    monkeypatch.setattr(settings, "bcrypt_target_ms", 0.001)
+
+    assert auth.calibrate_password_hashing() == 4
+
+
+def test_no_target_keeps_the_configured_rounds(cheap_bcrypt, monkeypatch):
+    monkeypatch.setattr(settings, "bcrypt_target_ms", None)
+    before = auth.pwd_context
+
+    assert auth.calibrate_password_hashing() == settings.bcrypt_rounds
+    assert auth.pwd_context is before
+
+
+def test_verify_rejects_a_wrong_or_malformed_hash():
+    assert not auth.verify_password("hunter22", "not-a-bcrypt-hash")
@@ -0,0 +1,166 @@
+"""Version-stamped user and profile snapshots in Redis"""
+
+import json
+import uuid
+from datetime import datetime, timezone
+
+import fakeredis
+import pytest
+from sqlalchemy import event, inspect
+
+from app.core import profile_cache
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.redis_client import redis_client
+from app.models.user import User, UserProfile
+
+CREATED = datetime(2026, 3, 1, 9, 30, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def queries(db_engine, fake_redis, monkeypatch) -> list:
+    """SQL statements run against the test database"""
+    monkeypatch.setattr(settings, "enable_caching", True)
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db_engine, "before_cursor_execute", record)
+    yield statements
+    event.remove(db_engine, "before_cursor_execute", record)
+
+
+@pytest.fixture
+def user_id(queries) -> uuid.UUID:
+    user_id = uuid.uuid4()
+    with SessionLocal() as db:
+        db.add(User(id=user_id, email="sam@example.com", is_premium=True, created_at=CREATED))
+        db.commit()
+    queries.clear()
+    return user_id
+
+
+def _change_email(user_id: uuid.UUID, email: str):
+    """A write path: commit the change, then invalidate"""
+    with SessionLocal() as db:
+        db.get(User, user_id).email = email
+        db.commit()
+    profile_cache.invalidate_user_cache(user_id)
+
+
+def test_miss_then_hit_restores_the_row_without_a_query(user_id, queries):
+    with SessionLocal() as db:
+        loaded = profile_cache.get_cached_user(db, user_id)
+        created_at = loaded.created_at
+    assert len(queries) == 1
+
+    queries.clear()
+    with SessionLocal() as db:
+        user = profile_cache.get_cached_user(db, user_id)
+
+        assert queries == []
+        assert user.id == user_id
+        assert user.email == "sam@example.com"
+        assert user.is_premium is True
+        assert user.created_at == created_at
+        # Attached to the session as if loaded, so writes through it still work
+        assert inspect(user).persistent
+        user.email = "samuel@example.com"
+        db.commit()
+
+    with SessionLocal() as db:
+        assert db.get(User, user_id).email == "samuel@example.com"
+
+
+def test_invalidation_drops_the_snapshot(user_id, queries):
+    with SessionLocal() as db:
+        profile_cache.get_cached_user(db, user_id)
+
+    _change_email(user_id, "alex@example.com")
+
+    assert redis_client.get_cache(profile_cache._snapshot_key("user", user_id)) is None
+    with SessionLocal() as db:
+        assert profile_cache.get_cached_user(db, user_id).email == "alex@example.com"
+
+
+def test_snapshot_taken_before_a_concurrent_write_is_never_served(user_id, queries):
+    class RacingQuery:
+        """Loads the row, then a write and its invalidation land before the snapshot is stored"""
+
+        def __init__(self, query):
+            self.query = query
+
+        def first(self):
+            stale = self.query.first()
+            _change_email(user_id, "alex@example.com")
+            return stale
+
+    with SessionLocal() as db:
+        stale = profile_cache._get_cached(
+            db, User, "user", user_id, RacingQuery(db.query(User).filter(User.id == user_id))
+        )
+        assert stale.email == "sam@example.com"
+
+    # The stale snapshot was written, but with the version read before the write
+    snapshot = json.loads(redis_client.get_cache(profile_cache._snapshot_key("user", user_id)))
+    assert snapshot["data"]["email"] == "sam@example.com"
+    assert snapshot["version"] == 0
+
+    with SessionLocal() as db:
+        assert profile_cache.get_cached_user(db, user_id).email == "alex@example.com"
+
+
+def test_unreadable_snapshot_falls_back_to_the_database(user_id, queries, fake_redis):
+    fake_redis.set(profile_cache._snapshot_key("user", user_id), "{not json")
+
+    with SessionLocal() as db:
+        assert profile_cache.get_cached_user(db, user_id).email == "sam@example.com"
+    assert len(queries) == 1
+
+
+def test_redis_down_reads_from_the_database(user_id, queries, monkeypatch):
+    server = fakeredis.FakeServer()
+    server.connected = False
+    monkeypatch.setattr(redis_client, "_client", fakeredis.FakeRedis(server=server, decode_responses=True))
+
+    for _ in range(2):
+        with SessionLocal() as db:
+            assert profile_cache.get_cached_user(db, user_id).email == "sam@example.com"
+    assert len(queries) == 2
+
+    # Invalidation can't reach Redis either; it reports that instead of raising
+    assert profile_cache.invalidate_user_cache(user_id) is False
+
+
+def test_caching_disabled_always_queries(user_id, queries, monkeypatch):
+    monkeypatch.setattr(settings, "enable_caching", False)
+
+    for _ in range(2):
+        with SessionLocal() as db:
+            profile_cache.get_cached_user(db, user_id)
+
+    assert len(queries) == 2
+    assert redis_client.get_cache(profile_cache._snapshot_key("user", user_id)) is None
+
+
+def test_profile_snapshot_restores_arrays_and_ids(user_id, queries, fake_redis):
+    profile = UserProfile(
+        id=uuid.uuid4(), user_id=user_id, primary_skills=["storytelling", "flow_maintenance"],
+        specific_challenges=[], onboarding_steps_completed=["age"], onboarding_steps_skipped=[],
+        experience_level="beginner", age_verified=True
+    )
+    redis_client.set_cache(
+        profile_cache._snapshot_key("profile", user_id),
+        {"version": 0, "data": profile_cache._serialize(profile)}
+    )
+
+    with SessionLocal() as db:
+        restored = profile_cache.get_cached_profile(db, user_id)
+
+        assert queries == []
+        assert restored.id == profile.id
+        assert restored.user_id == user_id
+        assert restored.primary_skills == ["storytelling", "flow_maintenance"]
+        assert restored.experience_level == "beginner"
+        assert restored in db
@@ -0,0 +1,141 @@
+"""Prompt templates, transcript rendering and token budgets"""
+
+import pytest
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.services.prompts import (
+    CONVERSATION_PROMPT,
+    FEEDBACK_PROMPT,
+    PromptTemplate,
+    estimate_tokens,
+    render_transcript
+)
+
+
+def _history(count: int, words: int = 5) -> list:
+    return [
+        {"sender": "user" if order % 2 else "ai", "content": " ".join([f"m{order}"] * words)}
+        for order in range(1, count + 1)
+    ]
+
+
+def _lines(history: list, partner_label: str = "AI Partner") -> list:
+    return [f"{'User' if msg['sender'] == 'user' else partner_label}: {msg['content']}" for msg in history]
+
+
+def _cost(lines: list) -> int:
+    return sum(estimate_tokens(line + "\n") for line in lines)
+
+
+def _truncated(call_site: str) -> int:
+    return metrics.snapshot()["counters"].get(f"prompt_messages_truncated{{call_site={call_site}}}", 0)
+
+
+def test_estimate_tokens_rounds_up_quarter_characters():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("abc") == 1
+    assert estimate_tokens("abcd") == 1
+    assert estimate_tokens("abcde") == 2
+
+
+def test_template_renders_fields_and_escaped_braces():
+    template = PromptTemplate("system", "Reply as JSON {{\"score\": n}} for {scenario} at {level}")
+
+    prompt = template.render(scenario="coffee_shop", level="green")
+
+    assert prompt.system == "system"
+    assert prompt.user == 'Reply as JSON {"score": n} for coffee_shop at green'
+    assert template.fields == {"scenario", "level"}
+
+
+def test_template_rejects_a_missing_field():
+    with pytest.raises(KeyError, match="goals"):
+        FEEDBACK_PROMPT.render(scenario="coffee_shop", conversation="User: hi\n")
+
+
+def test_remaining_budget_counts_the_template_and_values(monkeypatch):
+    monkeypatch.setattr(settings, "ai_prompt_token_budgets", {"chat": 1000})
+    template = PromptTemplate("x" * 40, "Scenario: {scenario}\n{history}")
+
+    assert template.fixed_tokens == 10 + estimate_tokens("Scenario: \n")
+    assert template.remaining_budget("chat", scenario="y" * 80) == 1000 - template.fixed_tokens - 20
+    assert template.remaining_budget("unbudgeted", scenario="y") is None
+
+
+def test_transcript_labels_and_order():
+    text = render_transcript(_history(3, words=1), partner_label="AI")
+
+    assert text == "User: m1\nAI: m2\nUser: m3\n"
+
+
+def test_transcript_drops_the_oldest_turns_first():
+    history = _history(10)
+    newest = _lines(history)[-4:]
+    before = _truncated("chat")
+
+    text = render_transcript(history, budget=_cost(newest), call_site="chat")
+
+    assert text.splitlines() == newest
+    assert _truncated("chat") == before + 6
+
+    # One token short of the fourth-newest line drops it too
+    assert render_transcript(history, budget=_cost(newest) - 1).splitlines() == newest[1:]
+
+
+def test_transcript_stays_within_the_budget():
+    history = _history(30, words=7)
+
+    for budget in (20, 55, 130, 400):
+        text = render_transcript(history, budget=budget)
+        assert _cost(text.splitlines()) <= budget
+
+
+def test_most_recent_turn_is_kept_even_over_budget():
+    history = _history(3, words=50)
+
+    text = render_transcript(history, budget=1)
+
+    assert text == f"User: {history[-1]['content']}\n"
+
+
+def test_summary_is_always_included_and_counted():
+    history = _history(6)
+    summary = "They both like jazz."
+    header = f"(Summary of earlier conversation: {summary})\n"
+    newest = _lines(history)[-2:]
+
+    text = render_transcript(history, summary=summary, budget=estimate_tokens(header) + _cost(newest))
+
+    assert text.startswith(header)
+    assert text[len(header):].splitlines() == newest
+
+
+def test_no_budget_keeps_everything():
+    before = _truncated("unknown")
+
+    text = render_transcript(_history(50))
+
+    assert len(text.splitlines()) == 50
+    assert _truncated("unknown") == before
+
+
+def test_conversation_prompt_fits_its_budget(monkeypatch):
+    monkeypatch.setattr(settings, "ai_prompt_token_budgets", {**settings.ai_prompt_token_budgets, "chat": 400})
+    values = {
+        "scenario": "coffee_shop", "appearance": "tall", "body_language": "relaxed", "current_activity": "reading",
+        "personality": "warm", "interests": "jazz", "difficulty": "green", "user_message": "Hi there"
+    }
+
+    history = render_transcript(
+        _history(40, words=10),
+        partner_label="AI",
+        budget=CONVERSATION_PROMPT.remaining_budget("chat", **values),
+        call_site="chat"
+    )
+    prompt = CONVERSATION_PROMPT.render(history=history, **values)
+
+    # Pieces are estimated separately, so the whole can round up by about a token per line
+    assert prompt.tokens <= 400 + len(history.splitlines())
+    assert "m40" in prompt.user
+    assert "m1 " not in prompt.user
@@ -0,0 +1,140 @@
+"""Daily conversation quota counters and their reconciliation into the users table"""
+
+import uuid
+from datetime import timedelta
+
+import pytest
+
+from app.core import quota
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.user import User
+
+DAY = quota.quota_day()
+
+
+@pytest.fixture
+def today(monkeypatch):
+    """Pin the quota day; tests move it forward by assigning .day"""
+    class Clock:
+        day = DAY
+
+    clock = Clock()
+    monkeypatch.setattr(quota, "quota_day", lambda now=None: clock.day)
+    return clock
+
+
+@pytest.fixture(autouse=True)
+def free_limit(monkeypatch):
+    monkeypatch.setattr(settings, "free_conversations_per_day", 3)
+
+
+def make_user(**fields) -> User:
+    return User(id=uuid.uuid4(), email="quota@example.com", is_premium=False, **fields)
+
+
+def test_acquire_stops_at_the_limit_and_release_gives_a_slot_back(fake_redis, today):
+    user = make_user()
+
+    taken = [quota.acquire_conversation_slot(user) for _ in range(3)]
+    assert [q["used"] for q in taken] == [1, 2, 3]
+    assert all(q["allowed"] and q["reserved"] for q in taken)
+
+    denied = quota.acquire_conversation_slot(user)
+    assert not denied["allowed"]
+    assert not denied["reserved"]
+    assert quota.conversation_quota_used(user) == 3
+
+    quota.release_conversation_slot(user.id, taken[-1])
+    assert quota.conversation_quota_used(user) == 2
+    assert quota.acquire_conversation_slot(user)["allowed"]
+
+
+def test_releasing_a_denied_slot_changes_nothing(fake_redis, today):
+    user = make_user()
+    for _ in range(3):
+        quota.acquire_conversation_slot(user)
+
+    quota.release_conversation_slot(user.id, quota.acquire_conversation_slot(user))
+
+    assert quota.conversation_quota_used(user) == 3
+
+
+def test_counter_is_seeded_from_the_db_count_for_the_same_day(fake_redis, today):
+    user = make_user(daily_conversations_used=2, daily_limit_reset_at=quota.quota_day_start(DAY))
+
+    assert quota.conversation_quota_used(user) == 2
+    first = quota.acquire_conversation_slot(user)
+    assert first["allowed"] and first["used"] == 3
+    assert not quota.acquire_conversation_slot(user)["allowed"]
+
+
+def test_db_count_from_an_earlier_day_is_not_a_seed(fake_redis, today):
+    user = make_user(daily_conversations_used=3, daily_limit_reset_at=quota.quota_day_start(DAY - timedelta(days=1)))
+
+    assert quota.conversation_quota_used(user) == 0
+    assert quota.acquire_conversation_slot(user)["used"] == 1
+
+
+def test_day_rollover_starts_a_fresh_counter(fake_redis, today):
+    user = make_user()
+    for _ in range(3):
+        quota.acquire_conversation_slot(user)
+    assert not quota.acquire_conversation_slot(user)["allowed"]
+
+    today.day = DAY + timedelta(days=1)
+
+    fresh = quota.acquire_conversation_slot(user)
+    assert fresh["allowed"] and fresh["used"] == 1
+    assert fresh["day"] == today.day
+
+
+def test_redis_outage_falls_back_to_the_db_count_without_reserving(monkeypatch, today):
+    monkeypatch.setattr(quota.redis_client, "acquire_quota", lambda *args, **kwargs: None)
+    user = make_user(daily_conversations_used=3, daily_limit_reset_at=quota.quota_day_start(DAY))
+
+    result = quota.acquire_conversation_slot(user)
+
+    assert not result["allowed"] and not result["reserved"]
+
+
+def test_reconcile_writes_counters_to_the_users_table(fake_redis, db_engine, today):
+    user = make_user()
+    db = SessionLocal()
+    db.add(user)
+    db.commit()
+    user_id = user.id
+    db.close()
+
+    quota.acquire_conversation_slot(user)
+    quota.acquire_conversation_slot(user)
+
+    assert quota.reconcile_conversation_quotas() == 1
+
+    db = SessionLocal()
+    stored = db.get(User, user_id)
+    assert stored.daily_conversations_used == 2
+    assert quota._db_usage_today(stored, DAY) == 2
+    db.close()
+    assert not fake_redis.exists(quota.DIRTY_QUOTAS_KEY)
+
+
+def test_reconcile_drains_past_batches_with_expired_counters(fake_redis, db_engine, today, monkeypatch):
+    monkeypatch.setattr(quota, "RECONCILE_BATCH_SIZE", 2)
+    user = make_user()
+    db = SessionLocal()
+    db.add(user)
+    db.commit()
+    user_id = user.id
+    db.close()
+
+    quota.acquire_conversation_slot(user)
+    # Entries whose counters are gone update no row, which used to end the pass early
+    fake_redis.sadd(quota.DIRTY_QUOTAS_KEY, *[f"{uuid.uuid4()}|{DAY.isoformat()}" for _ in range(5)])
+
+    assert quota.reconcile_conversation_quotas() == 1
+
+    db = SessionLocal()
+    assert db.get(User, user_id).daily_conversations_used == 1
+    db.close()
+    assert not fake_redis.exists(quota.DIRTY_QUOTAS_KEY)
@@ -0,0 +1,65 @@
+"""GCRA rate limiting in Redis"""
+
+import time
+
+import pytest
+from fastapi import HTTPException
+from starlette.responses import Response
+
+from app.core.auth import _enforce_rate_limit
+from app.core.config import settings
+from app.core.redis_client import redis_client
+
+
+def test_burst_up_to_the_limit_then_rejected(fake_redis):
+    results = [redis_client.check_rate_limit("rate_limit:test:u1", limit=5, window=60) for _ in range(6)]
+
+    assert [r["allowed"] for r in results] == [True] * 5 + [False]
+    assert [r["remaining"] for r in results[:5]] == [4, 3, 2, 1, 0]
+    # One request's worth of the window (60s / 5) has to pass before the next one fits
+    assert 0 < results[5]["retry_after"] <= 12
+
+
+def test_limits_are_per_key(fake_redis):
+    for _ in range(3):
+        redis_client.check_rate_limit("rate_limit:test:u1", limit=3, window=60)
+
+    assert not redis_client.check_rate_limit("rate_limit:test:u1", limit=3, window=60)["allowed"]
+    assert redis_client.check_rate_limit("rate_limit:test:u2", limit=3, window=60)["allowed"]
+
+
+def test_capacity_refills_over_the_window(fake_redis):
+    # 4 per second: one slot comes back every 250ms
+    for _ in range(4):
+        assert redis_client.check_rate_limit("rate_limit:test:fast", limit=4, window=1)["allowed"]
+    denied = redis_client.check_rate_limit("rate_limit:test:fast", limit=4, window=1)
+    assert not denied["allowed"]
+
+    time.sleep(denied["retry_after"] + 0.02)
+
+    assert redis_client.check_rate_limit("rate_limit:test:fast", limit=4, window=1)["allowed"]
+
+
+def test_enforce_raises_429_with_retry_after(fake_redis, monkeypatch):
+    monkeypatch.setattr(settings, "rate_limit_messages_per_minute", 2)
+    response = Response()
+
+    _enforce_rate_limit("messages", "u1", None, response)
+    _enforce_rate_limit("messages", "u1", None, response)
+    assert response.headers["X-RateLimit-Limit"] == "2"
+    assert response.headers["X-RateLimit-Remaining"] == "0"
+
+    with pytest.raises(HTTPException) as exc_info:
+        _enforce_rate_limit("messages", "u1", None, response)
+
+    assert exc_info.value.status_code == 429
+    assert 1 <= int(exc_info.value.headers["Retry-After"]) <= 30
+    assert exc_info.value.headers["X-RateLimit-Remaining"] == "0"
+
+
+def test_fails_open_without_redis(monkeypatch):
+    monkeypatch.setattr(redis_client, "_client", None)
+    monkeypatch.setattr(redis_client, "_connected", True)
+    monkeypatch.setattr(redis_client, "_initialize_client", lambda: None)
+
+    assert redis_client.check_rate_limit("rate_limit:test:u1", limit=1, window=60)["allowed"]
@@ -0,0 +1,249 @@
+"""Circuit breakers, call-site budgets and request coalescing for upstream AI calls"""
+
+import asyncio
+
+import pytest
+
+from app.core.config import settings
+from app.services.openrouter import OpenRouterError, OpenRouterService
+from app.services.prompts import Prompt
+from app.services.resilience import CircuitBreaker, SingleFlight
+
+PROMPT = Prompt("system", "user")
+
+
+@pytest.fixture
+def breaker_settings(monkeypatch):
+    monkeypatch.setattr(settings, "ai_breaker_min_calls", 10)
+    monkeypatch.setattr(settings, "ai_breaker_error_threshold", 0.5)
+    monkeypatch.setattr(settings, "ai_breaker_open_seconds", 30.0)
+    monkeypatch.setattr(settings, "fallback_ai_model", None)
+    monkeypatch.setattr(settings, "ai_latency_budgets", {**settings.ai_latency_budgets, "chat": 0.05})
+
+
+def test_breaker_opens_on_error_rate(breaker_settings):
+    breaker = CircuitBreaker("model")
+    for _ in range(9):
+        breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    breaker.record_failure()
+
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+
+
+def test_slow_call_threshold_stays_below_the_budget(monkeypatch):
+    monkeypatch.setattr(settings, "ai_breaker_slow_call_seconds", 15.0)
+    monkeypatch.setattr(settings, "ai_breaker_slow_call_budget_fraction", 0.8)
+
+    assert CircuitBreaker.slow_call_threshold(10.0) == pytest.approx(8.0)
+    assert CircuitBreaker.slow_call_threshold(15.0) == pytest.approx(12.0)
+    assert CircuitBreaker.slow_call_threshold(60.0) == 15.0
+
+
+def test_slow_successes_open_the_breaker(breaker_settings, monkeypatch):
+    monkeypatch.setattr(settings, "ai_breaker_slow_call_threshold", 0.5)
+    breaker = CircuitBreaker("model")
+    for _ in range(10):
+        breaker.record_success(9.0, slow_after=CircuitBreaker.slow_call_threshold(10.0))
+
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+async def test_budget_timeouts_count_as_failures(breaker_settings, monkeypatch):
+    service = OpenRouterService()
+
+    async def hang(*args, **kwargs):
+        await asyncio.sleep(10)
+
+    monkeypatch.setattr(service, "_stream_completion", hang)
+
+    for _ in range(10):
+        with pytest.raises(OpenRouterError):
+            await service._call_openrouter(PROMPT, call_site="chat")
+
+    breaker = service.breakers.get(settings.primary_ai_model)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.times_opened == 1
+
+
+async def test_caller_cancellation_is_not_a_failure(breaker_settings, monkeypatch):
+    monkeypatch.setattr(settings, "ai_latency_budgets", {**settings.ai_latency_budgets, "chat": 5.0})
+    service = OpenRouterService()
+    started = asyncio.Event()
+
+    async def hang(*args, **kwargs):
+        started.set()
+        await asyncio.sleep(10)
+
+    monkeypatch.setattr(service, "_stream_completion", hang)
+
+    for _ in range(10):
+        started.clear()
+        call = asyncio.create_task(service._call_openrouter(PROMPT, call_site="chat"))
+        await started.wait()
+        call.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await call
+
+    breaker = service.breakers.get(settings.primary_ai_model)
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.times_opened == 0
+    assert service.limiter.in_flight == 0
+
+
+async def test_half_open_probe_timeout_reopens(breaker_settings, monkeypatch):
+    service = OpenRouterService()
+    breaker = service.breakers.get(settings.primary_ai_model)
+    breaker._open("test")
+    breaker.opened_at -= settings.ai_breaker_open_seconds
+
+    async def hang(*args, **kwargs):
+        await asyncio.sleep(10)
+
+    monkeypatch.setattr(service, "_stream_completion", hang)
+
+    with pytest.raises(OpenRouterError):
+        await service._call_openrouter(PROMPT, call_site="chat")
+
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.times_opened == 2
+
+
+class _Upstream:
+    """A call that blocks until released, counting how many times it actually ran"""
+
+    def __init__(self):
+        self.calls = 0
+        self.cancelled = False
+        self.release = asyncio.Event()
+        self.outcome = "reply"
+
+    async def __call__(self):
+        self.calls += 1
+        try:
+            await self.release.wait()
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if isinstance(self.outcome, Exception):
+            raise self.outcome
+        return self.outcome
+
+
+async def test_single_flight_shares_one_result():
+    flight = SingleFlight()
+    upstream = _Upstream()
+
+    callers = [asyncio.create_task(flight.do("key", upstream)) for _ in range(3)]
+    await asyncio.sleep(0)
+    upstream.release.set()
+    results = await asyncio.gather(*callers)
+
+    assert upstream.calls == 1
+    assert results == [("reply", False), ("reply", True), ("reply", True)]
+    assert flight.in_flight == 0
+
+
+async def test_single_flight_different_keys_run_separately():
+    flight = SingleFlight()
+    upstream = _Upstream()
+    upstream.release.set()
+
+    results = await asyncio.gather(flight.do("a", upstream), flight.do("b", upstream))
+
+    assert upstream.calls == 2
+    assert results == [("reply", False), ("reply", False)]
+
+
+async def test_single_flight_error_reaches_every_waiter():
+    flight = SingleFlight()
+    upstream = _Upstream()
+    upstream.outcome = OpenRouterError("upstream 500")
+
+    callers = [asyncio.create_task(flight.do("key", upstream)) for _ in range(3)]
+    await asyncio.sleep(0)
+    upstream.release.set()
+    results = await asyncio.gather(*callers, return_exceptions=True)
+
+    assert upstream.calls == 1
+    assert all(isinstance(result, OpenRouterError) for result in results)
+    assert flight.in_flight == 0
+
+    # Failures aren't cached: the next caller runs the call again
+    upstream.outcome = "reply"
+    assert await flight.do("key", upstream) == ("reply", False)
+    assert upstream.calls == 2
+
+
+async def test_single_flight_leader_cancelled_while_followers_wait():
+    flight = SingleFlight()
+    upstream = _Upstream()
+
+    leader = asyncio.create_task(flight.do("key", upstream))
+    await asyncio.sleep(0)
+    followers = [asyncio.create_task(flight.do("key", upstream)) for _ in range(2)]
+    await asyncio.sleep(0)
+
+    leader.cancel()
+    await asyncio.sleep(0)
+    assert leader.cancelled()
+    assert not upstream.cancelled
+
+    upstream.release.set()
+    assert await asyncio.gather(*followers) == [("reply", True), ("reply", True)]
+    assert upstream.calls == 1
+
+
+async def test_single_flight_cancelled_once_every_caller_leaves():
+    flight = SingleFlight()
+    upstream = _Upstream()
+
+    callers = [asyncio.create_task(flight.do("key", upstream)) for _ in range(2)]
+    await asyncio.sleep(0)
+    for caller in callers:
+        caller.cancel()
+    await asyncio.gather(*callers, return_exceptions=True)
+    await asyncio.sleep(0)
+
+    assert upstream.cancelled
+    assert flight.in_flight == 0
+
+    # A new caller starts a fresh call instead of joining the cancelled one
+    upstream.release.set()
+    assert await flight.do("key", upstream) == ("reply", False)
+    assert upstream.calls == 2
+
+
+@pytest.fixture
+def coalesced_service(monkeypatch):
+    """The real service with upstream calls recorded and held until released"""
+    monkeypatch.setattr(settings, "ai_coalesced_call_sites", ["character"])
+    service = OpenRouterService()
+    upstream = _Upstream()
+    leaders = []
+
+    async def call_upstream(prompt, call_site, max_tokens, temperature, response_format, priority, user_id):
+        leaders.append((priority, user_id))
+        return await upstream(), "model"
+
+    monkeypatch.setattr(service, "_call_upstream", call_upstream)
+    return service, upstream, leaders
+
+
+async def test_coalescing_shares_calls_within_a_priority_class_only(coalesced_service):
+    service, upstream, leaders = coalesced_service
+
+    callers = [
+        asyncio.create_task(service._call_openrouter(PROMPT, "character", priority=priority, user_id=user_id))
+        for priority, user_id in [("free", "u1"), ("free", "u2"), ("premium", "u3"), ("premium", "u4")]
+    ]
+    await asyncio.sleep(0)
+    upstream.release.set()
+    results = await asyncio.gather(*callers)
+
+    # One upstream call per class, scheduled as its own class and charged to the caller that started it
+    assert upstream.calls == 2
+    assert leaders == [("free", "u1"), ("premium", "u3")]
+    assert results == [("reply", "model")] * 4
@@ -0,0 +1,45 @@
+"""orjson response envelope"""
+
+import uuid
+from datetime import datetime, timezone
+
+import httpx
+import orjson
+from fastapi import Depends, FastAPI, Response
+
+from app.core.responses import fast_response
+
+
+def test_envelope_encodes_uuids_and_datetimes():
+    conversation_id = uuid.uuid4()
+    started = datetime(2026, 3, 14, 9, 30, tzinfo=timezone.utc)
+
+    body = orjson.loads(fast_response(data={"id": conversation_id, "start_time": started}, message="ok").body)
+
+    assert body == {
+        "success": True,
+        "data": {"id": str(conversation_id), "start_time": "2026-03-14T09:30:00+00:00"},
+        "message": "ok",
+        "meta": None
+    }
+
+
+async def test_headers_set_by_dependencies_reach_the_client():
+    def rate_limit(response: Response):
+        response.headers["X-RateLimit-Limit"] = "30"
+        response.headers["X-RateLimit-Remaining"] = "29"
+
+    app = FastAPI()
+
+    @app.get("/hot", dependencies=[Depends(rate_limit)])
+    async def hot(response: Response):
+        return fast_response(data={"n": 1}, response=response)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        result = await client.get("/hot")
+
+    assert result.headers["X-RateLimit-Limit"] == "30"
+    assert result.headers["X-RateLimit-Remaining"] == "29"
+    assert result.headers["content-length"] == str(len(result.content))
+    assert result.headers.get_list("content-type") == ["application/json"]
+    assert result.json()["data"] == {"n": 1}
@@ -0,0 +1,80 @@
+"""In-memory scenario catalog reloads"""
+
+import asyncio
+import threading
+
+import pytest
+
+from app.services import scenario_catalog as catalog_module
+from app.services.scenario_catalog import ScenarioCatalog
+
+
+class UnreachableDatabase:
+    """SessionLocal stand-in that records the calling thread, optionally blocks, then fails"""
+
+    def __init__(self, gate: threading.Event = None):
+        self.gate = gate
+        self.threads = []
+
+    def __call__(self):
+        self.threads.append(threading.get_ident())
+        if self.gate is not None:
+            self.gate.wait(timeout=5)
+        raise RuntimeError("database unreachable")
+
+
+@pytest.fixture
+def database(monkeypatch):
+    def install(gate: threading.Event = None) -> UnreachableDatabase:
+        fake = UnreachableDatabase(gate)
+        monkeypatch.setattr(catalog_module, "SessionLocal", fake)
+        return fake
+    return install
+
+
+async def test_first_read_loads_off_the_event_loop(database):
+    db = database()
+    catalog = ScenarioCatalog()
+
+    entry = await catalog.get("coffee_shop")
+
+    assert entry is not None and not entry.premium_gated
+    assert db.threads and threading.get_ident() not in db.threads
+
+
+async def test_stale_snapshot_is_served_while_the_reload_runs(database, monkeypatch):
+    database()
+    catalog = ScenarioCatalog()
+    first = await catalog.snapshot()
+
+    gate = threading.Event()
+    db = database(gate)
+    monkeypatch.setattr(catalog_module.settings, "scenario_catalog_refresh_seconds", -1)
+
+    # The reload is blocked on the database, yet reads return at once with the old snapshot
+    served = await asyncio.wait_for(catalog.snapshot(), timeout=1)
+    again = await asyncio.wait_for(catalog.list_view(include_premium=False, premium_user=None), timeout=1)
+    assert served is first
+    assert again is first.lists[(False, False, False)]
+
+    reload = catalog._reload
+    assert reload is not None
+    gate.set()
+    await reload
+
+    assert len(db.threads) == 1
+    assert catalog._reload is None
+    assert catalog._snapshot.loaded_at > first.loaded_at
+    assert catalog._snapshot.version == first.version
+
+
+async def test_invalidate_waits_for_a_fresh_load(database):
+    database()
+    catalog = ScenarioCatalog()
+    await catalog.snapshot()
+
+    db = database()
+    catalog.invalidate()
+    await catalog.snapshot()
+
+    assert len(db.threads) == 1
@@ -0,0 +1,36 @@
+"""Scenario content registry and cached pre-conversation contexts"""
+
+import pytest
+
+from app.services.scenario_content import mock_context, scenario_content
+
+
+@pytest.fixture
+def builtin_content():
+    yield
+    scenario_content.load_templates({})
+
+
+def test_callers_cannot_change_the_cached_context():
+    context = mock_context("coffee_shop", "green", "female")
+    context["environment"]["location"] = "Somewhere else"
+    context["environment"]["crowd"] = "nobody"
+    context["appearance"] = "changed"
+
+    fresh = mock_context("coffee_shop", "green", "female")
+
+    assert fresh["environment"] != context["environment"]
+    assert "crowd" not in fresh["environment"]
+    assert fresh["appearance"] != "changed"
+    assert isinstance(fresh["conversation_starters"], tuple)
+    assert isinstance(fresh["context_tips"], tuple)
+
+
+def test_template_overrides_replace_cached_contexts(builtin_content):
+    before = mock_context("bookstore", "yellow")
+
+    scenario_content.load_templates({"bookstore": {"environment": {"location": "Rare book shop"}}})
+
+    after = mock_context("bookstore", "yellow")
+    assert after["environment"] == {"location": "Rare book shop"}
+    assert after["environment"] != before["environment"]
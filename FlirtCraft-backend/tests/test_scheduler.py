@@ -0,0 +1,174 @@
+"""Priority classes, per-user fairness and slot hand-back in the AI request scheduler"""
+
+import asyncio
+
+import pytest
+
+from app.core.config import settings
+from app.services.openrouter import OpenRouterError, OpenRouterService
+from app.services.prompts import Prompt
+from app.services.resilience import AdaptiveConcurrencyLimiter, ConcurrencyLimitError
+from app.services.scheduler import RequestScheduler
+
+PROMPT = Prompt("system", "user")
+
+
+@pytest.fixture
+def one_slot(monkeypatch):
+    monkeypatch.setattr(settings, "ai_concurrency_initial", 1)
+    monkeypatch.setattr(settings, "fallback_ai_model", None)
+
+
+@pytest.fixture
+def scheduler(one_slot) -> RequestScheduler:
+    """A scheduler whose only slot is already taken"""
+    scheduler = RequestScheduler(AdaptiveConcurrencyLimiter())
+    assert scheduler.limiter.try_acquire()
+    return scheduler
+
+
+async def _queue(scheduler: RequestScheduler, served: list, name: str, priority: str, user_key: str = None):
+    await scheduler.acquire(priority, user_key)
+    served.append(name)
+
+
+async def _drain(scheduler: RequestScheduler, served: list, count: int):
+    """Free the slot count times, letting exactly one waiter in each time"""
+    for _ in range(count):
+        scheduler.release_unmeasured()
+        for _ in range(3):
+            await asyncio.sleep(0)
+
+
+async def test_premium_before_free_before_background(scheduler):
+    served = []
+    waiters = [
+        asyncio.create_task(_queue(scheduler, served, name, priority))
+        for name, priority in [("job", "background"), ("free", "free"), ("premium", "premium")]
+    ]
+    await asyncio.sleep(0)
+    assert scheduler.waiting == 3
+
+    await _drain(scheduler, served, 3)
+    await asyncio.gather(*waiters)
+
+    assert served == ["premium", "free", "job"]
+
+
+async def test_round_robin_across_users(scheduler):
+    served = []
+    waiters = [
+        asyncio.create_task(_queue(scheduler, served, name, "free", name[0]))
+        for name in ["a1", "a2", "a3", "b1", "b2", "c1"]
+    ]
+    await asyncio.sleep(0)
+
+    await _drain(scheduler, served, 6)
+    await asyncio.gather(*waiters)
+
+    assert served == ["a1", "b1", "c1", "a2", "b2", "a3"]
+
+
+async def test_per_user_queue_is_bounded(scheduler, monkeypatch):
+    monkeypatch.setattr(settings, "ai_queue_max_per_user", 1)
+    waiter = asyncio.create_task(scheduler.acquire("free", "sam"))
+    await asyncio.sleep(0)
+
+    with pytest.raises(ConcurrencyLimitError):
+        await scheduler.acquire("free", "sam")
+
+    assert scheduler.shed["free"] == 1
+    waiter.cancel()
+
+
+async def test_cancelled_waiter_leaves_the_queue(scheduler):
+    served = []
+    gone = asyncio.create_task(scheduler.acquire("premium", "sam"))
+    waiting = asyncio.create_task(_queue(scheduler, served, "free", "free", "alex"))
+    await asyncio.sleep(0)
+
+    gone.cancel()
+    await asyncio.gather(gone, return_exceptions=True)
+    assert scheduler.waiting == 1
+
+    await _drain(scheduler, served, 1)
+    await waiting
+    assert served == ["free"]
+    assert scheduler.limiter.in_flight == 1
+
+
+async def test_slot_granted_to_a_cancelled_waiter_is_passed_on(scheduler):
+    served = []
+    gone = asyncio.create_task(scheduler.acquire("premium", "sam"))
+    waiting = asyncio.create_task(_queue(scheduler, served, "free", "free", "alex"))
+    await asyncio.sleep(0)
+
+    # The slot is handed to the premium waiter, whose caller goes away before it resumes
+    scheduler.release_unmeasured()
+    gone.cancel()
+    await asyncio.gather(gone, return_exceptions=True)
+    await asyncio.wait_for(waiting, timeout=1)
+
+    assert served == ["free"]
+    assert scheduler.limiter.in_flight == 1
+    assert scheduler.waiting == 0
+
+
+async def test_timed_out_waiter_is_shed(scheduler, monkeypatch):
+    monkeypatch.setattr(settings, "ai_queue_max_wait_seconds", {**settings.ai_queue_max_wait_seconds, "free": 0.01})
+
+    with pytest.raises(ConcurrencyLimitError) as raised:
+        await scheduler.acquire("free", "sam")
+
+    assert raised.value.retry_after == 1
+    assert scheduler.waiting == 0
+    assert scheduler.shed["free"] == 1
+
+
+async def test_failed_call_hands_its_slot_to_the_next_waiter(one_slot, monkeypatch):
+    service = OpenRouterService()
+    started = asyncio.Event()
+    fail = asyncio.Event()
+
+    async def upstream_error(*args, **kwargs):
+        started.set()
+        await fail.wait()
+        raise RuntimeError("upstream 500")
+
+    monkeypatch.setattr(service, "_stream_completion", upstream_error)
+    failing = asyncio.create_task(service._call_openrouter(PROMPT, call_site="chat", priority="free", user_id="sam"))
+    await started.wait()
+    queued = asyncio.create_task(service.scheduler.acquire("free", "alex"))
+    await asyncio.sleep(0)
+    assert service.scheduler.waiting == 1
+
+    fail.set()
+    with pytest.raises(OpenRouterError):
+        await failing
+    await asyncio.wait_for(queued, timeout=1)
+
+    assert service.limiter.in_flight == 1
+    assert service.scheduler.waiting == 0
+
+
+async def test_cancelled_call_hands_its_slot_to_the_next_waiter(one_slot, monkeypatch):
+    service = OpenRouterService()
+    started = asyncio.Event()
+
+    async def hang(*args, **kwargs):
+        started.set()
+        await asyncio.sleep(10)
+
+    monkeypatch.setattr(service, "_stream_completion", hang)
+    call = asyncio.create_task(service._call_openrouter(PROMPT, call_site="chat", priority="free", user_id="sam"))
+    await started.wait()
+    queued = asyncio.create_task(service.scheduler.acquire("free", "alex"))
+    await asyncio.sleep(0)
+
+    call.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await call
+    await asyncio.wait_for(queued, timeout=1)
+
+    assert service.limiter.in_flight == 1
+    assert service.scheduler.waiting == 0
@@ -0,0 +1,46 @@
+"""JSON extraction from model output"""
+
+import pytest
+
+from app.services.structured_output import JsonObjectScanner, extract_json_object
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('{"reply": "Hi!"}', {"reply": "Hi!"}),
+    ('Sure, here you go:\n```json\n{"reply": "Hi!", "mood": "warm"}\n```\nEnjoy!', {"reply": "Hi!", "mood": "warm"}),
+    ('Sure :{ here: {"a": 1}', {"a": 1}),
+    ('Use {curly braces} sparingly. {"a": {"b": [1, 2]}}', {"a": {"b": [1, 2]}}),
+    ('{not json {"a": 1}}', {"a": 1}),
+    ('{"reply": "a } and a { inside a string"}', {"reply": "a } and a { inside a string"}),
+    ('{"reply": "escaped \\" quote }"} trailing', {"reply": 'escaped " quote }'}),
+])
+def test_finds_the_first_object(text, expected):
+    assert extract_json_object(text) == expected
+
+
+@pytest.mark.parametrize("text", [
+    "No JSON here at all",
+    '{"reply": "Hey, how are',
+    "Prose with {an unclosed brace and no object",
+    "",
+])
+def test_no_object(text):
+    assert extract_json_object(text) is None
+
+
+def test_streamed_chunks_return_the_object_once_it_closes():
+    scanner = JsonObjectScanner()
+    chunks = ['Sure {thing}: ', '{"reply": "Hi', ' there"', ', "n": 2}', " more text"]
+
+    results = [scanner.feed(chunk) for chunk in chunks]
+
+    assert results[:3] == [None, None, None]
+    assert results[3] == {"reply": "Hi there", "n": 2}
+    assert scanner.finish() == {"reply": "Hi there", "n": 2}
+
+
+def test_finish_retries_past_a_candidate_left_open():
+    scanner = JsonObjectScanner()
+
+    assert scanner.feed('Note {this never closes but {"a": 1}') is None
+    assert scanner.finish() == {"a": 1}
@@ -0,0 +1,90 @@
+"""Background startup warmup and readiness"""
+
+import asyncio
+
+import pytest
+
+from app.core import warmup
+from app.core.config import settings
+
+
+@pytest.fixture
+def steps(monkeypatch):
+    """Replace schema creation and the warmup steps with recorders; returns the call order"""
+    calls = []
+    monkeypatch.setattr(warmup, "readiness", warmup.Readiness())
+    monkeypatch.setattr(warmup, "create_tables", lambda: calls.append("schema"))
+
+    def install(**overrides):
+        async def record(name):
+            calls.append(name)
+            return {}
+        defaults = {name: (lambda name=name: record(name)) for name in ("database", "redis")}
+        monkeypatch.setattr(warmup, "WARMUP_STEPS", {**defaults, **overrides})
+        return calls
+    return install
+
+
+async def test_no_ddl_runs_at_boot_by_default(steps):
+    calls = steps()
+
+    await warmup.run_warmup()
+
+    assert sorted(calls) == ["database", "redis"]
+    assert "schema" not in warmup.readiness.steps
+    assert warmup.readiness.ready
+
+
+async def test_opted_in_tables_are_created_before_the_other_steps(steps, monkeypatch):
+    monkeypatch.setattr(settings, "create_tables_on_startup", True)
+    calls = steps()
+
+    await warmup.run_warmup()
+
+    assert calls[0] == "schema"
+    assert sorted(calls[1:]) == ["database", "redis"]
+    assert warmup.readiness.ready
+    assert warmup.readiness.steps["schema"]["outcome"] == "ok"
+
+
+async def test_a_failed_step_does_not_block_readiness(steps):
+    async def broken():
+        raise ConnectionError("redis down")
+    steps(redis=broken)
+
+    await warmup.run_warmup()
+
+    assert warmup.readiness.ready
+    assert warmup.readiness.steps["redis"] == {"outcome": "failed", "seconds": warmup.readiness.steps["redis"]["seconds"], "error": "redis down"}
+
+
+async def test_timeout_marks_ready_anyway(steps, monkeypatch):
+    monkeypatch.setattr(settings, "warmup_timeout_seconds", 0.05)
+
+    async def slow():
+        await asyncio.sleep(10)
+        return {}
+    steps(openrouter=slow)
+
+    await warmup.run_warmup()
+
+    assert warmup.readiness.ready
+    assert "openrouter" not in warmup.readiness.steps
+
+
+async def test_cancelled_warmup_is_not_ready(steps):
+    started = asyncio.Event()
+
+    async def slow():
+        started.set()
+        await asyncio.sleep(10)
+        return {}
+    steps(openrouter=slow)
+
+    task = asyncio.create_task(warmup.run_warmup())
+    await started.wait()
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    assert not warmup.readiness.ready
@@ -0,0 +1,48 @@
+"""Conversation job scheduling in the background worker"""
+
+import worker as worker_module
+from app.core.redis_client import redis_client
+
+
+def test_jobs_with_equal_priority_come_out_fifo(fake_redis):
+    for conversation_id in ["c", "a", "b"]:
+        redis_client.enqueue_job("feedback", {"conversation_id": conversation_id})
+
+    order = [redis_client.dequeue_job("feedback")["data"]["conversation_id"] for _ in range(3)]
+
+    assert order == ["c", "a", "b"]
+    assert redis_client.dequeue_job("feedback") is None
+
+
+def test_lower_priority_value_is_dequeued_first(fake_redis):
+    redis_client.enqueue_job("email", {"n": 1}, priority=1)
+    redis_client.enqueue_job("email", {"n": 2}, priority=0)
+
+    assert redis_client.dequeue_job("email")["data"] == {"n": 2}
+
+
+async def test_conversation_queues_are_worked_round_robin(fake_redis, monkeypatch):
+    ran = []
+    handlers = {
+        queue: (lambda data, queue=queue: _record(ran, queue))
+        for queue in ("feedback", "conversation_assessment", "conversation_summary")
+    }
+    monkeypatch.setattr(worker_module, "JOB_HANDLERS", handlers)
+    monkeypatch.setattr(worker_module.settings, "worker_job_batches_per_tick", 2)
+
+    for i in range(5):
+        redis_client.enqueue_job("conversation_assessment", {"conversation_id": f"a{i}"})
+    redis_client.enqueue_job("conversation_summary", {"conversation_id": "s0"})
+    redis_client.enqueue_job("feedback", {"conversation_id": "f0"})
+
+    worker = worker_module.FlirtCraftWorker()
+    worker.concurrency = 1
+    await worker.process_conversation_jobs()
+
+    # A backlog of assessments doesn't hold back feedback or summaries, and the tick is bounded
+    assert ran == ["feedback", "conversation_assessment", "conversation_summary", "conversation_assessment"]
+    assert redis_client.get_queue_size("conversation_assessment") == 3
+
+
+async def _record(ran, queue):
+    ran.append(queue)
@@ -6,14 +6,18 @@ Handles background jobs for analytics, notifications, and data processing
 import os
 import logging
 import asyncio
+import time
 from datetime import datetime
 from typing import Dict, Any
 
-# Configure logging
-logging.basicConfig(
-    level=logging.DEBUG if os.getenv("DEBUG", "false").lower() == "true" else logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-)
+from app.core.config import settings
+from app.core.logging_config import configure_logging
+from app.core.quota import reconcile_conversation_quotas
+from app.core.redis_client import redis_client
+from app.services.conversation_jobs import JOB_HANDLERS
+
+# Configure logging (queued, formatted off the worker loop)
+configure_logging()
 
 logger = logging.getLogger(__name__)
 
@@ -23,6 +27,8 @@ class FlirtCraftWorker:
     def __init__(self):
         self.environment = os.getenv("ENVIRONMENT", "development")
         self.concurrency = int(os.getenv("WORKER_CONCURRENCY", "1"))
+        self.poll_interval = float(os.getenv("WORKER_POLL_INTERVAL", "1"))
+        self._last_quota_reconcile = 0.0
         self.running = False
         logger.info(f"Worker initialized - Environment: {self.environment}")
 
@@ -36,7 +42,7 @@ class FlirtCraftWorker:
             # Main worker loop
             while self.running:
                 await self.process_jobs()
-                await asyncio.sleep(5)  # Check for jobs every 5 seconds
+                await asyncio.sleep(self.poll_interval)
 
         except KeyboardInterrupt:
             logger.info("Worker interrupted by user")
@@ -53,15 +59,53 @@ class FlirtCraftWorker:
 
             current_time = datetime.utcnow().isoformat()
 
+            # User-facing AI jobs first, they have clients waiting on them
+            await self.process_conversation_jobs()
+
             # Simulate different types of background jobs
             await self.process_analytics_jobs()
             await self.process_notification_jobs()
             await self.process_achievement_jobs()
             await self.process_streak_jobs()
+            await self.process_quota_reconciliation()
 
         except Exception as e:
             logger.error(f"Error processing jobs: {e}")
 
+    async def process_conversation_jobs(self):
+        """
+        Work the conversation AI queues (feedback, assessment, summary) round-robin
+        Each pass runs at most one batch per queue, so a busy queue can't starve the others, and the
+        number of passes per tick is bounded so the remaining job types still get their turn
+        """
+        for _ in range(settings.worker_job_batches_per_tick):
+            processed = 0
+            for queue_name, handler in JOB_HANDLERS.items():
+                processed += await self.process_job_batch(queue_name, handler)
+            if not processed:
+                break
+
+    async def process_job_batch(self, queue_name: str, handler) -> int:
+        """Run up to concurrency jobs from one queue concurrently, returns how many were taken"""
+        batch = []
+        while len(batch) < self.concurrency:
+            job = redis_client.dequeue_job(queue_name)
+            if not job:
+                break
+            batch.append(job)
+
+        if not batch:
+            return 0
+
+        results = await asyncio.gather(
+            *(handler(job["data"]) for job in batch),
+            return_exceptions=True
+        )
+        for job, result in zip(batch, results):
+            if isinstance(result, Exception):
+                logger.error(f"Job {job.get('id')} on {queue_name} failed: {result}")
+        return len(batch)
+
     async def process_analytics_jobs(self):
         """Process analytics and metrics jobs"""
         # TODO: Implement real analytics processing
@@ -94,6 +138,16 @@ class FlirtCraftWorker:
         # - Send streak reminders
         pass
 
+    async def process_quota_reconciliation(self):
+        """Periodically copy Redis conversation quota counters into the users table"""
+        if time.monotonic() - self._last_quota_reconcile < settings.quota_reconcile_interval:
+            return
+        self._last_quota_reconcile = time.monotonic()
+
+        updated = reconcile_conversation_quotas()
+        if updated:
+            logger.info(f"Reconciled conversation quotas for {updated} users")
+
     def stop(self):
         """Stop the background worker"""
         self.running = False